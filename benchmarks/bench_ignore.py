@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Microbenchmark for the tracer's call-event key lookup.
+
+Compares the previous per-event path (fnmatch loop over every ignore pattern
+plus a fresh f-string key) with the compiled, per-code-object memoized path.
+
+Usage (from the repository root):
+
+    PYTHONPATH=. python benchmarks/bench_ignore.py [iterations]
+"""
+
+import fnmatch
+import sys
+import timeit
+
+from py_power_profile.backends import MockBackend
+from py_power_profile.config import config
+from py_power_profile.tracer import EnergyTracer
+
+PATTERNS = [
+    "*/site-packages/*",
+    "*/dist-packages/*",
+    "*/lib/python3*/*",
+    "<frozen *>",
+    "<string>",
+    "tests/*",
+    "*/tests/*",
+    "*/test_*.py",
+    "*/.venv/*",
+    "*/node_modules/*",
+]
+
+
+def legacy_function_key(frame) -> str:
+    """The per-event key lookup as it was before memoization."""
+    filename = frame.f_code.co_filename
+    for pattern in config.ignore_patterns:
+        if fnmatch.fnmatch(filename, pattern):
+            return ""
+    return f"{filename}:{frame.f_code.co_name}"
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    config.ignore_patterns = PATTERNS
+    tracer = EnergyTracer(MockBackend())
+
+    # A handful of distinct frames, as a real program revisits the same code
+    frames = [sys._getframe()]
+    frames.append(frames[0].f_back or frames[0])
+
+    def legacy() -> None:
+        for frame in frames:
+            legacy_function_key(frame)
+
+    code_ids = tracer._code_ids
+
+    def memoized() -> None:
+        # Mirrors the call branch of EnergyTracer._trace_callback
+        for frame in frames:
+            code = frame.f_code
+            if code_ids.get(id(code)) is None:
+                tracer._get_code_id(code)
+
+    print(f"{len(PATTERNS)} ignore patterns, {iterations} iterations x {len(frames)} frames")
+    results = {}
+    for name, func in (("legacy", legacy), ("memoized", memoized)):
+        seconds = min(timeit.repeat(func, number=iterations, repeat=5))
+        per_call_ns = seconds / (iterations * len(frames)) * 1e9
+        results[name] = per_call_ns
+        print(f"  {name:<9} {per_call_ns:8.1f} ns per call event")
+    print(f"  speedup   {results['legacy'] / results['memoized']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Memory footprint of per-function statistics.
+
+Compares a dict of FunctionStats-style objects (one ``__dict__`` per
+function, as the tracer used to keep) with the columnar StatsTable.
+
+Usage (from the repository root):
+
+    PYTHONPATH=. python benchmarks/bench_stats_memory.py [functions]
+"""
+
+import sys
+import tracemalloc
+from collections import defaultdict
+
+from py_power_profile.stats import StatsTable
+
+
+class LegacyFunctionStats:
+    """FunctionStats as it was before __slots__ and the columnar table."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total_energy_mj = 0.0
+        self.total_time_ms = 0.0
+        self.self_energy_mj = 0.0
+        self.self_time_ms = 0.0
+        self.min_energy_mj = float('inf')
+        self.max_energy_mj = 0.0
+
+    def update(self, energy_mj: float, time_ms: float) -> None:
+        self.calls += 1
+        self.total_energy_mj += energy_mj
+        self.total_time_ms += time_ms
+        self.self_energy_mj += energy_mj
+        self.self_time_ms += time_ms
+        self.min_energy_mj = min(self.min_energy_mj, energy_mj)
+        self.max_energy_mj = max(self.max_energy_mj, energy_mj)
+
+
+def measure(build) -> int:
+    """Return bytes still allocated after build() returns its result."""
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    # Keys are created up front: both layouts have to store them anyway
+    keys = [f"/srv/app/module_{i // 20}.py:function_{i}" for i in range(count)]
+
+    def legacy():
+        stats = defaultdict(LegacyFunctionStats)
+        for key in keys:
+            stats[key].update(1.5, 0.25)
+        return stats
+
+    def columnar():
+        table = StatsTable()
+        for key in keys:
+            table.update(table.intern(key), 1.5, 0.25, 1.5, 0.25)
+        return table
+
+    legacy_bytes = measure(legacy)
+    columnar_bytes = measure(columnar)
+    print(f"{count} functions")
+    print(f"  legacy    {legacy_bytes / count:8.1f} bytes per function")
+    print(f"  columnar  {columnar_bytes / count:8.1f} bytes per function")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Cost of recording trace log events and throughput of aggregating them.
+
+Measures the per-event cost of TraceBuffer.append (the part of a recorded
+call the tracer adds on top of reading the counter), then writes a synthetic
+log of nested calls and times aggregate_trace with the pure-Python and, when
+NumPy is installed, the vectorized reducer.
+
+Usage (from the repository root):
+
+    PYTHONPATH=. python benchmarks/bench_tracelog.py [million_events]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+from py_power_profile.recording import (
+    EVENT_ENTER,
+    EVENT_EXIT,
+    RECORD_SIZE,
+    TraceWriter,
+    aggregate_trace,
+)
+
+FUNCTIONS = 64
+DEPTH = 4
+
+
+def write_log(path: str, events: int) -> None:
+    """Write a log of repeated call trees DEPTH deep."""
+    names = [f"bench.py:f{i}" for i in range(FUNCTIONS)]
+    writer = TraceWriter(path, names, {"backend": "mock"})
+    buffer = writer.buffer(1, "MainThread")
+    step = 0
+    tree = 0
+    while step < events:
+        for level in range(DEPTH):
+            buffer.append((tree + level) % FUNCTIONS, EVENT_ENTER, step, step * 0.5)
+            step += 1
+        for level in reversed(range(DEPTH)):
+            buffer.append((tree + level) % FUNCTIONS, EVENT_EXIT, step, step * 0.5)
+            step += 1
+        tree += 1
+    buffer.flush()
+    writer.close()
+
+
+def main() -> None:
+    events = int(float(sys.argv[1]) * 1e6) if len(sys.argv) > 1 else 2_000_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Appending to an in-memory buffer; flushes are amortized per chunk
+        writer = TraceWriter(os.path.join(tmp, "append.bin"), [], {})
+        buffer = writer.buffer(1, "MainThread")
+        append = buffer.append
+        iterations = 1_000_000
+        seconds = min(
+            timeit.repeat(lambda: append(1, EVENT_ENTER, 123456789, 1.5), number=iterations, repeat=5)
+        )
+        writer.close()
+        print(f"append     {seconds / iterations * 1e9:8.1f} ns per event")
+
+        path = os.path.join(tmp, "trace.bin")
+        write_log(path, events)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"log        {events} events, {size_mb:.1f} MB ({RECORD_SIZE} bytes per event)")
+
+        modes = [("python", False)]
+        try:
+            import numpy  # noqa: F401
+            modes.append(("numpy", True))
+        except ImportError:
+            print("numpy      not installed, skipping the vectorized reducer")
+
+        for name, use_numpy in modes:
+            start = time.perf_counter()
+            aggregate_trace(path, use_numpy=use_numpy)
+            seconds = time.perf_counter() - start
+            print(f"{name:<10} {seconds:8.2f} s, {size_mb / seconds:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
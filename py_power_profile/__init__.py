@@ -1,5 +1,28 @@
 """py-power-profile: Profile and visualize energy consumption of Python code."""
 
+from typing import Any
+
 __version__ = "0.1.0"
 __author__ = "py-power-profile contributors"
-__license__ = "MIT" 
\ No newline at end of file
+__license__ = "MIT"
+
+# Public API, imported on first use so that importing the package stays cheap
+_EXPORTS = {
+    "Profiler": "profiler",
+    "bench": "benchmark",
+    "energy_profiled": "profiler",
+    "profile": "profiler",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
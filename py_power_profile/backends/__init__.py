@@ -1,15 +1,108 @@
-"""Energy measurement backends for py-power-profile."""
+"""Energy measurement backends for py-power-profile.
 
-from .base import BaseBackend
-from .rapl import RAPLBackend
-from .hwmon import HwmonBackend
-from .psutil_est import PsutilEstBackend
-from .mock import MockBackend
+Backend modules are imported on first use, so psutil, pyRAPL and the sysfs
+readers only load for the backend that is actually selected.  Other
+packages add backends through ``py_power_profile.backends`` entry points,
+named after the backend and pointing at a ``BaseBackend`` subclass::
+
+    [project.entry-points."py_power_profile.backends"]
+    nvml = "mypkg.energy:NvmlBackend"
+"""
+
+import functools
+from importlib import import_module
+from typing import Any, Dict, List, Tuple, Type
+
+from .base import BackendCapabilities, BaseBackend
+
+# Entry point group of third-party backends
+ENTRY_POINT_GROUP = "py_power_profile.backends"
+
+# Backend classes by backend name, as (module, class) within this package
+BACKENDS = {
+    "powercap": ("powercap", "PowercapBackend"),
+    "rapl": ("rapl", "RAPLBackend"),
+    "hwmon": ("hwmon", "HwmonBackend"),
+    "psutil_est": ("psutil_est", "PsutilEstBackend"),
+    "mock": ("mock", "MockBackend"),
+}
+
+# Classes importable from this package, by the module defining them
+_EXPORTS = {class_name: module_name for module_name, class_name in BACKENDS.values()}
+_EXPORTS["ProportionalBackend"] = "proportional"
 
 __all__ = [
+    "BackendCapabilities",
     "BaseBackend",
-    "RAPLBackend", 
+    "PowercapBackend",
+    "RAPLBackend",
     "HwmonBackend",
     "PsutilEstBackend",
     "MockBackend",
-] 
\ No newline at end of file
+    "ProportionalBackend",
+]
+
+
+@functools.lru_cache(maxsize=None)
+def _plugin_backends() -> Dict[str, str]:
+    """Return the installed backend entry points by name, as module:attribute.
+
+    Built-in names cannot be taken over by plugins.
+    """
+    from .probe import open_probe_cache
+
+    cache = open_probe_cache()
+    found = cache.entry_points(ENTRY_POINT_GROUP)
+    cache.save()
+    return {name: value for name, value in found.items() if name not in BACKENDS}
+
+
+def backend_names() -> List[str]:
+    """Return the names of the built-in and installed backends."""
+    return list(BACKENDS) + sorted(_plugin_backends())
+
+
+def get_backend_class(name: str) -> Type[BaseBackend]:
+    """Import and return the class of a backend by its name."""
+    if name in BACKENDS:
+        module_name, class_name = BACKENDS[name]
+        return getattr(import_module(f".{module_name}", __name__), class_name)
+
+    value = _plugin_backends().get(name)
+    if value is None:
+        raise ValueError(f"Unknown backend: {name}")
+    # Entry point values are "module:attribute [extras]"
+    module_name, _, attribute = value.split("[")[0].strip().partition(":")
+    backend_class: Any = import_module(module_name)
+    for part in filter(None, attribute.split(".")):
+        backend_class = getattr(backend_class, part)
+    if not (isinstance(backend_class, type) and issubclass(backend_class, BaseBackend)):
+        raise ValueError(f"Backend '{name}' ({value}) is not a BaseBackend subclass")
+    return backend_class
+
+
+def auto_candidates() -> List[Tuple[str, Type[BaseBackend]]]:
+    """Return the backends "auto" may pick, best first by their capabilities.
+
+    Backends whose class cannot be loaded (a broken plugin, say) are left out.
+    """
+    candidates = []
+    for name in backend_names():
+        try:
+            backend_class = get_backend_class(name)
+        except Exception:
+            continue
+        if backend_class.capabilities.auto:
+            candidates.append((name, backend_class))
+    # Stable sort: ties keep built-ins ahead of plugins
+    candidates.sort(key=lambda candidate: candidate[1].capabilities.rank())
+    return candidates
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
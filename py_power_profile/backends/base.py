@@ -1,21 +1,78 @@
 """Base backend interface for energy measurement."""
 
 from abc import ABC, abstractmethod
-from typing import Tuple
+from typing import ClassVar, NamedTuple, Tuple
+
+
+class BackendCapabilities(NamedTuple):
+    """What a backend measures and how finely, used to rank backends for "auto".
+
+    Figures are nominal for the backend class; ``get_capabilities()`` may
+    refine them once a backend has probed the hardware.  Backends with
+    ``auto`` false are only used when asked for by name.
+    """
+
+    # Hardware energy counter rather than an estimate
+    measured: bool = False
+    # Smallest energy step the counter reports, in mJ
+    resolution_mj: float = float("inf")
+    # How often the counter changes, in ms
+    update_period_ms: float = float("inf")
+    # Approximate cost of one read(), in microseconds
+    read_cost_us: float = float("inf")
+    # Whether get_domains()/read_domains() report separate counters
+    per_domain: bool = False
+    auto: bool = True
+
+    def rank(self) -> Tuple[bool, float, float, float]:
+        """Sort key, best first: measured, fastest updates, finest steps, cheapest reads."""
+        return (not self.measured, self.update_period_ms, self.resolution_mj, self.read_cost_us)
 
 
 class BaseBackend(ABC):
-    """Abstract base class for energy measurement backends."""
+    """Abstract base class for energy measurement backends.
+
+    Backends expose a monotonically increasing energy counter through
+    ``read()``.  Callers keep their own snapshots and subtract them, so any
+    number of measurements can overlap (e.g. nested function calls).
+    ``start()``/``stop()`` remain as a convenience for a single measurement.
+    """
+
+    # Backends that do not declare their capabilities are only used by name
+    capabilities: ClassVar[BackendCapabilities] = BackendCapabilities(auto=False)
+
+    _start_snapshot: Tuple[int, float] = (0, 0.0)
 
     @abstractmethod
+    def read(self) -> Tuple[int, float]:
+        """Return a (timestamp_ns, energy_mj) snapshot of the energy counter."""
+        pass
+
+    def get_capabilities(self) -> BackendCapabilities:
+        """Return the capabilities of this backend as configured."""
+        return self.capabilities
+
+    def get_domains(self) -> Tuple[str, ...]:
+        """Return the names of the per-domain counters, if any."""
+        return ()
+
+    def read_domains(self) -> Tuple[int, float, Tuple[float, ...]]:
+        """Return (timestamp_ns, energy_mj, per-domain energy_mj) in one pass."""
+        timestamp_ns, energy_mj = self.read()
+        return timestamp_ns, energy_mj, ()
+
     def start(self) -> None:
         """Start energy measurement."""
-        pass
+        self._start_snapshot = self.read()
 
-    @abstractmethod
     def stop(self) -> Tuple[float, float]:
         """Stop energy measurement and return (energy_mj, time_ms)."""
-        pass
+        end_time, end_energy = self.read()
+        start_time, start_energy = self._start_snapshot
+        return end_energy - start_energy, (end_time - start_time) / 1e6
+
+    def close(self) -> None:
+        """Release resources such as sampler threads or open files."""
 
     @abstractmethod
     def is_available(self) -> bool:
@@ -25,4 +82,4 @@ class BaseBackend(ABC):
     @abstractmethod
     def get_name(self) -> str:
         """Get the name of this backend."""
-        pass 
\ No newline at end of file
+        pass
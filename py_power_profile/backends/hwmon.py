@@ -1,74 +1,164 @@
 """HWMON backend for ARM/Raspberry Pi power sensors."""
 
-import glob
+import fnmatch
 import time
-from pathlib import Path
-from typing import Tuple
+from typing import List, Optional, Sequence, Tuple
 
-from .base import BaseBackend
+from py_power_profile.config import config
+
+from .base import BackendCapabilities, BaseBackend
+from .sampler import BackgroundSampler
+from .sysfs import HWMON_ROOT, SysfsCounter, find_hwmon_channels
+
+# Fastest sampling of power channels, whatever the sensors claim
+MIN_SAMPLE_INTERVAL_MS = 1.0
 
 
 class HwmonBackend(BaseBackend):
-    """HWMON backend for ARM/Raspberry Pi power sensors."""
+    """HWMON backend for ARM/Raspberry Pi power sensors.
+
+    Channels with a cumulative ``energy*_input`` counter are read directly.
+    Channels that only report instantaneous ``power*_input`` (CPU, GPU and
+    SoC rails of an INA3221, for instance) are summed and sampled on a
+    background thread at the sensors' update interval, and the ring buffer
+    of samples is integrated over each measured interval.  ``channels``
+    (default: ``config.hwmon_channels``) are globs over channel names such as
+    ``ina3221/VDD_CPU``; without any, every channel is measured.
+
+    When every selected channel has an energy counter, each one is also
+    reported as a domain.
+    """
+
+    # Sensors typically update every few to tens of milliseconds
+    capabilities = BackendCapabilities(
+        measured=True, resolution_mj=0.001, update_period_ms=10.0, read_cost_us=2.0, per_domain=True
+    )
 
-    def __init__(self) -> None:
-        self._start_time: float = 0.0
-        self._start_power: float = 0.0
-        self._power_file = None
-        self._available = self._check_availability()
+    def __init__(
+        self,
+        hwmon_root: str = HWMON_ROOT,
+        channels: Optional[Sequence[str]] = None,
+        sample_interval_ms: Optional[float] = None,
+    ) -> None:
+        self._hwmon_root = hwmon_root
+        self._patterns = list(config.hwmon_channels if channels is None else channels)
+        self._channels: Tuple[str, ...] = ()
+        self._energy_counters: List[SysfsCounter] = []
+        self._power_counters: List[SysfsCounter] = []
+        self._sampler: Optional[BackgroundSampler] = None
+        self._sample_interval_ms: Optional[float] = None
+        self._available = self._check_availability(sample_interval_ms)
 
-    def _check_availability(self) -> bool:
-        """Check if hwmon power sensors are available."""
+    def _selected(self, name: str) -> bool:
+        """Check whether a channel matches the configured channel globs."""
+        return not self._patterns or any(fnmatch.fnmatch(name, p) for p in self._patterns)
+
+    def _check_availability(self, sample_interval_ms: Optional[float]) -> bool:
+        """Open the readable channels selected by the configuration."""
         try:
-            # Look for power sensors in /sys/class/hwmon
-            hwmon_dirs = glob.glob("/sys/class/hwmon/hwmon*")
-            for hwmon_dir in hwmon_dirs:
-                # Look for power files
-                power_files = glob.glob(f"{hwmon_dir}/power*_input")
-                if power_files:
-                    self._power_file = power_files[0]
-                    return True
-            return False
+            channels = find_hwmon_channels(self._hwmon_root)
         except Exception:
             return False
 
+        names = []
+        intervals = []
+        for channel in channels:
+            if not self._selected(channel.name):
+                continue
+            try:
+                counter = SysfsCounter(channel.path)
+            except OSError:
+                continue
+            try:
+                counter.read()
+            except (OSError, ValueError):
+                counter.close()
+                continue
+            names.append(channel.name)
+            if channel.kind == "energy":
+                self._energy_counters.append(counter)
+            else:
+                self._power_counters.append(counter)
+                if channel.update_interval_ms:
+                    intervals.append(channel.update_interval_ms)
+
+        if not names:
+            return False
+        self._channels = tuple(names)
+
+        if self._power_counters:
+            if sample_interval_ms is None:
+                # Sampling faster than the sensors update only repeats values
+                sample_interval_ms = min(intervals) if intervals else config.sample_interval_ms
+            self._sample_interval_ms = max(sample_interval_ms, MIN_SAMPLE_INTERVAL_MS)
+            self._sampler = BackgroundSampler(
+                self._read_power, interval_s=self._sample_interval_ms / 1000
+            )
+        return True
+
     def _read_power(self) -> float:
-        """Read current power consumption in mW."""
-        if not self._power_file:
-            return 0.0
-        
-        try:
-            with open(self._power_file, "r") as f:
-                power_mw = float(f.read().strip())
-                return power_mw
-        except Exception:
-            return 0.0
+        """Read the summed power of the sampled channels in mW."""
+        power_mw = 0.0
+        for counter in self._power_counters:
+            try:
+                # hwmon reports power in microwatts
+                power_mw += counter.read_raw() / 1000
+            except (OSError, ValueError):
+                continue
+        return power_mw
+
+    @property
+    def channels(self) -> Tuple[str, ...]:
+        """Names of the measured channels."""
+        return self._channels
+
+    def get_capabilities(self) -> BackendCapabilities:
+        """Return the capabilities, with the sampling period of power channels."""
+        if self._sample_interval_ms is None:
+            return self.capabilities
+        return self.capabilities._replace(
+            update_period_ms=self._sample_interval_ms, per_domain=False
+        )
 
-    def start(self) -> None:
-        """Start energy measurement."""
+    def get_domains(self) -> Tuple[str, ...]:
+        """Return the channel names when every channel has an energy counter."""
+        return self._channels if self._sampler is None else ()
+
+    def read_domains(self) -> Tuple[int, float, Tuple[float, ...]]:
+        """Read every energy counter in one pass, in mJ."""
+        if self._sampler is not None:
+            return super().read_domains()
         if not self._available:
             raise RuntimeError("HWMON backend not available")
-        
-        self._start_time = time.time()
-        self._start_power = self._read_power()
 
-    def stop(self) -> Tuple[float, float]:
-        """Stop energy measurement and return (energy_mj, time_ms)."""
+        timestamp_ns = time.monotonic_ns()
+        # Counters are in microjoules
+        values = tuple([counter.read() / 1000 for counter in self._energy_counters])
+        return timestamp_ns, sum(values), values
+
+    def read(self) -> Tuple[int, float]:
+        """Return a (timestamp_ns, energy_mj) snapshot of the energy counter."""
         if not self._available:
             raise RuntimeError("HWMON backend not available")
-        
-        end_time = time.time()
-        end_power = self._read_power()
-        
-        # Calculate average power and energy
-        avg_power_mw = (self._start_power + end_power) / 2
-        time_diff_s = end_time - self._start_time
-        
-        # Convert to mJ: power_mw * time_s * 1000
-        energy_mj = avg_power_mw * time_diff_s * 1000
-        time_diff_ms = time_diff_s * 1000
-        
-        return energy_mj, time_diff_ms
+
+        sampler = self._sampler
+        if sampler is not None and not sampler.running:
+            sampler.start()
+        timestamp_ns = time.monotonic_ns()
+        total_uj = 0
+        for counter in self._energy_counters:
+            total_uj += counter.read()
+        energy_mj = total_uj / 1000
+        if sampler is not None:
+            energy_mj += sampler.energy_at(timestamp_ns)
+        return timestamp_ns, energy_mj
+
+    def close(self) -> None:
+        """Stop the sampler and close the channel files."""
+        if self._sampler is not None:
+            self._sampler.stop()
+        for counter in self._energy_counters + self._power_counters:
+            counter.close()
 
     def is_available(self) -> bool:
         """Check if this backend is available on the current system."""
@@ -76,4 +166,4 @@ class HwmonBackend(BaseBackend):
 
     def get_name(self) -> str:
         """Get the name of this backend."""
-        return "hwmon" 
\ No newline at end of file
+        return "hwmon"
@@ -3,27 +3,29 @@
 import time
 from typing import Tuple
 
-from .base import BaseBackend
+from .base import BackendCapabilities, BaseBackend
 
 
 class MockBackend(BaseBackend):
-    """Mock backend that returns deterministic values for testing."""
+    """Mock backend that returns deterministic values for testing.
+
+    The energy counter advances by ``energy_per_call_mj`` on every read, so a
+    start/stop pair always measures exactly that amount.
+    """
+
+    # Fake figures, never picked by "auto"
+    capabilities = BackendCapabilities(
+        resolution_mj=0.0, update_period_ms=0.0, read_cost_us=0.0, auto=False
+    )
 
     def __init__(self, energy_per_call_mj: float = 10.0) -> None:
-        self._start_time: float = 0.0
         self._energy_per_call_mj = energy_per_call_mj
+        self._energy_mj = 0.0
 
-    def start(self) -> None:
-        """Start energy measurement."""
-        self._start_time = time.time()
-
-    def stop(self) -> Tuple[float, float]:
-        """Stop energy measurement and return (energy_mj, time_ms)."""
-        end_time = time.time()
-        time_diff_ms = (end_time - self._start_time) * 1000
-        
-        # Return fixed energy per call
-        return self._energy_per_call_mj, time_diff_ms
+    def read(self) -> Tuple[int, float]:
+        """Return a (timestamp_ns, energy_mj) snapshot of the energy counter."""
+        self._energy_mj += self._energy_per_call_mj
+        return time.monotonic_ns(), self._energy_mj
 
     def is_available(self) -> bool:
         """Check if this backend is available on the current system."""
@@ -31,4 +33,4 @@ class MockBackend(BaseBackend):
 
     def get_name(self) -> str:
         """Get the name of this backend."""
-        return "mock" 
\ No newline at end of file
+        return "mock"
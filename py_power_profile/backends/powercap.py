@@ -0,0 +1,131 @@
+"""Native Linux powercap (RAPL) backend with per-domain energy counters."""
+
+import os
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from .base import BackendCapabilities, BaseBackend
+from .sysfs import POWERCAP_ROOT, SysfsCounter, find_rapl_zones, open_rapl_counter, read_attribute
+
+
+class PowercapBackend(BaseBackend):
+    """RAPL backend reading the kernel powercap interface directly.
+
+    Every RAPL zone and subzone is exposed as a domain, named after the zone
+    (``package-0``, ``psys``) and, for subzones, after their parent
+    (``package-0/core``, ``package-0/uncore``, ``package-0/dram``).  The
+    scalar energy counter is the sum of the package zones plus DRAM, which
+    the package zone does not include; ``psys`` already covers the whole
+    platform and only counts when no package zone exists.
+    """
+
+    # energy_uj is in microjoules and RAPL updates it about every millisecond
+    capabilities = BackendCapabilities(
+        measured=True, resolution_mj=0.001, update_period_ms=1.0, read_cost_us=2.0, per_domain=True
+    )
+
+    def __init__(self, powercap_root: str = POWERCAP_ROOT) -> None:
+        self._powercap_root = powercap_root
+        self._domains: Tuple[str, ...] = ()
+        self._counters: List[SysfsCounter] = []
+        self._total_indices: Tuple[int, ...] = ()
+        self._available = self._check_availability()
+
+    def _check_availability(self) -> bool:
+        """Open the energy counters of every readable RAPL zone."""
+        try:
+            zone_dirs = find_rapl_zones(self._powercap_root)
+        except Exception:
+            return False
+
+        names = {}
+        for zone_dir in zone_dirs:
+            names[os.path.basename(zone_dir)] = read_attribute(Path(zone_dir) / "name")
+
+        domains = []
+        package_indices = []
+        dram_indices = []
+        psys_indices = []
+        for zone_dir in zone_dirs:
+            zone = os.path.basename(zone_dir)
+            name = names[zone] or zone
+            parts = zone.split(":")
+            if len(parts) > 2:
+                parent = ":".join(parts[:2])
+                domain = f"{names.get(parent) or parent}/{name}"
+            else:
+                domain = name
+            if domain in domains:
+                # Multi-socket systems without unique zone names
+                domain = f"{domain}@{zone}"
+
+            try:
+                counter = open_rapl_counter(zone_dir)
+                counter.read()
+            except (OSError, ValueError):
+                continue
+
+            index = len(self._counters)
+            self._counters.append(counter)
+            domains.append(domain)
+            if name.startswith("package"):
+                package_indices.append(index)
+            elif name == "dram":
+                dram_indices.append(index)
+            elif name == "psys":
+                psys_indices.append(index)
+
+        if not self._counters:
+            return False
+
+        self._domains = tuple(domains)
+        if package_indices:
+            self._total_indices = tuple(package_indices + dram_indices)
+        elif psys_indices:
+            self._total_indices = tuple(psys_indices)
+        else:
+            self._total_indices = tuple(range(len(self._counters)))
+        return True
+
+    def get_domains(self) -> Tuple[str, ...]:
+        """Return the names of the RAPL domains."""
+        return self._domains
+
+    def read_domains(self) -> Tuple[int, float, Tuple[float, ...]]:
+        """Read every domain counter in one pass, in mJ."""
+        if not self._available:
+            raise RuntimeError("Powercap backend not available")
+
+        timestamp_ns = time.monotonic_ns()
+        # Counters are in microjoules
+        values = tuple([counter.read() / 1000 for counter in self._counters])
+        total = 0.0
+        for index in self._total_indices:
+            total += values[index]
+        return timestamp_ns, total, values
+
+    def read(self) -> Tuple[int, float]:
+        """Return a (timestamp_ns, energy_mj) snapshot of the energy counter."""
+        if not self._available:
+            raise RuntimeError("Powercap backend not available")
+
+        timestamp_ns = time.monotonic_ns()
+        total = 0
+        counters = self._counters
+        for index in self._total_indices:
+            total += counters[index].read()
+        return timestamp_ns, total / 1000
+
+    def close(self) -> None:
+        """Close the counter files."""
+        for counter in self._counters:
+            counter.close()
+
+    def is_available(self) -> bool:
+        """Check if this backend is available on the current system."""
+        return self._available
+
+    def get_name(self) -> str:
+        """Get the name of this backend."""
+        return "powercap"
@@ -0,0 +1,162 @@
+"""On-disk cache of backend probe results, per host and boot.
+
+Probing a backend can be expensive (``pyRAPL.setup()``, globbing every
+hwmon device) and its outcome only changes with the hardware, drivers or
+permissions.  "auto" records which backends it found available, keyed by
+host name and kernel boot id, and later runs in the same boot skip the
+backends recorded as unavailable.  The installed plugin entry points are
+cached alongside, until a site-packages directory changes, as scanning
+every distribution's metadata costs tens of milliseconds.  Without a boot
+id (outside Linux) nothing is cached.
+"""
+
+import json
+import os
+import platform
+import sys
+from typing import Any, Dict, List, Optional
+
+BOOT_ID_PATH = "/proc/sys/kernel/random/boot_id"
+
+# sys.path directories whose contents change when distributions are installed
+_SITE_DIRS = ("site-packages", "dist-packages")
+
+
+def boot_id(path: str = BOOT_ID_PATH) -> Optional[str]:
+    """Return the kernel's id of the current boot, if it has one."""
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def site_fingerprint() -> List[List[Any]]:
+    """Return the modification times of the site-packages directories on sys.path."""
+    stamps = []
+    for entry in sys.path:
+        if os.path.basename(entry.rstrip(os.sep)) not in _SITE_DIRS:
+            continue
+        try:
+            stamps.append([entry, os.stat(entry).st_mtime_ns])
+        except OSError:
+            continue
+    return stamps
+
+
+def scan_entry_points(group: str) -> Dict[str, str]:
+    """Return the entry points of a group as {name: "module:attribute"}."""
+    from importlib.metadata import entry_points
+
+    if sys.version_info >= (3, 10):
+        selected = entry_points(group=group)
+    else:
+        # Python 3.9 returns a dict of groups
+        selected = entry_points().get(group, ())
+    return {entry.name: entry.value for entry in selected}
+
+
+class ProbeCache:
+    """Availability of backends and installed plugins as probed earlier in this boot.
+
+    ``settings`` holds whatever else availability depends on (configured
+    hwmon channels, for instance); a cache written under other settings, on
+    another host or in another boot is ignored and replaced.  An empty
+    ``path`` disables caching.
+    """
+
+    def __init__(self, path: str, settings: Dict[str, Any], boot: Optional[str] = None) -> None:
+        from py_power_profile import __version__
+
+        if boot is None:
+            boot = boot_id()
+        self.path = path if boot is not None else ""
+        self.key = {
+            "host": platform.node(),
+            "boot_id": boot,
+            "version": __version__,
+            "settings": settings,
+        }
+        self.available: Dict[str, bool] = {}
+        self._plugins: Dict[str, Any] = {}
+        self._changed = False
+        self._plugins_changed = False
+        data = self._read()
+        self.available = {
+            str(name): bool(available) for name, available in data.get("available", {}).items()
+        }
+        self._plugins = data.get("plugins", {})
+
+    def _read(self) -> Dict[str, Any]:
+        """Return the cache file's contents if it was written for this key."""
+        if not self.path:
+            return {}
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("key") != self.key:
+            return {}
+        return data
+
+    def known_unavailable(self, name: str) -> bool:
+        """Whether an earlier probe found the backend unavailable."""
+        return self.available.get(name) is False
+
+    def record(self, name: str, available: bool) -> None:
+        """Remember the outcome of probing a backend."""
+        if self.available.get(name) is not available:
+            self.available[name] = available
+            self._changed = True
+
+    def clear(self) -> None:
+        """Forget every probe result, e.g. after fixing counter permissions."""
+        if self.available:
+            self.available = {}
+            self._changed = True
+
+    def entry_points(self, group: str) -> Dict[str, str]:
+        """Return the entry points of a group, scanning only when packages changed."""
+        fingerprint = site_fingerprint()
+        groups = self._plugins.get("groups", {})
+        if self._plugins.get("fingerprint") == fingerprint and group in groups:
+            return dict(groups[group])
+
+        found = scan_entry_points(group)
+        if self._plugins.get("fingerprint") != fingerprint:
+            groups = {}
+        self._plugins = {"fingerprint": fingerprint, "groups": {**groups, group: found}}
+        self._plugins_changed = True
+        return found
+
+    def save(self) -> None:
+        """Write what changed; failures only cost a re-probe later.
+
+        Sections this instance did not change are kept as currently on disk,
+        so several caches can be open at once.
+        """
+        if not self.path or not (self._changed or self._plugins_changed):
+            return
+        from py_power_profile.utils import save_results
+
+        data = self._read()
+        data["key"] = self.key
+        if self._changed:
+            data["available"] = self.available
+        if self._plugins_changed:
+            data["plugins"] = self._plugins
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            save_results(data, self.path)
+        except OSError:
+            return
+        self._changed = False
+        self._plugins_changed = False
+
+
+def open_probe_cache() -> ProbeCache:
+    """Open the probe cache configured by ``probe_cache``."""
+    from py_power_profile.config import config
+
+    return ProbeCache(config.probe_cache, {"hwmon_channels": config.hwmon_channels})
@@ -0,0 +1,159 @@
+"""Apportion package-level energy to this process by its share of CPU time."""
+
+import os
+import threading
+from typing import List, Optional, Tuple
+
+from .base import BackendCapabilities, BaseBackend
+
+PROC_ROOT = "/proc"
+
+# Large enough for /proc/self/stat and the aggregate line of /proc/stat
+_PROC_READ_SIZE = 4096
+
+
+class ProportionalBackend(BaseBackend):
+    """Wrap a package-level backend and count only this process's share.
+
+    RAPL and hwmon measure everything running on the package or board.  This
+    backend re-reads the process's CPU time (``/proc/self/stat``) and the
+    system-wide busy time (``/proc/stat``) at most every ``interval_ms`` and
+    scales the wrapped counter's increments by the process's share of the
+    busy time over the previous interval.  Until the first interval has
+    elapsed the share is 1.
+    """
+
+    def __init__(
+        self,
+        backend: BaseBackend,
+        proc_root: str = PROC_ROOT,
+        interval_ms: float = 100.0,
+    ) -> None:
+        if interval_ms < 0:
+            raise ValueError("Share interval must not be negative")
+
+        self.backend = backend
+        self.interval_ns = int(interval_ms * 1e6)
+        self.share = 1.0
+        self._proc_root = proc_root
+        self._process_fd = -1
+        self._system_fd = -1
+        self._lock = threading.Lock()
+        self._energy_mj = 0.0
+        self._domain_energy_mj: List[float] = [0.0] * len(backend.get_domains())
+        self._last_raw: Optional[float] = None
+        self._last_domains: Tuple[float, ...] = ()
+        self._share_time = 0
+        self._last_ticks: Optional[Tuple[int, int]] = None
+        self._available = self._check_availability()
+
+    def _check_availability(self) -> bool:
+        """Open the /proc files and take the first CPU time reading."""
+        if not self.backend.is_available():
+            return False
+        try:
+            self._process_fd = os.open(
+                os.path.join(self._proc_root, "self", "stat"), os.O_RDONLY
+            )
+            self._system_fd = os.open(os.path.join(self._proc_root, "stat"), os.O_RDONLY)
+            self._last_ticks = self._read_ticks()
+        except (OSError, ValueError, IndexError):
+            self._close_proc_files()
+            return False
+        return True
+
+    def _read_ticks(self) -> Tuple[int, int]:
+        """Return (process CPU ticks, system busy ticks)."""
+        # Fields after the parenthesized command name start at the state;
+        # utime and stime are the 12th and 13th of them
+        fields = os.pread(self._process_fd, _PROC_READ_SIZE, 0).rsplit(b")", 1)[1].split()
+        process_ticks = int(fields[11]) + int(fields[12])
+
+        # cpu user nice system idle iowait irq softirq steal [guest guest_nice]
+        # (guest time is already included in user time)
+        line = os.pread(self._system_fd, _PROC_READ_SIZE, 0).split(b"\n", 1)[0]
+        times = [int(value) for value in line.split()[1:9]]
+        busy_ticks = sum(times) - times[3] - times[4]
+        return process_ticks, busy_ticks
+
+    def _update_share(self, timestamp_ns: int) -> None:
+        """Recompute the process's share of busy CPU time since the last update."""
+        self._share_time = timestamp_ns
+        try:
+            ticks = self._read_ticks()
+        except (OSError, ValueError, IndexError):
+            return
+        last = self._last_ticks
+        self._last_ticks = ticks
+        if last is None:
+            return
+        busy = ticks[1] - last[1]
+        if busy > 0:
+            self.share = min(1.0, max(0.0, (ticks[0] - last[0]) / busy))
+
+    def _advance(
+        self, timestamp_ns: int, energy_mj: float, domains_mj: Tuple[float, ...]
+    ) -> None:
+        """Add the share of the wrapped counters' increments since the last read."""
+        last = self._last_raw
+        if last is not None:
+            share = self.share
+            self._energy_mj += (energy_mj - last) * share
+            if domains_mj:
+                domain_energy = self._domain_energy_mj
+                for index, (value, previous) in enumerate(zip(domains_mj, self._last_domains)):
+                    domain_energy[index] += (value - previous) * share
+        self._last_raw = energy_mj
+        if domains_mj:
+            self._last_domains = domains_mj
+        if timestamp_ns - self._share_time >= self.interval_ns:
+            self._update_share(timestamp_ns)
+
+    def get_capabilities(self) -> BackendCapabilities:
+        """Return the capabilities of the wrapped backend."""
+        return self.backend.get_capabilities()
+
+    def get_domains(self) -> Tuple[str, ...]:
+        """Return the domains of the wrapped backend."""
+        return self.backend.get_domains()
+
+    def read_domains(self) -> Tuple[int, float, Tuple[float, ...]]:
+        """Read the apportioned total and per-domain energy in mJ."""
+        if not self._available:
+            raise RuntimeError("Proportional attribution not available")
+
+        with self._lock:
+            timestamp_ns, energy_mj, domains_mj = self.backend.read_domains()
+            self._advance(timestamp_ns, energy_mj, domains_mj)
+            return timestamp_ns, self._energy_mj, tuple(self._domain_energy_mj)
+
+    def read(self) -> Tuple[int, float]:
+        """Return a (timestamp_ns, energy_mj) snapshot of the apportioned counter."""
+        if not self._available:
+            raise RuntimeError("Proportional attribution not available")
+
+        with self._lock:
+            timestamp_ns, energy_mj = self.backend.read()
+            self._advance(timestamp_ns, energy_mj, ())
+            return timestamp_ns, self._energy_mj
+
+    def _close_proc_files(self) -> None:
+        """Close the /proc file descriptors."""
+        for fd in (self._process_fd, self._system_fd):
+            if fd >= 0:
+                os.close(fd)
+        self._process_fd = -1
+        self._system_fd = -1
+
+    def close(self) -> None:
+        """Close the /proc files and the wrapped backend."""
+        self._close_proc_files()
+        self.backend.close()
+
+    def is_available(self) -> bool:
+        """Check if the wrapped backend and the /proc files are available."""
+        return self._available
+
+    def get_name(self) -> str:
+        """Get the name of the wrapped backend."""
+        return self.backend.get_name()
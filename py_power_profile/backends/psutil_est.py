@@ -1,48 +1,56 @@
 """PSUTIL estimation backend as universal fallback."""
 
 import time
-from typing import Tuple
+from typing import Optional, Tuple
 
 import psutil
 
-from .base import BaseBackend
+from .base import BackendCapabilities, BaseBackend
+from .sampler import BackgroundSampler
 from ..config import config
 
 
 class PsutilEstBackend(BaseBackend):
-    """PSUTIL estimation backend using CPU usage and TDP."""
+    """PSUTIL estimation backend using CPU usage and TDP.
 
-    def __init__(self) -> None:
-        self._start_time: float = 0.0
-        self._start_cpu_percent: float = 0.0
-        self._tdp_watts = config.tdp_watts
+    CPU utilization is sampled on a background thread so that ``read()`` only
+    takes a timestamp; the energy counter at that instant is integrated from
+    the sampled power.
+    """
+
+    capabilities = BackendCapabilities(
+        measured=False, resolution_mj=0.0, update_period_ms=20.0, read_cost_us=1.0
+    )
 
-    def start(self) -> None:
-        """Start energy measurement."""
-        self._start_time = time.time()
-        # Get initial CPU usage
-        self._start_cpu_percent = psutil.cpu_percent(interval=0.1)
-
-    def stop(self) -> Tuple[float, float]:
-        """Stop energy measurement and return (energy_mj, time_ms)."""
-        end_time = time.time()
-        # Get final CPU usage
-        end_cpu_percent = psutil.cpu_percent(interval=0.1)
-        
-        # Calculate average CPU usage
-        avg_cpu_percent = (self._start_cpu_percent + end_cpu_percent) / 2
-        
-        # Estimate power consumption: TDP * CPU usage percentage
-        power_watts = (self._tdp_watts * avg_cpu_percent) / 100
-        
-        # Calculate time difference
-        time_diff_s = end_time - self._start_time
-        
-        # Convert to mJ: power_watts * time_s * 1000
-        energy_mj = power_watts * time_diff_s * 1000
-        time_diff_ms = time_diff_s * 1000
-        
-        return energy_mj, time_diff_ms
+    def __init__(self, sample_interval_ms: Optional[float] = None) -> None:
+        self._tdp_watts = config.tdp_watts
+        if sample_interval_ms is None:
+            sample_interval_ms = config.sample_interval_ms
+        self._sample_interval_ms = sample_interval_ms
+        self._sampler = BackgroundSampler(
+            self._read_power, interval_s=sample_interval_ms / 1000
+        )
+
+    def _read_power(self) -> float:
+        """Estimate power in mW from CPU usage since the previous sample."""
+        cpu_percent = psutil.cpu_percent(interval=None)
+        # Estimate power consumption: TDP * CPU usage percentage, in mW
+        return self._tdp_watts * cpu_percent * 10
+
+    def get_capabilities(self) -> BackendCapabilities:
+        """Return the capabilities, with the configured sampling period."""
+        return self.capabilities._replace(update_period_ms=self._sample_interval_ms)
+
+    def read(self) -> Tuple[int, float]:
+        """Return a (timestamp_ns, energy_mj) snapshot of the energy counter."""
+        if not self._sampler.running:
+            self._sampler.start()
+        timestamp_ns = time.monotonic_ns()
+        return timestamp_ns, self._sampler.energy_at(timestamp_ns)
+
+    def close(self) -> None:
+        """Stop the background sampler."""
+        self._sampler.stop()
 
     def is_available(self) -> bool:
         """Check if this backend is available on the current system."""
@@ -50,4 +58,4 @@ class PsutilEstBackend(BaseBackend):
 
     def get_name(self) -> str:
         """Get the name of this backend."""
-        return "psutil_est" 
\ No newline at end of file
+        return "psutil_est"
@@ -1,18 +1,21 @@
 """RAPL backend for Intel/AMD processors."""
 
 import time
-from typing import Tuple
+from typing import Any, Tuple
 
-from .base import BaseBackend
+from .base import BackendCapabilities, BaseBackend
 
 
 class RAPLBackend(BaseBackend):
     """RAPL (Running Average Power Limit) backend for Intel/AMD processors."""
 
+    # Same counters as powercap, but every sample goes through pyRAPL's readers
+    capabilities = BackendCapabilities(
+        measured=True, resolution_mj=0.001, update_period_ms=1.0, read_cost_us=50.0
+    )
+
     def __init__(self) -> None:
-        self._start_time: float = 0.0
-        self._start_energy: float = 0.0
-        self._rapl = None
+        self._rapl: Any = None
         self._available = self._check_availability()
 
     def _check_availability(self) -> bool:
@@ -21,39 +24,21 @@ class RAPLBackend(BaseBackend):
             import pyRAPL
             # Try to initialize RAPL
             pyRAPL.setup()
+            # Keep the module so reads don't go through the import machinery
+            self._rapl = pyRAPL
             return True
         except (ImportError, OSError, RuntimeError):
             return False
 
-    def start(self) -> None:
-        """Start energy measurement."""
+    def read(self) -> Tuple[int, float]:
+        """Return a (timestamp_ns, energy_mj) snapshot of the energy counter."""
         if not self._available:
             raise RuntimeError("RAPL backend not available")
-        
-        try:
-            import pyRAPL
-            self._start_time = time.time()
-            self._start_energy = pyRAPL.RAPLMonitor.sample()
-        except Exception as e:
-            raise RuntimeError(f"Failed to start RAPL measurement: {e}")
 
-    def stop(self) -> Tuple[float, float]:
-        """Stop energy measurement and return (energy_mj, time_ms)."""
-        if not self._available:
-            raise RuntimeError("RAPL backend not available")
-        
         try:
-            import pyRAPL
-            end_time = time.time()
-            end_energy = pyRAPL.RAPLMonitor.sample()
-            
-            # Calculate energy difference in mJ
-            energy_diff = end_energy - self._start_energy
-            time_diff_ms = (end_time - self._start_time) * 1000
-            
-            return energy_diff, time_diff_ms
+            return time.monotonic_ns(), self._rapl.RAPLMonitor.sample()
         except Exception as e:
-            raise RuntimeError(f"Failed to stop RAPL measurement: {e}")
+            raise RuntimeError(f"Failed to read RAPL energy counter: {e}")
 
     def is_available(self) -> bool:
         """Check if this backend is available on the current system."""
@@ -61,4 +46,4 @@ class RAPLBackend(BaseBackend):
 
     def get_name(self) -> str:
         """Get the name of this backend."""
-        return "rapl" 
\ No newline at end of file
+        return "rapl"
@@ -0,0 +1,139 @@
+"""Background power sampler backed by a fixed-size ring buffer."""
+
+import threading
+import time
+from array import array
+from typing import Callable, Optional
+
+
+class BackgroundSampler:
+    """Sample a power source on a daemon thread and integrate it on demand.
+
+    ``read_power`` is called every ``interval_s`` seconds and must return the
+    average power in mW since the previous call.  Each sample is stored in a
+    ring buffer together with the cumulative energy up to that sample, so the
+    energy between any two timestamps still held in the buffer is a pair of
+    binary searches away.  The counter never runs ahead of the newest sample,
+    so successive readings never decrease.
+    """
+
+    def __init__(
+        self,
+        read_power: Callable[[], float],
+        interval_s: float = 0.02,
+        capacity: int = 4096,
+    ) -> None:
+        if interval_s <= 0:
+            raise ValueError("Sampling interval must be positive")
+        if capacity < 2:
+            raise ValueError("Ring buffer capacity must be at least 2")
+
+        self._read_power = read_power
+        self.interval_s = interval_s
+        self.capacity = capacity
+
+        # Parallel ring buffer columns: sample timestamp, power over the
+        # interval ending at that timestamp and cumulative energy in mJ.
+        self._timestamps = array("q", bytes(8 * capacity))
+        self._power_mw = array("d", bytes(8 * capacity))
+        self._energy_mj = array("d", bytes(8 * capacity))
+        self._count = 0
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """Whether the sampling thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the sampling thread if it is not already running."""
+        with self._lock:
+            if self.running:
+                return
+            self._stop_event.clear()
+            # The first reading seeds the source (e.g. psutil's CPU baseline)
+            # and anchors the buffer at zero energy.
+            power_mw = self._read_power()
+            self._append(time.monotonic_ns(), power_mw)
+            self._thread = threading.Thread(
+                target=self._run, name="py-power-sampler", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the sampling thread."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._stop_event.set()
+            thread.join()
+
+    def _run(self) -> None:
+        """Sampling loop executed on the background thread."""
+        while not self._stop_event.wait(self.interval_s):
+            try:
+                power_mw = self._read_power()
+            except Exception:
+                continue
+            self._append(time.monotonic_ns(), power_mw)
+
+    def _append(self, timestamp_ns: int, power_mw: float) -> None:
+        """Append a sample, overwriting the oldest one when full."""
+        count = self._count
+        if count:
+            prev = (count - 1) % self.capacity
+            dt_s = (timestamp_ns - self._timestamps[prev]) / 1e9
+            energy_mj = self._energy_mj[prev] + power_mw * dt_s
+        else:
+            energy_mj = 0.0
+
+        slot = count % self.capacity
+        self._timestamps[slot] = timestamp_ns
+        self._power_mw[slot] = power_mw
+        self._energy_mj[slot] = energy_mj
+        # Publish the sample only once all of its columns are written.
+        self._count = count + 1
+
+    def energy_at(self, timestamp_ns: int) -> float:
+        """Return the cumulative energy in mJ at a monotonic timestamp.
+
+        Timestamps between two samples are interpolated with the power of the
+        interval that contains them.  Timestamps past the newest sample read
+        the newest sample's energy: extrapolating with its power would run
+        ahead of the next sample whenever power drops, and the counter would
+        step backwards.
+        """
+        count = self._count
+        if not count:
+            return 0.0
+
+        capacity = self.capacity
+        oldest = max(0, count - capacity)
+        timestamps = self._timestamps
+
+        # Binary search for the last sample taken at or before timestamp_ns.
+        lo, hi = oldest, count - 1
+        if timestamps[lo % capacity] > timestamp_ns:
+            # Older than anything retained: clamp to the oldest sample.
+            return self._energy_mj[lo % capacity]
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if timestamps[mid % capacity] <= timestamp_ns:
+                lo = mid
+            else:
+                hi = mid - 1
+
+        slot = lo % capacity
+        base_energy = self._energy_mj[slot]
+        if lo + 1 == count:
+            return base_energy
+        power_mw = self._power_mw[(lo + 1) % capacity]
+        return base_energy + power_mw * (timestamp_ns - timestamps[slot]) / 1e9
+
+    def energy_between(self, start_ns: int, end_ns: int) -> float:
+        """Return the energy in mJ integrated between two timestamps."""
+        return self.energy_at(end_ns) - self.energy_at(start_ns)
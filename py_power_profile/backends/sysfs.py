@@ -0,0 +1,149 @@
+"""Low-level sysfs counter readers for powercap (RAPL) and hwmon sensors."""
+
+import glob
+import os
+import re
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+POWERCAP_ROOT = "/sys/class/powercap"
+HWMON_ROOT = "/sys/class/hwmon"
+
+# Large enough for any integer sysfs attribute plus its trailing newline
+_BUFFER_SIZE = 32
+
+# os.preadv fills a preallocated buffer; os.pread allocates a new bytes object
+_HAS_PREADV = hasattr(os, "preadv")
+
+
+class SysfsCounter:
+    """Integer sysfs attribute read through a persistent file descriptor.
+
+    The file is opened once and re-read with a single positional read into a
+    preallocated buffer.  When ``max_range`` is given the attribute is treated
+    as a wrapping counter (e.g. RAPL ``energy_uj`` with
+    ``max_energy_range_uj``) and ``read()`` returns a monotonic total.
+    """
+
+    def __init__(self, path: str, max_range: Optional[int] = None) -> None:
+        self.path = str(path)
+        self.max_range = max_range
+        self._fd = os.open(self.path, os.O_RDONLY)
+        self._buffer = bytearray(_BUFFER_SIZE)
+        self._buffers = [self._buffer]
+        self._last_raw: Optional[int] = None
+        self._total = 0
+
+    def read_raw(self) -> int:
+        """Return the current value of the attribute."""
+        if _HAS_PREADV:
+            size = os.preadv(self._fd, self._buffers, 0)
+            return int(self._buffer[:size])
+        return int(os.pread(self._fd, _BUFFER_SIZE, 0))
+
+    def read(self) -> int:
+        """Return the counter value, corrected for wraparound."""
+        raw = self.read_raw()
+        last = self._last_raw
+        if last is None:
+            self._total = raw
+        else:
+            delta = raw - last
+            if delta < 0 and self.max_range:
+                delta += self.max_range
+            self._total += delta
+        self._last_raw = raw
+        return self._total
+
+    def close(self) -> None:
+        """Close the underlying file descriptor."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __del__(self) -> None:
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def read_attribute(path: Path) -> Optional[str]:
+    """Read a small sysfs attribute, returning None if it is unreadable."""
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def open_rapl_counter(zone_dir: str) -> SysfsCounter:
+    """Open the ``energy_uj`` counter of a powercap zone directory."""
+    zone = Path(zone_dir)
+    max_range = read_attribute(zone / "max_energy_range_uj")
+    return SysfsCounter(
+        str(zone / "energy_uj"), int(max_range) if max_range else None
+    )
+
+
+def find_rapl_zones(root: str = POWERCAP_ROOT) -> List[str]:
+    """Return readable RAPL zone directories (``intel-rapl:*``) under root."""
+    zones = []
+    for zone_dir in sorted(glob.glob(os.path.join(root, "intel-rapl:*"))):
+        if os.access(os.path.join(zone_dir, "energy_uj"), os.R_OK):
+            zones.append(zone_dir)
+    return zones
+
+
+def find_hwmon_power_files(root: str = HWMON_ROOT) -> List[str]:
+    """Return hwmon ``power*_input`` files under root."""
+    return sorted(glob.glob(os.path.join(root, "hwmon*", "power*_input")))
+
+
+class HwmonChannel(NamedTuple):
+    """A power or energy channel of a hwmon device."""
+
+    # "<device name>/<channel label>", e.g. "ina3221/VDD_CPU"
+    name: str
+    # "energy" (cumulative uJ) or "power" (instantaneous uW)
+    kind: str
+    path: str
+    # Sensor update interval of the device in ms, if it reports one
+    update_interval_ms: Optional[float]
+
+
+_CHANNEL_INPUT = re.compile(r"(energy|power)(\d+)_input$")
+
+
+def find_hwmon_channels(root: str = HWMON_ROOT) -> List[HwmonChannel]:
+    """Return the energy and power channels of every hwmon device under root.
+
+    Channels are named after the device's ``name`` and the channel's
+    ``*_label``, falling back to the directory and attribute names.  A
+    channel with both an ``energy*_input`` counter and a ``power*_input``
+    reading is returned once, as its energy counter.
+    """
+    channels = []
+    for device_dir in sorted(glob.glob(os.path.join(root, "hwmon*"))):
+        device = Path(device_dir)
+        device_name = read_attribute(device / "name") or device.name
+        interval = read_attribute(device / "update_interval")
+        update_interval_ms = float(interval) if interval and interval.isdigit() else None
+
+        inputs = {}
+        for path in sorted(device.glob("*_input")):
+            match = _CHANNEL_INPUT.match(path.name)
+            if match:
+                inputs[(match.group(1), match.group(2))] = path
+
+        for (kind, index), path in sorted(inputs.items()):
+            if kind == "power" and ("energy", index) in inputs:
+                continue
+            label = read_attribute(device / f"{kind}{index}_label")
+            if label is None and kind == "energy":
+                label = read_attribute(device / f"power{index}_label")
+            channels.append(
+                HwmonChannel(
+                    f"{device_name}/{label or kind + index}", kind, str(path), update_interval_ms
+                )
+            )
+    return channels
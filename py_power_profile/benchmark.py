@@ -0,0 +1,263 @@
+"""Energy benchmarks of single callables, modeled on timeit and pyperf.
+
+``bench()`` calls a function in batches (``loops`` calls per sample), sized
+so that every sample spans many updates of the energy counter: RAPL counters
+only tick about once per millisecond, so a single call is usually far below
+their resolution.  Idle power measured before the samples is subtracted, so
+the figures are the energy the calls add on top of an idle machine.
+
+Results use the same JSON layout as ``profile`` (one function row holding
+the mean energy of a single call, plus per-sample ``samples`` as written by
+``--repeat``), so ``compare`` and ``badge`` work on them.
+"""
+
+import importlib
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, cast
+
+from .backends import BaseBackend
+from .tracer import CALIBRATION_CALLS, HAS_MONITORING, EnergyTracer
+
+# Counter updates every sample should span at least
+COUNTER_UPDATES = 100
+# Shortest sample, in ms, whatever the counter resolution
+MIN_SAMPLE_MS = 100.0
+# Longest time spent looking for counter updates, in ms
+PERIOD_TIMEOUT_MS = 50.0
+# Assumed update period when the counter does not tick while probed
+DEFAULT_PERIOD_NS = 1_000_000
+
+
+def load_callable(target: str) -> Callable[[], Any]:
+    """Import ``module:callable``; the callable may be dotted (``mod:Class.method``).
+
+    Like ``python -m timeit``, the current directory is importable.
+    """
+    module_name, sep, attr = target.partition(":")
+    if not sep or not module_name or not attr:
+        raise ValueError(f"Benchmark target must be module:callable, got {target!r}")
+    if os.getcwd() not in sys.path and "" not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    obj: Any = importlib.import_module(module_name)
+    for part in attr.split("."):
+        obj = getattr(obj, part)
+    if not callable(obj):
+        raise ValueError(f"Benchmark target is not callable: {target}")
+    return cast("Callable[[], Any]", obj)
+
+
+def counter_period_ns(backend: BaseBackend, timeout_ms: float = PERIOD_TIMEOUT_MS) -> int:
+    """Estimate how often the energy counter of a backend changes.
+
+    Spins on ``read()`` until the counter has changed twice and returns the
+    time between the changes, or ``DEFAULT_PERIOD_NS`` if it did not change
+    within the timeout.
+    """
+    deadline = time.monotonic_ns() + int(timeout_ms * 1e6)
+    _, last_mj = backend.read()
+    changes: List[int] = []
+    while len(changes) < 2:
+        timestamp_ns, energy_mj = backend.read()
+        if energy_mj != last_mj:
+            changes.append(timestamp_ns)
+            last_mj = energy_mj
+        elif timestamp_ns > deadline:
+            return DEFAULT_PERIOD_NS
+    return max(changes[1] - changes[0], 1)
+
+
+def _run_loops(func: Callable[..., Any], args: Tuple[Any, ...], loops: int) -> None:
+    """Call func loops times."""
+    for _ in range(loops):
+        func(*args)
+
+
+def calibrate_loops(func: Callable[..., Any], args: Tuple[Any, ...], min_sample_ns: int) -> int:
+    """Find a loop count whose batch takes at least min_sample_ns, as timeit.autorange."""
+    loops = 1
+    while True:
+        for multiplier in (1, 2, 5):
+            count = loops * multiplier
+            start = time.perf_counter_ns()
+            _run_loops(func, args, count)
+            if time.perf_counter_ns() - start >= min_sample_ns:
+                return count
+        loops *= 10
+
+
+def idle_power_w(backend: BaseBackend, duration_ns: int) -> float:
+    """Measure the average power of the idle machine over duration_ns."""
+    start_ns, start_mj = backend.read()
+    time.sleep(duration_ns / 1e9)
+    end_ns, end_mj = backend.read()
+    # mJ per ms is W
+    return (end_mj - start_mj) / ((end_ns - start_ns) / 1e6) if end_ns > start_ns else 0.0
+
+
+def bench(
+    func: Callable[..., Any],
+    *args: Any,
+    backend: Optional[BaseBackend] = None,
+    samples: int = 20,
+    warmups: int = 2,
+    min_sample_ms: float = MIN_SAMPLE_MS,
+    loops: Optional[int] = None,
+    subtract_idle: bool = True,
+    name: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Measure the energy of calling ``func(*args)``.
+
+    Each of the ``samples`` measurements times ``loops`` calls, which by
+    default are calibrated so a sample lasts at least ``min_sample_ms`` and
+    ``COUNTER_UPDATES`` counter updates.  ``warmups`` samples run first and
+    are discarded.  Without a backend, the best available one is used and
+    closed afterwards.
+    """
+    if samples < 2:
+        raise ValueError("At least 2 samples are needed")
+    if warmups < 0:
+        raise ValueError("Warmup count cannot be negative")
+    if loops is not None and loops < 1:
+        raise ValueError("Loop count must be at least 1")
+
+    owns_backend = backend is None
+    if backend is None:
+        from .utils import get_backend
+
+        backend = get_backend("auto")
+    try:
+        period_ns = counter_period_ns(backend)
+        min_sample_ns = max(int(min_sample_ms * 1e6), COUNTER_UPDATES * period_ns)
+        if loops is None:
+            loops = calibrate_loops(func, args, min_sample_ns)
+        for _ in range(warmups):
+            _run_loops(func, args, loops)
+
+        idle_w = idle_power_w(backend, min_sample_ns) if subtract_idle else 0.0
+
+        energies: List[float] = []
+        times: List[float] = []
+        for _ in range(samples):
+            start_ns, start_mj = backend.read()
+            _run_loops(func, args, loops)
+            end_ns, end_mj = backend.read()
+            elapsed_ms = (end_ns - start_ns) / 1e6
+            energies.append((end_mj - start_mj - idle_w * elapsed_ms) / loops)
+            times.append(elapsed_ms / loops)
+        backend_name = backend.get_name()
+    finally:
+        if owns_backend:
+            backend.close()
+
+    if name is None:
+        name = f"{getattr(func, '__module__', None) or '?'}:{getattr(func, '__qualname__', repr(func))}"
+    return benchmark_results(
+        name,
+        energies,
+        times,
+        {
+            "backend": backend_name,
+            "loops": loops,
+            "warmups": warmups,
+            "counter_period_ms": period_ns / 1e6,
+            "idle_power_w": idle_w,
+        },
+    )
+
+
+def benchmark_results(
+    name: str, energies: List[float], times: List[float], settings: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Build profile-style results from per-call energy and time samples."""
+    mean_mj = statistics.mean(energies)
+    mean_ms = statistics.mean(times)
+    median_mj = statistics.median(energies)
+    # The sample closest to the median stands for the benchmark, as with --repeat
+    representative = min(range(len(energies)), key=lambda i: abs(energies[i] - median_mj))
+    return {
+        "metadata": {
+            "backend": settings["backend"],
+            "line_level": False,
+            "mode": "bench",
+            "domains": [],
+            "timestamp": time.time(),
+        },
+        "functions": {
+            name: {
+                # Figures are per call
+                "calls": 1,
+                "total_energy_mj": mean_mj,
+                "total_time_ms": mean_ms,
+                "self_energy_mj": mean_mj,
+                "self_time_ms": mean_ms,
+                "avg_energy_mj": mean_mj,
+                "avg_time_ms": mean_ms,
+                "min_energy_mj": min(energies),
+                "max_energy_mj": max(energies),
+            }
+        },
+        "summary": {
+            "total_energy_mj": mean_mj,
+            "total_time_ms": mean_ms,
+            "function_count": 1,
+        },
+        "benchmark": {
+            "name": name,
+            "samples": len(energies),
+            "mean_energy_mj": mean_mj,
+            "median_energy_mj": median_mj,
+            "stdev_energy_mj": statistics.stdev(energies),
+            "mean_time_ms": mean_ms,
+            "median_time_ms": statistics.median(times),
+            "stdev_time_ms": statistics.stdev(times),
+            **{key: value for key, value in settings.items() if key != "backend"},
+        },
+        "samples": {
+            "runs": len(energies),
+            "representative_run": representative,
+            "total_energy_mj": list(energies),
+            "functions": {name: list(energies)},
+        },
+    }
+
+
+# Tracer options measured by tracer_overhead(), besides the plain tracer
+OVERHEAD_OPTIONS = ((), ("call_paths",), ("async_mode",))
+
+
+def tracer_overhead(
+    backend: BaseBackend, calls: int = CALIBRATION_CALLS, rounds: int = 5
+) -> Dict[str, Any]:
+    """Calibrate the tracer in every engine and option set, to track its cost.
+
+    Each configuration reports what ``EnergyTracer.calibrate()`` measures:
+    the cost of a counter read and the per-call cost inside (``inner``) and
+    outside (``outer``) a call's measurement window.
+    """
+    from . import __version__
+
+    engines = ["settrace", "monitoring"] if HAS_MONITORING else ["settrace"]
+    configurations = []
+    for engine in engines:
+        for options in OVERHEAD_OPTIONS:
+            tracer = EnergyTracer(
+                backend,
+                engine=engine,
+                call_paths="call_paths" in options,
+                async_mode="async_mode" in options,
+            )
+            configurations.append(
+                {"options": list(options), **tracer.calibrate(calls=calls, rounds=rounds)}
+            )
+    return {
+        "version": __version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "backend": backend.get_name(),
+        "timestamp": time.time(),
+        "configurations": configurations,
+    }
@@ -0,0 +1,35 @@
+"""Start py-power-profile tracing in child interpreters of a profiled run.
+
+This directory is put on ``PYTHONPATH`` by ``py-power profile
+--follow-children``.  A ``sitecustomize`` module of the environment that it
+shadows is still imported afterwards.
+"""
+
+import os
+import sys
+
+
+def _bootstrap() -> None:
+    try:
+        from py_power_profile.children import bootstrap
+    except Exception as e:
+        print(f"Warning: Could not profile child process: {e}", file=sys.stderr)
+        return
+    bootstrap()
+
+
+def _import_shadowed_sitecustomize() -> None:
+    here = os.path.dirname(os.path.abspath(__file__))
+    module = sys.modules.pop(__name__)
+    saved_path = sys.path[:]
+    sys.path[:] = [p for p in sys.path if os.path.abspath(p or os.curdir) != here]
+    try:
+        import sitecustomize  # noqa: F401
+    except ImportError:
+        sys.modules[__name__] = module
+    finally:
+        sys.path[:] = saved_path
+
+
+_bootstrap()
+_import_shadowed_sitecustomize()
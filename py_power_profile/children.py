@@ -0,0 +1,300 @@
+"""Profiling of child processes started by the profiled program.
+
+Child interpreters (``subprocess``, ``multiprocessing`` spawn/forkserver)
+find a ``sitecustomize`` module on ``PYTHONPATH`` that starts a tracer with
+the options of the parent run; forked children swap the inherited tracer for
+a fresh one.  Every child writes its results as a JSON shard named after its
+pid when it exits, and the parent merges the shards into its own results.
+"""
+
+import atexit
+import json
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Directory receiving the per-process result shards
+CHILD_DIR_ENV = "PY_POWER_CHILD_DIR"
+# JSON-encoded tracer options for child processes
+CHILD_OPTIONS_ENV = "PY_POWER_CHILD_OPTIONS"
+
+# Directory holding the sitecustomize module that bootstraps child tracing
+BOOTSTRAP_DIR = str(Path(__file__).parent / "bootstrap")
+
+_PACKAGE_PARENT = str(Path(__file__).parent.parent)
+
+# Tracer started in this process because it is a profiled child
+_child_tracer: Any = None
+# Tracer of the parent run, replaced in forked children
+_parent_tracer: Any = None
+_fork_hook_registered = False
+_saved_environ: Dict[str, Optional[str]] = {}
+
+
+def enable_child_tracing(tracer: Any, options: Dict[str, Any]) -> str:
+    """Make processes started from now on trace themselves.
+
+    ``options`` are the keyword arguments of the child tracers plus the
+    ``backend`` name.  Returns the directory the children write shards to.
+    """
+    global _parent_tracer
+
+    shard_dir = tempfile.mkdtemp(prefix="py-power-children-")
+    _saved_environ.clear()
+    for name in (CHILD_DIR_ENV, CHILD_OPTIONS_ENV, "PYTHONPATH"):
+        _saved_environ[name] = os.environ.get(name)
+
+    pythonpath = [BOOTSTRAP_DIR, _PACKAGE_PARENT]
+    if os.environ.get("PYTHONPATH"):
+        pythonpath.append(os.environ["PYTHONPATH"])
+    os.environ["PYTHONPATH"] = os.pathsep.join(pythonpath)
+    os.environ[CHILD_DIR_ENV] = shard_dir
+    os.environ[CHILD_OPTIONS_ENV] = json.dumps(options)
+
+    _parent_tracer = tracer
+    _register_fork_hook()
+    return shard_dir
+
+
+def disable_child_tracing() -> None:
+    """Restore the environment changed by enable_child_tracing()."""
+    global _parent_tracer
+
+    _parent_tracer = None
+    for name, value in _saved_environ.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+    _saved_environ.clear()
+
+
+def collect_child_results(shard_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Load the shards written by child processes and remove the directory."""
+    children = {}
+    try:
+        for path in sorted(Path(shard_dir).glob("*.json")):
+            try:
+                with open(path, "r") as f:
+                    shard = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not read child results {path}: {e}", file=sys.stderr)
+                continue
+            children[path.stem] = shard
+    finally:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+    return children
+
+
+def merge_child_results(results: Dict[str, Any], children: Dict[str, Dict[str, Any]]) -> None:
+    """Merge child shards into the parent's results.
+
+    The ``functions``, ``call_paths`` and ``lines`` of every process are
+    summed into the top-level tables and the summary is recomputed from
+    them; ``processes`` keeps a breakdown keyed by pid.  With package-level counters such as RAPL, processes that
+    ran at the same time are all credited with the shared energy.
+    """
+    processes = {
+        str(os.getpid()): _process_summary(
+            results, {"pid": os.getpid(), "ppid": os.getppid(), "argv": list(sys.argv)}
+        )
+    }
+    functions = results.setdefault("functions", {})
+    for pid, shard in children.items():
+        processes[pid] = _process_summary(shard, shard.get("process", {}))
+        for func_key, stats in shard.get("functions", {}).items():
+            if func_key in functions:
+                _merge_function(functions[func_key], stats)
+            else:
+                functions[func_key] = dict(stats)
+
+        if "call_paths" in shard:
+            call_paths = results.setdefault("call_paths", {})
+            for path, stats in shard["call_paths"].items():
+                if path in call_paths:
+                    for field, value in stats.items():
+                        call_paths[path][field] += value
+                else:
+                    call_paths[path] = dict(stats)
+
+        if "lines" in shard:
+            lines = results.setdefault("lines", {})
+            for line_key, stats in shard["lines"].items():
+                if line_key in lines:
+                    for field in ("hits", "energy_mj", "time_ms"):
+                        lines[line_key][field] += stats[field]
+                else:
+                    lines[line_key] = dict(stats)
+
+    summary = results.setdefault("summary", {})
+    summary["total_energy_mj"] = sum(
+        stats.get("self_energy_mj", stats["total_energy_mj"]) for stats in functions.values()
+    )
+    summary["total_time_ms"] = sum(
+        stats.get("self_time_ms", stats["total_time_ms"]) for stats in functions.values()
+    )
+    summary["function_count"] = len(functions)
+    summary["process_count"] = len(processes)
+    results["processes"] = processes
+
+
+def _process_summary(results: Dict[str, Any], process: Dict[str, Any]) -> Dict[str, Any]:
+    """Summarize the results of one process."""
+    summary = results.get("summary", {})
+    return {
+        "ppid": process.get("ppid"),
+        "argv": process.get("argv", []),
+        "total_energy_mj": summary.get("total_energy_mj", 0.0),
+        "total_time_ms": summary.get("total_time_ms", 0.0),
+        "function_count": summary.get("function_count", 0),
+        "functions": {
+            func_key: {
+                "calls": stats["calls"],
+                "total_energy_mj": stats["total_energy_mj"],
+                "self_energy_mj": stats.get("self_energy_mj", stats["total_energy_mj"]),
+            }
+            for func_key, stats in results.get("functions", {}).items()
+        },
+    }
+
+
+def _merge_function(into: Dict[str, Any], other: Dict[str, Any]) -> None:
+    """Add one process's statistics of a function to another's."""
+    for field in ("calls", "total_energy_mj", "total_time_ms", "self_energy_mj", "self_time_ms"):
+        if field in other:
+            into[field] = into.get(field, 0) + other[field]
+    calls = into["calls"]
+    into["avg_energy_mj"] = into["total_energy_mj"] / calls if calls else 0.0
+    into["avg_time_ms"] = into["total_time_ms"] / calls if calls else 0.0
+    into["min_energy_mj"] = min(into["min_energy_mj"], other["min_energy_mj"])
+    into["max_energy_mj"] = max(into["max_energy_mj"], other["max_energy_mj"])
+    if "energy_by_domain" in other:
+        domains = into.setdefault("energy_by_domain", {})
+        for domain, value in other["energy_by_domain"].items():
+            domains[domain] = domains.get(domain, 0.0) + value
+
+
+def bootstrap() -> None:
+    """Start tracing in a child interpreter; called from sitecustomize."""
+    if _child_tracer is None and os.environ.get(CHILD_DIR_ENV):
+        _start_child_tracer()
+    _register_fork_hook()
+
+
+def _register_fork_hook() -> None:
+    """Replace the inherited tracer in children created with os.fork()."""
+    global _fork_hook_registered
+
+    if not _fork_hook_registered and hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_after_fork_in_child)
+        _fork_hook_registered = True
+
+
+def _after_fork_in_child() -> None:
+    """Stop the tracer copied from the parent and trace the child afresh."""
+    global _child_tracer, _parent_tracer
+
+    if not os.environ.get(CHILD_DIR_ENV):
+        return
+    for inherited in (_child_tracer, _parent_tracer):
+        if inherited is not None:
+            try:
+                inherited.stop()
+            except Exception:
+                pass
+    _child_tracer = None
+    _parent_tracer = None
+    _start_child_tracer()
+
+
+def _start_child_tracer() -> None:
+    """Start a tracer for this process and write its shard at exit."""
+    global _child_tracer
+
+    from .config import config
+    from .tracer import EnergyTracer
+    from .utils import apply_attribution, get_backend
+
+    try:
+        options = json.loads(os.environ.get(CHILD_OPTIONS_ENV) or "{}")
+        include = options.pop("include", None)
+        if include is not None:
+            config.include_patterns = include
+        calibration = options.pop("calibration", None)
+        backend = apply_attribution(
+            get_backend(options.pop("backend", "auto")), options.pop("attribution", "full")
+        )
+        if not backend.is_available():
+            return
+        tracer = EnergyTracer(backend, **options)
+        tracer.calibration = calibration
+    except Exception as e:
+        print(f"Warning: Could not profile child process: {e}", file=sys.stderr)
+        return
+
+    _child_tracer = tracer
+    atexit.register(_write_shard)
+    register_thread_atexit = getattr(threading, "_register_atexit", None)
+    if register_thread_atexit is not None:
+        # Forked multiprocessing children leave through os._exit(), which
+        # skips atexit but not the threading shutdown hooks
+        try:
+            register_thread_atexit(_write_shard)
+        except RuntimeError:
+            pass
+    if (
+        threading.current_thread() is threading.main_thread()
+        and signal.getsignal(signal.SIGTERM) is signal.SIG_DFL
+    ):
+        # Pool.terminate() and friends: exit cleanly so the shard is written
+        signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    tracer.start()
+
+
+def _exit_on_sigterm(signum: int, frame: Any) -> None:
+    """SIGTERM handler of profiled children."""
+    if _child_tracer is None:
+        # Already exiting: Pool.terminate() often lands while the shard of
+        # a worker that just finished is being written
+        return
+    sys.exit(128 + signum)
+
+
+def _write_shard() -> None:
+    """Stop the child tracer and write its results to the shard directory."""
+    global _child_tracer
+
+    # Cleared first, so a SIGTERM from here on cannot interrupt the write
+    tracer = _child_tracer
+    _child_tracer = None
+    shard_dir = os.environ.get(CHILD_DIR_ENV)
+    if tracer is None or not shard_dir:
+        return
+    if not os.path.isdir(shard_dir):
+        # The parent run already collected the shards
+        tracer.stop()
+        tracer.backend.close()
+        return
+
+    try:
+        tracer.stop()
+        results = tracer.get_results()
+        results["process"] = {
+            "pid": os.getpid(),
+            "ppid": os.getppid(),
+            "argv": list(sys.argv),
+        }
+        path = os.path.join(shard_dir, f"{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(results, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Warning: Could not write child profile: {e}", file=sys.stderr)
+    finally:
+        tracer.backend.close()
@@ -1,37 +1,106 @@
-"""Command-line interface for py-power-profile."""
+"""Command-line interface for py-power-profile.
+
+Only typer is imported at startup: every command imports what it needs
+itself, so ``py-power version`` or ``--help`` do not pay for rich, the
+tracer or the backends.
+"""
 
-import sys
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, List, Optional, cast
 
 import typer
-from rich.console import Console
 
-from .backends import MockBackend
-from .badge import BadgeGenerator
-from .config import config
-from .reporter import Reporter
-from .tracer import EnergyTracer
-from .utils import get_backend, load_results, save_results, run_script
+if TYPE_CHECKING:
+    from rich.console import Console
 
 app = typer.Typer(
     name="py-power",
     help="Profile and visualize energy consumption of Python code",
     add_completion=False,
 )
-console = Console()
+
+
+class _LazyConsole:
+    """Stand-in for a rich Console, created on first use."""
+
+    def __init__(self) -> None:
+        self._console: Any = None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._console is None:
+            from rich.console import Console
+
+            self._console = Console()
+        return getattr(self._console, name)
+
+
+# Typed as the Console it stands in for, e.g. when handed to Reporter
+console = cast("Console", _LazyConsole())
+
+OUTPUT_FORMATS = ("table", "flamegraph", "collapsed")
 
 
 @app.command()
 def profile(
     script: str = typer.Argument(..., help="Python script to profile"),
-    output: Optional[str] = typer.Option(None, "--output", "-o", help="Output JSON file"),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Output file: JSON results, or the --format output"),
+    output_format: str = typer.Option("table", "--format", "-f", help="Output format: table (JSON with --output), flamegraph (SVG) or collapsed stacks"),
     backend: str = typer.Option("auto", "--backend", "-b", help="Energy measurement backend"),
     line: bool = typer.Option(False, "--line", help="Enable line-level profiling"),
+    line_top: Optional[int] = typer.Option(None, "--line-top", help="Rank functions in a function-level run first, then line-profile only the N hottest (trace mode)"),
+    mode: str = typer.Option("trace", "--mode", "-m", help="Profiling mode: trace or sample"),
+    sample_interval: float = typer.Option(10.0, "--sample-interval", help="Sampling interval in ms (sample mode)"),
+    max_overhead: float = typer.Option(5.0, "--max-overhead", help="Maximum sampling overhead in percent (sample mode)"),
+    engine: str = typer.Option("auto", "--engine", help="Tracing engine: auto, settrace or monitoring (trace mode)"),
+    call_limit: Optional[int] = typer.Option(None, "--call-limit", help="Stop measuring a function after this many calls (trace mode)"),
+    asyncio_mode: bool = typer.Option(False, "--asyncio", help="Attribute energy to asyncio tasks and report event loop idle time (trace mode)"),
+    follow_children: bool = typer.Option(False, "--follow-children", help="Also profile child processes and merge their results (trace mode)"),
+    attribution: str = typer.Option("full", "--attribution", help="Energy attribution: full, or proportional to this process's share of CPU time"),
+    record: Optional[str] = typer.Option(None, "--record", help="Stream raw call events to this trace log and aggregate it (trace mode)"),
+    timeline: Optional[str] = typer.Option(None, "--timeline", help="Record power over time, tagged with the active stack, to this CSV file"),
+    timeline_interval: float = typer.Option(10.0, "--timeline-interval", help="Timeline sampling interval in ms"),
+    repeat: int = typer.Option(1, "--repeat", "-n", help="Run the script this many times and keep per-run samples for compare"),
+    subtract_overhead: Optional[bool] = typer.Option(None, "--subtract-overhead/--keep-overhead", help="Calibrate the tracer's cost per call and subtract it (trace mode, default from config: off)"),
+    include: Optional[List[str]] = typer.Option(None, "--include", "-i", help="Only profile matching modules or functions, e.g. 'mypkg.*' or 'mypkg.io:read*' (repeatable)"),
     quiet: bool = typer.Option(False, "--quiet", "-q", help="Suppress output"),
 ) -> None:
     """Profile energy consumption of a Python script."""
+    from .children import (
+        collect_child_results,
+        disable_child_tracing,
+        enable_child_tracing,
+        merge_child_results,
+    )
+    from .config import config
+    from .flamegraph import collapsed_stacks, write_collapsed, write_flamegraph
+    from .recording import RecordingTracer
+    from .reporter import Reporter
+    from .sampling import SamplingTracer
+    from .timeline import TimelineRecorder
+    from .tracer import EnergyTracer, hottest_functions
+    from .utils import apply_attribution, combine_runs, get_backend, run_script, save_results
+
     try:
+        if output_format not in OUTPUT_FORMATS:
+            console.print(f"[red]Error: Unknown output format: {output_format}[/red]")
+            raise typer.Exit(1)
+        call_paths = output_format != "table"
+        if subtract_overhead is None:
+            subtract_overhead = config.subtract_overhead
+        if include:
+            config.include_patterns = include
+        if repeat < 1:
+            console.print("[red]Error: --repeat must be at least 1[/red]")
+            raise typer.Exit(1)
+        if line_top is not None:
+            if line_top < 1:
+                console.print("[red]Error: --line-top must be at least 1[/red]")
+                raise typer.Exit(1)
+            line = True
+        if repeat > 1 and (record or timeline):
+            console.print("[red]Error: --record and --timeline are not supported with --repeat[/red]")
+            raise typer.Exit(1)
+
         # Validate script file
         script_path = Path(script)
         if not script_path.exists():
@@ -41,6 +110,8 @@ def profile(
         if not script_path.suffix == ".py":
             console.print(f"[red]Error: File must be a Python script (.py): {script}[/red]")
             raise typer.Exit(1)
+        # Resolved before tracing starts, so pathlib stays out of the profile
+        script_file = str(script_path)
         
         # Get backend
         try:
@@ -52,36 +123,190 @@ def profile(
         if not energy_backend.is_available():
             console.print(f"[red]Error: Backend '{backend}' is not available on this system[/red]")
             raise typer.Exit(1)
-        
-        # Create tracer
-        tracer = EnergyTracer(energy_backend, line_level=line)
+
+        try:
+            energy_backend = apply_attribution(energy_backend, attribution)
+        except ValueError as e:
+            console.print(f"[red]Error: {e}[/red]")
+            raise typer.Exit(1)
+
+        if not energy_backend.is_available():
+            console.print(f"[red]Error: {attribution.capitalize()} attribution is not available on this system[/red]")
+            raise typer.Exit(1)
         
         if not quiet:
             console.print(f"[green]Profiling {script} with {energy_backend.get_name()} backend...[/green]")
         
-        # Start tracing and run script
-        tracer.start()
+        runs = []
+        line_functions = None
         try:
-            run_script(str(script_path))
-        except Exception as e:
-            console.print(f"[red]Error running script: {e}[/red]")
-            raise typer.Exit(1)
+            if line_top is not None and mode == "trace" and not record:
+                # Cheap function-level pass to pick the functions worth lines
+                ranking = EnergyTracer(energy_backend, engine=engine, subtract_overhead=subtract_overhead)
+                ranking.start()
+                try:
+                    run_script(script_file)
+                except Exception as e:
+                    console.print(f"[red]Error running script: {e}[/red]")
+                    raise typer.Exit(1)
+                finally:
+                    ranking.stop()
+                line_functions = hottest_functions(ranking.get_results(), line_top)
+                if not quiet:
+                    console.print(
+                        f"[green]Line-level profiling of the {len(line_functions)} hottest functions...[/green]"
+                    )
+
+            for _ in range(repeat):
+                # Create tracer
+                tracer: EnergyTracer
+                if mode == "trace" and record:
+                    if line:
+                        console.print("[red]Error: --line is not supported with --record[/red]")
+                        raise typer.Exit(1)
+                    if asyncio_mode:
+                        console.print("[red]Error: --asyncio is not supported with --record[/red]")
+                        raise typer.Exit(1)
+                    if call_paths:
+                        console.print(f"[red]Error: --format {output_format} is not supported with --record[/red]")
+                        raise typer.Exit(1)
+                    try:
+                        tracer = RecordingTracer(
+                            energy_backend, record, engine=engine, call_limit=call_limit
+                        )
+                    except ValueError as e:
+                        console.print(f"[red]Error: {e}[/red]")
+                        raise typer.Exit(1)
+                elif mode == "trace":
+                    try:
+                        tracer = EnergyTracer(
+                            energy_backend,
+                            line_level=line,
+                            engine=engine,
+                            call_limit=call_limit,
+                            async_mode=asyncio_mode,
+                            call_paths=call_paths,
+                            subtract_overhead=subtract_overhead,
+                            line_functions=line_functions,
+                        )
+                    except ValueError as e:
+                        console.print(f"[red]Error: {e}[/red]")
+                        raise typer.Exit(1)
+                elif mode == "sample":
+                    if line:
+                        console.print("[red]Error: --line is not supported in sample mode[/red]")
+                        raise typer.Exit(1)
+                    if asyncio_mode:
+                        console.print("[red]Error: --asyncio is not supported in sample mode[/red]")
+                        raise typer.Exit(1)
+                    if follow_children:
+                        console.print("[red]Error: --follow-children is not supported in sample mode[/red]")
+                        raise typer.Exit(1)
+                    if record:
+                        console.print("[red]Error: --record is not supported in sample mode[/red]")
+                        raise typer.Exit(1)
+                    try:
+                        tracer = SamplingTracer(
+                            energy_backend,
+                            interval_ms=sample_interval,
+                            max_overhead=max_overhead / 100,
+                            all_threads=True,
+                            call_paths=call_paths,
+                        )
+                    except ValueError as e:
+                        console.print(f"[red]Error: {e}[/red]")
+                        raise typer.Exit(1)
+                else:
+                    console.print(f"[red]Error: Unknown profiling mode: {mode}[/red]")
+                    raise typer.Exit(1)
+
+                shard_dir = None
+                if follow_children:
+                    shard_dir = enable_child_tracing(
+                        tracer,
+                        {
+                            "backend": energy_backend.get_name(),
+                            "attribution": attribution,
+                            "line_level": line,
+                            "engine": engine,
+                            "call_limit": call_limit,
+                            "async_mode": asyncio_mode,
+                            "call_paths": call_paths,
+                            "subtract_overhead": subtract_overhead and not record,
+                            # Children reuse this process's calibration
+                            "calibration": (
+                                tracer.ensure_calibration()
+                                if subtract_overhead and not record
+                                else None
+                            ),
+                            "include": config.include_patterns,
+                            "line_functions": line_functions,
+                        },
+                    )
+
+                recorder = None
+                if timeline:
+                    try:
+                        recorder = TimelineRecorder(tracer, timeline, interval_ms=timeline_interval)
+                    except ValueError as e:
+                        console.print(f"[red]Error: {e}[/red]")
+                        raise typer.Exit(1)
+
+                # Start tracing and run script
+                tracer.start()
+                if recorder is not None:
+                    recorder.start()
+                try:
+                    run_script(script_file)
+                except Exception as e:
+                    console.print(f"[red]Error running script: {e}[/red]")
+                    raise typer.Exit(1)
+                finally:
+                    if recorder is not None:
+                        recorder.stop()
+                    tracer.stop()
+                    if shard_dir is not None:
+                        disable_child_tracing()
+
+                # Get results
+                results = tracer.get_results()
+                results["metadata"]["attribution"] = attribution
+                if shard_dir is not None:
+                    merge_child_results(results, collect_child_results(shard_dir))
+                runs.append(results)
         finally:
-            tracer.stop()
-        
-        # Get results
-        results = tracer.get_results()
-        
+            energy_backend.close()
+
+        results = combine_runs(runs) if repeat > 1 else runs[0]
+
         # Print results
-        if not quiet:
+        if not quiet and output_format != "collapsed":
             reporter = Reporter(console)
             reporter.print_table(results)
+            if results.get("lines"):
+                reporter.print_annotated_source(results)
         
         # Save to file if requested
-        if output:
+        if output_format == "flamegraph":
+            flamegraph_file = output or "flamegraph.svg"
+            write_flamegraph(results, flamegraph_file, title=f"Energy Flame Graph: {script}")
+            if not quiet:
+                console.print(f"[green]Flame graph saved to: {flamegraph_file}[/green]")
+        elif output_format == "collapsed":
+            if output:
+                write_collapsed(results, output)
+                if not quiet:
+                    console.print(f"[green]Collapsed stacks saved to: {output}[/green]")
+            else:
+                for stack in collapsed_stacks(results):
+                    print(stack)
+        elif output:
             save_results(results, output)
             if not quiet:
                 console.print(f"[green]Results saved to: {output}[/green]")
+
+        if recorder is not None and not quiet:
+            console.print(f"[green]Timeline saved to: {timeline} ({recorder.samples} samples)[/green]")
         
         # Exit with error if energy budget exceeded
         total_energy = results.get("summary", {}).get("total_energy_mj", 0.0)
@@ -90,6 +315,8 @@ def profile(
                 console.print(f"[red]Energy budget exceeded: {total_energy:.1f} mJ > {config.energy_budget_mj} mJ[/red]")
             raise typer.Exit(1)
     
+    except typer.Exit:
+        raise
     except KeyboardInterrupt:
         console.print("\n[yellow]Profiling interrupted[/yellow]")
         raise typer.Exit(1)
@@ -102,8 +329,19 @@ def profile(
 def compare(
     old_file: str = typer.Argument(..., help="Old results JSON file"),
     new_file: str = typer.Argument(..., help="New results JSON file"),
+    method: Optional[str] = typer.Option(None, "--method", "-m", help="auto, threshold, mannwhitney or bootstrap"),
+    alpha: Optional[float] = typer.Option(None, "--alpha", help="Significance level of the test"),
+    min_change: Optional[float] = typer.Option(None, "--min-change", help="Smallest change in percent to report"),
 ) -> None:
-    """Compare two profiling results."""
+    """Compare two profiling results.
+
+    Results profiled with --repeat are compared run by run with a
+    significance test; single runs fall back to a fixed threshold.
+    """
+    from .config import config
+    from .reporter import Reporter
+    from .utils import load_results
+
     try:
         # Load results
         try:
@@ -115,13 +353,242 @@ def compare(
         
         # Compare results
         reporter = Reporter(console)
-        comparison = reporter.compare_results(old_results, new_results)
+        try:
+            comparison = reporter.compare_results(
+                old_results,
+                new_results,
+                method=method or config.compare_method,
+                alpha=alpha if alpha is not None else config.significance_alpha,
+                min_change_percent=(
+                    min_change if min_change is not None else config.regression_threshold_percent
+                ),
+            )
+        except ValueError as e:
+            console.print(f"[red]Error: {e}[/red]")
+            raise typer.Exit(1)
         reporter.print_comparison(comparison)
         
         # Exit with error if there are regressions
         if comparison["regressions"]:
             raise typer.Exit(1)
     
+    except typer.Exit:
+        raise
+    except Exception as e:
+        console.print(f"[red]Unexpected error: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def aggregate(
+    trace_log: str = typer.Argument(..., help="Trace log written with --record"),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Output JSON file"),
+    quiet: bool = typer.Option(False, "--quiet", "-q", help="Suppress output"),
+) -> None:
+    """Build profiling results from a recorded trace log."""
+    from .recording import aggregate_trace
+    from .reporter import Reporter
+    from .utils import save_results
+
+    try:
+        try:
+            results = aggregate_trace(trace_log)
+        except (OSError, ValueError) as e:
+            console.print(f"[red]Error reading trace log: {e}[/red]")
+            raise typer.Exit(1)
+
+        if not quiet:
+            reporter = Reporter(console)
+            reporter.print_table(results)
+
+        if output:
+            save_results(results, output)
+            if not quiet:
+                console.print(f"[green]Results saved to: {output}[/green]")
+
+    except typer.Exit:
+        raise
+    except Exception as e:
+        console.print(f"[red]Unexpected error: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command("bench")
+def bench_callable(
+    target: str = typer.Argument(..., help="Callable to benchmark, as module:callable"),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Output JSON file"),
+    backend: str = typer.Option("auto", "--backend", "-b", help="Energy measurement backend"),
+    samples: int = typer.Option(20, "--samples", "-s", help="Number of measured samples"),
+    warmups: int = typer.Option(2, "--warmups", help="Samples run and discarded first"),
+    loops: Optional[int] = typer.Option(None, "--loops", "-l", help="Calls per sample (calibrated by default)"),
+    min_time: Optional[float] = typer.Option(None, "--min-time", help="Shortest sample in ms when calibrating loops (default 100)"),
+    no_idle: bool = typer.Option(False, "--no-idle", help="Do not subtract idle power"),
+    quiet: bool = typer.Option(False, "--quiet", "-q", help="Suppress output"),
+) -> None:
+    """Benchmark the energy per call of a Python callable."""
+    from .benchmark import MIN_SAMPLE_MS, bench as run_bench, load_callable
+    from .reporter import Reporter
+    from .utils import get_backend, save_results
+
+    if min_time is None:
+        min_time = MIN_SAMPLE_MS
+    try:
+        try:
+            func = load_callable(target)
+        except (ImportError, AttributeError, ValueError) as e:
+            console.print(f"[red]Error loading {target}: {e}[/red]")
+            raise typer.Exit(1)
+
+        try:
+            energy_backend = get_backend(backend)
+        except ValueError as e:
+            console.print(f"[red]Error: {e}[/red]")
+            raise typer.Exit(1)
+
+        if not energy_backend.is_available():
+            console.print(f"[red]Error: Backend '{backend}' is not available on this system[/red]")
+            raise typer.Exit(1)
+
+        if not quiet:
+            console.print(f"[green]Benchmarking {target} with {energy_backend.get_name()} backend...[/green]")
+
+        try:
+            results = run_bench(
+                func,
+                backend=energy_backend,
+                samples=samples,
+                warmups=warmups,
+                min_sample_ms=min_time,
+                loops=loops,
+                subtract_idle=not no_idle,
+                name=target,
+            )
+        except ValueError as e:
+            console.print(f"[red]Error: {e}[/red]")
+            raise typer.Exit(1)
+        finally:
+            energy_backend.close()
+
+        if not quiet:
+            reporter = Reporter(console)
+            reporter.print_benchmark(results)
+
+        if output:
+            save_results(results, output)
+            if not quiet:
+                console.print(f"[green]Results saved to: {output}[/green]")
+
+    except typer.Exit:
+        raise
+    except Exception as e:
+        console.print(f"[red]Unexpected error: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def overhead(
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Output JSON file"),
+    backend: str = typer.Option("mock", "--backend", "-b", help="Energy measurement backend"),
+    calls: Optional[int] = typer.Option(None, "--calls", help="Traced empty calls per round (default 5000)"),
+    rounds: int = typer.Option(5, "--rounds", help="Rounds per configuration; times are the fastest"),
+    quiet: bool = typer.Option(False, "--quiet", "-q", help="Suppress output"),
+) -> None:
+    """Benchmark the tracer's own cost per call, to track it across releases."""
+    from .benchmark import tracer_overhead
+    from .reporter import Reporter
+    from .tracer import CALIBRATION_CALLS
+    from .utils import get_backend, save_results
+
+    if calls is None:
+        calls = CALIBRATION_CALLS
+    try:
+        try:
+            energy_backend = get_backend(backend)
+        except ValueError as e:
+            console.print(f"[red]Error: {e}[/red]")
+            raise typer.Exit(1)
+
+        if not energy_backend.is_available():
+            console.print(f"[red]Error: Backend '{backend}' is not available on this system[/red]")
+            raise typer.Exit(1)
+
+        try:
+            report = tracer_overhead(energy_backend, calls=calls, rounds=rounds)
+        except ValueError as e:
+            console.print(f"[red]Error: {e}[/red]")
+            raise typer.Exit(1)
+        finally:
+            energy_backend.close()
+
+        if not quiet:
+            reporter = Reporter(console)
+            reporter.print_overhead(report)
+
+        if output:
+            save_results(report, output)
+            if not quiet:
+                console.print(f"[green]Results saved to: {output}[/green]")
+
+    except typer.Exit:
+        raise
+    except Exception as e:
+        console.print(f"[red]Unexpected error: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def backends(
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Output JSON file"),
+    quiet: bool = typer.Option(False, "--quiet", "-q", help="Suppress output"),
+) -> None:
+    """List the energy backends, probe them and refresh the probe cache.
+
+    "auto" tries them top to bottom and skips those found unavailable
+    earlier in this boot; run this after changing permissions or drivers.
+    """
+    from .reporter import Reporter
+    from .utils import probe_backends, save_results
+
+    try:
+        rows = probe_backends()
+
+        if not quiet:
+            reporter = Reporter(console)
+            reporter.print_backends(rows)
+
+        if output:
+            save_results({"backends": rows}, output)
+            if not quiet:
+                console.print(f"[green]Results saved to: {output}[/green]")
+
+    except typer.Exit:
+        raise
+    except Exception as e:
+        console.print(f"[red]Unexpected error: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command("timeline")
+def show_timeline(
+    timeline_file: str = typer.Argument(..., help="Timeline CSV file written with --timeline"),
+    rows: int = typer.Option(40, "--rows", "-n", help="Maximum number of rows to display"),
+) -> None:
+    """Show power over time from a timeline file."""
+    from .reporter import Reporter
+    from .timeline import downsample
+
+    try:
+        try:
+            buckets = downsample(timeline_file, rows)
+        except (OSError, ValueError, IndexError) as e:
+            console.print(f"[red]Error reading timeline: {e}[/red]")
+            raise typer.Exit(1)
+
+        reporter = Reporter(console)
+        reporter.print_timeline(buckets, title=f"Power Timeline ({timeline_file})")
+
+    except typer.Exit:
+        raise
     except Exception as e:
         console.print(f"[red]Unexpected error: {e}[/red]")
         raise typer.Exit(1)
@@ -135,6 +602,9 @@ def badge(
     status_only: bool = typer.Option(False, "--status-only", help="Generate status-only badge"),
 ) -> None:
     """Generate an energy consumption badge."""
+    from .badge import BadgeGenerator
+    from .utils import load_results
+
     try:
         # Load results
         try:
@@ -162,6 +632,8 @@ def badge(
         if total_energy > target:
             raise typer.Exit(1)
     
+    except typer.Exit:
+        raise
     except Exception as e:
         console.print(f"[red]Unexpected error: {e}[/red]")
         raise typer.Exit(1)
@@ -171,7 +643,7 @@ def badge(
 def version() -> None:
     """Show version information."""
     from . import __version__
-    console.print(f"py-power-profile version {__version__}")
+    typer.echo(f"py-power-profile version {__version__}")
 
 
 if __name__ == "__main__":
@@ -1,28 +1,152 @@
 """Configuration management for py-power-profile."""
 
+import fnmatch
+import functools
 import os
+import re
 import sys
+import threading
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-try:
-    import tomllib
-except ImportError:
-    import tomli as tomllib
+
+# Upper bound on memoized ignore decisions before the cache is reset
+IGNORE_CACHE_SIZE = 65536
+
+# Attributes holding settings; they are filled in on first access
+_SETTINGS = frozenset({
+    "backend",
+    "tdp_watts",
+    "energy_budget_mj",
+    "sample_interval_ms",
+    "hwmon_channels",
+    "probe_cache",
+    "_ignore_patterns",
+    "_include_patterns",
+    "compare_method",
+    "significance_alpha",
+    "regression_threshold_percent",
+    "subtract_overhead",
+})
+
+# Parsed config files by absolute path, with the (mtime, size) they had
+_FILE_CACHE: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+
+def _read_toml(config_file: Path) -> Dict[str, Any]:
+    """Parse a TOML file, reusing the previous parse while it is unchanged."""
+    stat = config_file.stat()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    key = os.path.abspath(config_file)
+    cached = _FILE_CACHE.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    try:
+        import tomllib
+    except ImportError:
+        import tomli as tomllib
+
+    with open(config_file, "rb") as f:
+        data = tomllib.load(f)
+    _FILE_CACHE[key] = (stamp, data)
+    return data
+
+
+@functools.lru_cache(maxsize=IGNORE_CACHE_SIZE)
+def module_name(filename: str) -> str:
+    """Derive the dotted module name of a source file from ``sys.path``.
+
+    The longest ``sys.path`` entry containing the file is its root, so
+    ``.../site-packages/rich/table.py`` is ``rich.table`` and a script run
+    from its directory is named after its file.  Frozen modules keep their
+    name and other pseudo-files (``<string>``) are returned as they are.
+    """
+    if filename.startswith("<frozen ") and filename.endswith(">"):
+        return filename[len("<frozen "):-1]
+    if filename.startswith("<"):
+        return filename
+
+    path = os.path.abspath(filename)
+    root = ""
+    for entry in sys.path:
+        prefix = os.path.join(os.path.abspath(entry or os.curdir), "")
+        if path.startswith(prefix) and len(prefix) > len(root):
+            root = prefix
+    relative = path[len(root):] if root else os.path.basename(path)
+    parts = os.path.splitext(relative)[0].split(os.sep)
+    if len(parts) > 1 and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
 
 
 class Config:
-    """Configuration manager for py-power-profile."""
+    """Configuration manager for py-power-profile.
+
+    Settings are read from the config files and the environment on first
+    access rather than at import, and parsed files are cached by
+    modification time.  Settings assigned before the first access take
+    precedence over loaded ones; ``reload()`` discards everything so the
+    next access reads the (possibly edited) files again.
+    """
 
     def __init__(self) -> None:
+        self._ignore_regex: Optional["re.Pattern[str]"] = None
+        self._ignore_cache: Dict[str, bool] = {}
+        self._include_regex: Optional["re.Pattern[str]"] = None
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for attributes that are not set, i.e. before loading
+        if name in _SETTINGS:
+            with self._load_lock:
+                if not self._loaded:
+                    self._load_config()
+            if name in self.__dict__:
+                return self.__dict__[name]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def reload(self) -> None:
+        """Forget loaded and assigned settings; the next access loads them again."""
+        with self._load_lock:
+            for name in _SETTINGS:
+                self.__dict__.pop(name, None)
+            self._reset_matchers()
+            self._loaded = False
+
+    def _reset_matchers(self) -> None:
+        """Drop the compiled ignore/include patterns and memoized decisions."""
+        self._ignore_regex = None
+        self._ignore_cache = {}
+        self._include_regex = None
+
+    def _set_defaults(self) -> None:
+        """Assign the default of every setting."""
         self.backend = "auto"
         self.tdp_watts = 15.0
         self.energy_budget_mj = 1000.0
+        self.sample_interval_ms = 20.0
+        # Globs of hwmon channels ("ina3221/VDD_CPU") to measure; empty uses all
+        self.hwmon_channels: List[str] = []
+        # Where "auto" caches backend probe results; empty disables the cache
+        cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        self.probe_cache = os.path.join(cache_home, "py-power-profile", "probes.json")
         self.ignore_patterns: List[str] = ["tests/*"]
-        self._load_config()
+        # Allow-list of modules or functions to profile; empty profiles all
+        self.include_patterns: List[str] = []
+        # compare: test for repeated runs and thresholds of a reported change
+        self.compare_method = "auto"
+        self.significance_alpha = 0.05
+        self.regression_threshold_percent = 10.0
+        # Calibrate the tracer's cost per call and subtract it (trace mode)
+        self.subtract_overhead = False
 
     def _load_config(self) -> None:
         """Load configuration from pyproject.toml and .pypowerprofile."""
+        assigned = {name: self.__dict__[name] for name in _SETTINGS if name in self.__dict__}
+        self._loaded = True
+        self._set_defaults()
         config_files = [
             Path("pyproject.toml"),
             Path(".pypowerprofile"),
@@ -40,20 +164,32 @@ class Config:
             self.tdp_watts = float(os.getenv("PY_POWER_TDP_WATTS", "15.0"))
         if os.getenv("PY_POWER_ENERGY_BUDGET_MJ"):
             self.energy_budget_mj = float(os.getenv("PY_POWER_ENERGY_BUDGET_MJ", "1000.0"))
+        if os.getenv("PY_POWER_SAMPLE_INTERVAL_MS"):
+            self.sample_interval_ms = float(os.getenv("PY_POWER_SAMPLE_INTERVAL_MS", "20.0"))
+        if os.getenv("PY_POWER_HWMON_CHANNELS"):
+            self.hwmon_channels = [
+                channel.strip() for channel in os.getenv("PY_POWER_HWMON_CHANNELS", "").split(",") if channel.strip()
+            ]
+        if os.getenv("PY_POWER_PROBE_CACHE") is not None:
+            self.probe_cache = os.getenv("PY_POWER_PROBE_CACHE", "")
+        if os.getenv("PY_POWER_INCLUDE"):
+            self.include_patterns = [
+                pattern.strip() for pattern in os.getenv("PY_POWER_INCLUDE", "").split(",") if pattern.strip()
+            ]
+
+        if assigned:
+            self.__dict__.update(assigned)
+            self._reset_matchers()
 
     def _load_from_file(self, config_file: Path) -> None:
         """Load configuration from a specific file."""
         try:
+            data = _read_toml(config_file)
             if config_file.name == "pyproject.toml":
-                with open(config_file, "rb") as f:
-                    data = tomllib.load(f)
-                    if "tool" in data and "py-power-profile" in data["tool"]:
-                        config = data["tool"]["py-power-profile"]
-                        self._update_from_dict(config)
+                if "tool" in data and "py-power-profile" in data["tool"]:
+                    self._update_from_dict(data["tool"]["py-power-profile"])
             else:
-                with open(config_file, "rb") as f:
-                    config = tomllib.load(f)
-                    self._update_from_dict(config)
+                self._update_from_dict(data)
         except Exception as e:
             print(f"Warning: Could not load config from {config_file}: {e}", file=sys.stderr)
 
@@ -65,18 +201,93 @@ class Config:
             self.tdp_watts = float(config["tdp_watts"])
         if "energy_budget_mj" in config:
             self.energy_budget_mj = float(config["energy_budget_mj"])
+        if "sample_interval_ms" in config:
+            self.sample_interval_ms = float(config["sample_interval_ms"])
+        if "hwmon_channels" in config:
+            self.hwmon_channels = list(config["hwmon_channels"])
+        if "probe_cache" in config:
+            self.probe_cache = os.path.expanduser(str(config["probe_cache"]))
         if "ignore" in config:
             self.ignore_patterns = config["ignore"]
+        if "include" in config:
+            self.include_patterns = config["include"]
+        if "compare_method" in config:
+            self.compare_method = config["compare_method"]
+        if "significance_alpha" in config:
+            self.significance_alpha = float(config["significance_alpha"])
+        if "regression_threshold_percent" in config:
+            self.regression_threshold_percent = float(config["regression_threshold_percent"])
+        if "subtract_overhead" in config:
+            self.subtract_overhead = bool(config["subtract_overhead"])
+
+    @property
+    def ignore_patterns(self) -> List[str]:
+        """Glob patterns of files excluded from profiling."""
+        return self._ignore_patterns
+
+    @ignore_patterns.setter
+    def ignore_patterns(self, patterns: List[str]) -> None:
+        self._ignore_patterns = list(patterns)
+        # All globs are matched by one compiled regex, built on first use
+        self._ignore_regex = None
+        self._ignore_cache = {}
+
+    def _compile_ignore_patterns(self) -> "re.Pattern[str]":
+        """Combine the ignore globs into a single regular expression."""
+        if not self._ignore_patterns:
+            # Matches nothing
+            return re.compile(r"(?!)")
+        return re.compile(
+            "|".join(f"(?:{fnmatch.translate(p)})" for p in self._ignore_patterns)
+        )
 
     def should_ignore(self, path: str) -> bool:
         """Check if a path should be ignored based on patterns."""
-        import fnmatch
+        ignored = self._ignore_cache.get(path)
+        if ignored is None:
+            if self._ignore_regex is None:
+                self._ignore_regex = self._compile_ignore_patterns()
+            ignored = self._ignore_regex.match(path) is not None
+            if len(self._ignore_cache) >= IGNORE_CACHE_SIZE:
+                self._ignore_cache.clear()
+            self._ignore_cache[path] = ignored
+        return ignored
+
+    @property
+    def include_patterns(self) -> List[str]:
+        """Module or function globs to profile exclusively, if any.
+
+        ``mypkg.*`` matches ``mypkg`` and its submodules, ``mypkg.io:read*``
+        functions of ``mypkg.io`` by qualified name.
+        """
+        return self._include_patterns
+
+    @include_patterns.setter
+    def include_patterns(self, patterns: List[str]) -> None:
+        self._include_patterns = list(patterns)
+        self._include_regex = None
+
+    def _compile_include_patterns(self) -> "re.Pattern[str]":
+        """Combine the include globs into one regex over ``module:qualname``."""
+        globs = []
+        for pattern in self._include_patterns:
+            if ":" in pattern:
+                globs.append(pattern)
+                continue
+            globs.append(f"{pattern}:*")
+            if pattern.endswith(".*"):
+                # The package itself, not only its submodules
+                globs.append(f"{pattern[:-2]}:*")
+        return re.compile("|".join(f"(?:{fnmatch.translate(g)})" for g in globs))
 
-        for pattern in self.ignore_patterns:
-            if fnmatch.fnmatch(path, pattern):
-                return True
-        return False
+    def should_include(self, filename: str, qualname: str) -> bool:
+        """Check if a function passes the include allow-list."""
+        if not self._include_patterns:
+            return True
+        if self._include_regex is None:
+            self._include_regex = self._compile_include_patterns()
+        return self._include_regex.match(f"{module_name(filename)}:{qualname}") is not None
 
 
 # Global configuration instance
-config = Config() 
\ No newline at end of file
+config = Config()
@@ -0,0 +1,137 @@
+"""Collapsed-stack and SVG flame graph output weighted by energy."""
+
+import html
+import zlib
+from typing import Any, Dict, List, Tuple
+
+# Layout of the SVG flame graph, in pixels
+WIDTH = 1200
+FRAME_HEIGHT = 16
+MARGIN = 10
+TITLE_HEIGHT = 30
+# Frames narrower than this are left out
+MIN_WIDTH = 0.1
+# Approximate width of a character of the 12px frame labels
+CHAR_WIDTH = 7
+
+
+def collapsed_stacks(results: Dict[str, Any]) -> List[str]:
+    """Return Brendan Gregg's collapsed-stack lines weighted by self energy in mJ.
+
+    Each line is a call path, outermost frame first and separated by ``;``,
+    followed by the self energy of the calls made along that path.
+    """
+    lines = []
+    for path, stats in results.get("call_paths", {}).items():
+        energy_mj = stats["self_energy_mj"]
+        if energy_mj > 0:
+            lines.append(f"{path} {energy_mj:.3f}")
+    return lines
+
+
+def write_collapsed(results: Dict[str, Any], file_path: str) -> None:
+    """Write collapsed stacks for flamegraph.pl, inferno or speedscope."""
+    with open(file_path, "w") as f:
+        for line in collapsed_stacks(results):
+            f.write(line + "\n")
+
+
+def _build_tree(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a nested tree of inclusive energy from the call paths."""
+    root: Dict[str, Any] = {"name": "all", "energy_mj": 0.0, "self_mj": 0.0, "children": {}}
+    for path, stats in results.get("call_paths", {}).items():
+        energy_mj = max(stats["self_energy_mj"], 0.0)
+        node = root
+        node["energy_mj"] += energy_mj
+        for name in path.split(";"):
+            children = node["children"]
+            if name not in children:
+                children[name] = {"name": name, "energy_mj": 0.0, "self_mj": 0.0, "children": {}}
+            node = children[name]
+            node["energy_mj"] += energy_mj
+        node["self_mj"] += energy_mj
+    return root
+
+
+def hot_path(results: Dict[str, Any]) -> List[Tuple[str, float]]:
+    """Follow the child with the most inclusive energy from the outermost frame.
+
+    Returns (function, inclusive energy in mJ) for each frame of the path.
+    """
+    node = _build_tree(results)
+    path = []
+    while node["children"]:
+        node = max(node["children"].values(), key=lambda child: child["energy_mj"])
+        if node["energy_mj"] <= 0:
+            break
+        path.append((node["name"], node["energy_mj"]))
+    return path
+
+
+def _color(name: str) -> str:
+    """Pick a stable warm color for a function."""
+    value = zlib.crc32(name.encode())
+    red = 205 + value % 50
+    green = 80 + (value >> 8) % 150
+    blue = (value >> 16) % 55
+    return f"rgb({red},{green},{blue})"
+
+
+def render_svg(results: Dict[str, Any], title: str = "Energy Flame Graph") -> str:
+    """Render a self-contained SVG flame graph; frame widths are inclusive energy."""
+    root = _build_tree(results)
+    total = root["energy_mj"]
+    usable = WIDTH - 2 * MARGIN
+
+    frames = []
+    depth_max = 0
+    # (node, x, depth); children are laid out left to right by name
+    pending = [(root, float(MARGIN), 0)]
+    while pending:
+        node, x, depth = pending.pop()
+        width = node["energy_mj"] / total * usable if total > 0 else usable
+        if width < MIN_WIDTH:
+            continue
+        frames.append((node, x, width, depth))
+        depth_max = max(depth_max, depth)
+        child_x = x
+        for name in sorted(node["children"]):
+            child = node["children"][name]
+            pending.append((child, child_x, depth + 1))
+            child_x += child["energy_mj"] / total * usable if total > 0 else 0.0
+
+    height = TITLE_HEIGHT + (depth_max + 1) * FRAME_HEIGHT + 2 * MARGIN
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}" height="{height}" '
+        f'viewBox="0 0 {WIDTH} {height}" font-family="Verdana, sans-serif" font-size="12">',
+        '<rect width="100%" height="100%" fill="#f8f8f8"/>',
+        f'<text x="{WIDTH / 2}" y="{MARGIN + 14}" text-anchor="middle" font-size="16">'
+        f'{html.escape(title)} ({total:.1f} mJ)</text>',
+    ]
+    for node, x, width, depth in frames:
+        # Flame graphs grow upwards from the outermost frame
+        y = height - MARGIN - (depth + 1) * FRAME_HEIGHT
+        name = node["name"]
+        share = node["energy_mj"] / total * 100 if total > 0 else 0.0
+        tooltip = f"{name}: {node['energy_mj']:.3f} mJ ({share:.2f}%), self {node['self_mj']:.3f} mJ"
+        fill = "rgb(200,200,200)" if node is root else _color(name)
+        parts.append(f"<g><title>{html.escape(tooltip)}</title>")
+        parts.append(
+            f'<rect x="{x:.2f}" y="{y}" width="{width:.2f}" height="{FRAME_HEIGHT - 1}" '
+            f'fill="{fill}" rx="2"/>'
+        )
+        max_chars = int((width - 6) // CHAR_WIDTH)
+        if max_chars >= 3:
+            label = name if len(name) <= max_chars else name[:max_chars - 2] + ".."
+            parts.append(
+                f'<text x="{x + 3:.2f}" y="{y + FRAME_HEIGHT - 4}">{html.escape(label)}</text>'
+            )
+        parts.append("</g>")
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def write_flamegraph(results: Dict[str, Any], file_path: str, title: str = "Energy Flame Graph") -> None:
+    """Write an SVG flame graph of the call paths in results."""
+    with open(file_path, "w") as f:
+        f.write(render_svg(results, title))
@@ -0,0 +1,246 @@
+"""In-process profiling API for long-running programs.
+
+``Profiler`` wraps an ``EnergyTracer`` (or ``SamplingTracer``) that can be
+started and stopped any number of times, e.g. from a signal handler or an
+admin endpoint, and dumps each window's results atomically.  ``profile()``
+is the context-manager form and ``energy_profiled`` profiles every call of
+a function.  Nothing is hooked into the interpreter while no profiler is
+running, so the API can stay in production code permanently.
+
+Only one profiler can run at a time in a process.  Under the settrace engine
+(Python < 3.12) a profiler traces the thread that started it and threads
+started afterwards; ``sys.monitoring`` and sample mode see every thread.
+"""
+
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar, Union
+
+from .backends import BaseBackend
+from .config import config
+from .sampling import SamplingTracer
+from .tracer import EnergyTracer
+from .utils import apply_attribution, get_backend, save_results
+
+MODES = ("trace", "sample")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# The running profiler, if any; tracing hooks are process-wide
+_active: Optional["Profiler"] = None
+_active_lock = threading.Lock()
+
+
+def active_profiler() -> Optional["Profiler"]:
+    """Return the profiler running in this process, if any."""
+    return _active
+
+
+class Profiler:
+    """Energy profiler that can be started and stopped on demand.
+
+    ``backend`` is a backend name as on the command line or a backend
+    instance; named backends are created on the first ``start()`` and kept
+    for later windows until ``close()``.  The other options match
+    ``py-power profile``.  With ``output`` every ``stop()`` writes the
+    window's results to that file, replacing it atomically.
+    """
+
+    def __init__(
+        self,
+        backend: Union[str, BaseBackend] = "auto",
+        mode: str = "trace",
+        output: Optional[str] = None,
+        line_level: bool = False,
+        engine: str = "auto",
+        call_limit: Optional[int] = None,
+        async_mode: bool = False,
+        call_paths: bool = False,
+        subtract_overhead: Optional[bool] = None,
+        sample_interval_ms: float = 10.0,
+        max_overhead: float = 0.05,
+        attribution: str = "full",
+    ) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+
+        self.mode = mode
+        self.output = output
+        self.attribution = attribution
+        self.results: Optional[Dict[str, Any]] = None
+        self._backend_spec = backend
+        self._backend: Optional[BaseBackend] = None
+        self._owns_backend = isinstance(backend, str)
+        if subtract_overhead is None:
+            subtract_overhead = config.subtract_overhead
+        self._trace_options: Dict[str, Any] = {
+            "line_level": line_level,
+            "engine": engine,
+            "call_limit": call_limit,
+            "async_mode": async_mode,
+            "call_paths": call_paths,
+            "subtract_overhead": subtract_overhead,
+        }
+        self._sample_options: Dict[str, Any] = {
+            "interval_ms": sample_interval_ms,
+            "max_overhead": max_overhead,
+            "all_threads": True,
+            "call_paths": call_paths,
+        }
+        self._tracer: Optional[EnergyTracer] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """Whether this profiler is currently collecting."""
+        return self._tracer is not None
+
+    def _get_backend(self) -> BaseBackend:
+        """Return the backend, creating it on first use."""
+        if self._backend is None:
+            spec = self._backend_spec
+            backend = get_backend(spec) if isinstance(spec, str) else spec
+            backend = apply_attribution(backend, self.attribution)
+            if not backend.is_available():
+                raise RuntimeError(f"Backend '{backend.get_name()}' is not available on this system")
+            self._backend = backend
+        return self._backend
+
+    def start(self) -> None:
+        """Start a profiling window.
+
+        Raises ``RuntimeError`` if this or another profiler is running.
+        """
+        global _active
+        with self._lock:
+            with _active_lock:
+                if _active is not None:
+                    raise RuntimeError("A profiler is already running in this process")
+                _active = self
+            try:
+                backend = self._get_backend()
+                if self.mode == "sample":
+                    tracer: EnergyTracer = SamplingTracer(backend, **self._sample_options)
+                else:
+                    # Calibrated once per process, see EnergyTracer.ensure_calibration()
+                    tracer = EnergyTracer(backend, **self._trace_options)
+                tracer.start()
+            except BaseException:
+                with _active_lock:
+                    _active = None
+                raise
+            self._tracer = tracer
+
+    def stop(self) -> Dict[str, Any]:
+        """End the profiling window, dump it to ``output`` and return its results."""
+        global _active
+        with self._lock:
+            tracer = self._tracer
+            if tracer is None:
+                raise RuntimeError("The profiler is not running")
+            try:
+                tracer.stop()
+            finally:
+                self._tracer = None
+                with _active_lock:
+                    _active = None
+            self.results = tracer.get_results()
+        if self.output:
+            self.dump(self.output)
+        return self.results
+
+    def toggle(self) -> bool:
+        """Start if stopped, stop if running; return whether it now runs.
+
+        Convenient as a signal handler, e.g.
+        ``signal.signal(signal.SIGUSR1, lambda *_: profiler.toggle())``.
+        """
+        if self.running:
+            self.stop()
+            return False
+        self.start()
+        return True
+
+    def dump(self, file_path: str) -> None:
+        """Atomically write the results of the last window to a JSON file."""
+        if self.results is None:
+            raise RuntimeError("No profiling window has completed yet")
+        save_results(self.results, file_path)
+
+    def close(self) -> None:
+        """Stop if running and release a backend this profiler created."""
+        if self.running:
+            self.stop()
+        if self._backend is not None and self._owns_backend:
+            self._backend.close()
+            self._backend = None
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+@contextmanager
+def profile(output: Optional[str] = None, **options: Any) -> Iterator[Profiler]:
+    """Profile the body of a ``with`` block.
+
+    Accepts the options of ``Profiler``; results are on the yielded
+    profiler's ``results`` after the block, and written to ``output`` if
+    given.  A backend created by name is closed at the end.
+    """
+    profiler = Profiler(output=output, **options)
+    try:
+        with profiler:
+            yield profiler
+    finally:
+        profiler.close()
+
+
+def energy_profiled(
+    func: Optional[F] = None,
+    *,
+    output: Optional[str] = None,
+    enabled: bool = True,
+    **options: Any,
+) -> Any:
+    """Decorator profiling every call of a function.
+
+    Usable bare (``@energy_profiled``) or with ``Profiler`` options
+    (``@energy_profiled(output="energy.json")``).  Each call is a profiling
+    window; the last one's results are on ``wrapper.profiler.results``.
+    Calls made while another profiler runs (including recursive calls) are
+    left to that profiler.  With ``enabled=False`` the function is returned
+    unchanged, so a disabled decorator costs nothing.
+    """
+
+    def decorate(function: F) -> F:
+        if not enabled:
+            return function
+        profiler = Profiler(output=output, **options)
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if active_profiler() is not None:
+                return function(*args, **kwargs)
+            try:
+                profiler.start()
+            except RuntimeError:
+                if active_profiler() is None:
+                    raise
+                # Another thread started a profiler in the meantime
+                return function(*args, **kwargs)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.stop()
+
+        wrapper.profiler = profiler  # type: ignore[attr-defined]
+        return wrapper  # type: ignore[return-value]
+
+    if func is not None:
+        return decorate(func)
+    return decorate
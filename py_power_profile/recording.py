@@ -0,0 +1,488 @@
+"""Raw event recording to a binary trace log, and offline aggregation.
+
+A trace log starts with ``MAGIC`` followed by blocks, each a 4-byte tag and
+a little-endian ``uint32`` payload length:
+
+``META``
+    JSON metadata of the run.
+``STRS``
+    Function keys: ``uint32`` first ID and count, then for each key a
+    ``uint32`` length and its UTF-8 bytes.  Keys are written before any
+    record that refers to them.
+``THRD``
+    A traced thread: ``uint16`` index, ``uint64`` ident and the UTF-8 name.
+``RECS``
+    Fixed-width records of one thread (see ``RECORD``).
+
+Blocks are appended whole, so a log cut short by a crash or SIGKILL is
+readable up to its last complete block.
+"""
+
+import contextlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import defaultdict
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, cast
+
+from .backends import BaseBackend
+from .stats import StatsTable
+from .tracer import EnergyTracer, FunctionStats, thread_summary
+
+MAGIC = b"PYPWTRC1"
+
+# func_id, event, (pad), thread index, timestamp_ns, energy_mj
+RECORD = struct.Struct("<IBxHqd")
+RECORD_SIZE = RECORD.size
+
+EVENT_ENTER = 1
+EVENT_EXIT = 2
+
+_BLOCK_HEADER = struct.Struct("<4sI")
+
+# Records buffered per thread before a block is written
+CHUNK_RECORDS = 4096
+
+_CLOSED = "I/O operation on a closed trace log"
+
+
+class TraceWriter:
+    """Append blocks to a trace log from any number of thread buffers."""
+
+    def __init__(self, path: str, names: List[str], metadata: Dict[str, Any]) -> None:
+        self.path = path
+        self._names = names
+        self._names_written = 0
+        self._threads = 0
+        self._lock = threading.Lock()
+        self._file: Optional[BinaryIO] = None
+        # Close the log again if the header cannot be written
+        with contextlib.ExitStack() as stack:
+            self._file = stack.enter_context(open(path, "wb"))
+            self._file.write(MAGIC)
+            self._write_block(b"META", json.dumps(metadata).encode())
+            stack.pop_all()
+
+    def _write_block(self, tag: bytes, payload: Any) -> None:
+        """Write one block and hand it to the OS (called with the lock held)."""
+        file = self._file
+        if file is None:
+            raise ValueError(_CLOSED)
+        file.write(_BLOCK_HEADER.pack(tag, len(payload)))
+        file.write(payload)
+        file.flush()
+
+    def _write_names(self) -> None:
+        """Write the function keys interned since the last block."""
+        names = self._names
+        first = self._names_written
+        count = len(names) - first
+        if count <= 0:
+            return
+        parts = [struct.pack("<II", first, count)]
+        for name in names[first:first + count]:
+            encoded = name.encode()
+            parts.append(struct.pack("<I", len(encoded)))
+            parts.append(encoded)
+        self._write_block(b"STRS", b"".join(parts))
+        self._names_written = first + count
+
+    def buffer(self, ident: Optional[int], name: str) -> "TraceBuffer":
+        """Register a thread and return its record buffer."""
+        with self._lock:
+            index = self._threads & 0xFFFF
+            self._threads += 1
+            if self._file is not None:
+                payload = struct.pack("<HQ", index, ident or 0) + name.encode()
+                self._write_block(b"THRD", payload)
+        return TraceBuffer(self, index)
+
+    def write_records(self, data: Any) -> None:
+        """Write a block of records, preceded by any new function keys."""
+        with self._lock:
+            if self._file is None:
+                # Threads still running after the log was closed
+                return
+            self._write_names()
+            self._write_block(b"RECS", data)
+
+    def close(self) -> None:
+        """Write the remaining function keys and close the file."""
+        with self._lock:
+            if self._file is not None:
+                self._write_names()
+                self._file.close()
+                self._file = None
+
+
+class TraceBuffer:
+    """Per-thread buffer of fixed-width records."""
+
+    __slots__ = ("writer", "thread", "data", "offset")
+
+    def __init__(self, writer: TraceWriter, thread: int, capacity: int = CHUNK_RECORDS) -> None:
+        self.writer = writer
+        self.thread = thread
+        self.data = bytearray(capacity * RECORD_SIZE)
+        self.offset = 0
+
+    def append(self, func_id: int, event: int, timestamp_ns: int, energy_mj: float) -> None:
+        """Append a record, writing the buffer out when it is full."""
+        offset = self.offset
+        RECORD.pack_into(self.data, offset, func_id, event, self.thread, timestamp_ns, energy_mj)
+        offset += RECORD_SIZE
+        if offset == len(self.data):
+            self.writer.write_records(self.data)
+            offset = 0
+        self.offset = offset
+
+    def flush(self) -> None:
+        """Write out the buffered records."""
+        if self.offset:
+            self.writer.write_records(memoryview(self.data)[:self.offset])
+            self.offset = 0
+
+
+class RecordingTracer(EnergyTracer):
+    """Tracer that streams raw enter/exit events to a trace log.
+
+    Instead of aggregating in memory, every enter and exit of a profiled
+    function is appended to a per-thread buffer as a fixed-width record with
+    the energy counter reading, and buffers are written to ``path`` as
+    blocks.  ``stop()`` flushes the buffers and the results are aggregated
+    from the log, so they match what ``EnergyTracer`` reports.  Per-domain
+    energy and line-level events are not recorded.
+    """
+
+    def __init__(
+        self,
+        backend: BaseBackend,
+        path: str,
+        engine: str = "auto",
+        call_limit: Optional[int] = None,
+    ) -> None:
+        super().__init__(backend, engine=engine, call_limit=call_limit)
+        self.path = path
+        # Only the scalar counter is recorded
+        self._domains = ()
+        # Open between start() and stop()
+        self._writer: Optional[TraceWriter] = None
+        self._buffer: Optional[TraceBuffer] = None
+
+    def _enter(self, func_id: int) -> None:
+        """Record entry into a profiled function."""
+        buffer = self._buffer
+        if buffer is None:
+            raise ValueError(_CLOSED)
+        timestamp_ns, energy_mj = self.backend.read()
+        self.call_stack.append(func_id)
+        buffer.append(func_id, EVENT_ENTER, timestamp_ns, energy_mj)
+
+    def _exit(self) -> None:
+        """Record exit from the innermost profiled function."""
+        buffer = self._buffer
+        if buffer is None:
+            raise ValueError(_CLOSED)
+        func_id = self.call_stack.pop()
+        try:
+            timestamp_ns, energy_mj = self.backend.read()
+        except Exception as e:
+            print(f"Warning: Energy measurement failed for {self.stats.names[func_id]}: {e}", file=sys.stderr)
+            # Keeps the log balanced; the aggregator drops the call
+            timestamp_ns, energy_mj = time.monotonic_ns(), float("nan")
+        # Calls are still counted in memory for call_limit
+        self.stats.calls[func_id] += 1
+        buffer.append(func_id, EVENT_EXIT, timestamp_ns, energy_mj)
+
+    def _thread_shard(self) -> Optional["RecordingTracer"]:
+        """Return the shard of the calling thread with its own record buffer."""
+        shard = cast("Optional[RecordingTracer]", super()._thread_shard())
+        if shard is not None and shard is not self and shard._buffer is self._buffer:
+            if self._writer is None:
+                raise ValueError(_CLOSED)
+            shard._buffer = self._writer.buffer(shard.thread_ident, shard.thread_name)
+        return shard
+
+    def start(self) -> None:
+        """Open the trace log and start tracing."""
+        metadata = {
+            "backend": self.backend.get_name(),
+            "line_level": False,
+            "engine": self._select_engine(),
+            "domains": [],
+            "timestamp": time.time(),
+        }
+        self._writer = TraceWriter(self.path, self.stats.names, metadata)
+        self._buffer = self._writer.buffer(
+            threading.get_ident(), threading.current_thread().name
+        )
+        super().start()
+
+    def stop(self) -> Dict[str, FunctionStats]:
+        """Stop tracing, flush every thread's buffer and aggregate the log."""
+        if self._running:
+            super().stop()
+            with self._shard_lock:
+                # Shards are copies of this tracer
+                shards = cast("List[RecordingTracer]", list(self._shards))
+            if self._writer is None or self._buffer is None:
+                raise ValueError(_CLOSED)
+            self._buffer.flush()
+            for shard in shards:
+                if shard._buffer is not None:
+                    shard._buffer.flush()
+            self._writer.close()
+            self._writer = None
+            self._buffer = None
+            _, self.stats, self.thread_results = read_trace(self.path)
+        return self.stats.to_function_stats()
+
+    def get_results(self) -> Dict[str, Any]:
+        """Get results aggregated from the trace log."""
+        results = super().get_results()
+        results["metadata"].update({"mode": "record", "trace_log": self.path})
+        return results
+
+
+def read_blocks(data: Any) -> Iterator[Tuple[bytes, memoryview]]:
+    """Yield (tag, payload) for every complete block of a trace log."""
+    view = memoryview(data)
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a py-power-profile trace log")
+    offset = len(MAGIC)
+    end = len(view)
+    while offset + _BLOCK_HEADER.size <= end:
+        tag, length = _BLOCK_HEADER.unpack_from(view, offset)
+        offset += _BLOCK_HEADER.size
+        if offset + length > end:
+            # Truncated by a crash
+            break
+        yield tag, view[offset:offset + length]
+        offset += length
+
+
+def read_trace(
+    path: str, use_numpy: Optional[bool] = None
+) -> Tuple[Dict[str, Any], StatsTable, List[Dict[str, Any]]]:
+    """Aggregate a trace log into (metadata, statistics, per-thread summaries).
+
+    Uses vectorized NumPy reductions when NumPy is installed (or
+    ``use_numpy`` is true) and a streaming pure-Python pass otherwise.
+    """
+    if use_numpy is None:
+        try:
+            import numpy  # noqa: F401
+            use_numpy = True
+        except ImportError:
+            use_numpy = False
+
+    with open(path, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            raise ValueError("Not a py-power-profile trace log")
+        # Unmapped once the record views are released
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return _read_blocks(data, use_numpy)
+
+
+def aggregate_trace(path: str, use_numpy: Optional[bool] = None) -> Dict[str, Any]:
+    """Build the results of a recorded run from its trace log."""
+    metadata, stats, thread_results = read_trace(path, use_numpy)
+
+    functions = {}
+    total_energy = 0.0
+    total_time = 0.0
+    for func_id, func_key in stats.rows():
+        functions[func_key] = stats.to_dict(func_id)
+        total_energy += stats.self_energy[func_id]
+        total_time += stats.self_time[func_id]
+
+    results: Dict[str, Any] = {"metadata": metadata, "functions": functions}
+    if thread_results:
+        results["threads"] = thread_results
+    results["summary"] = {
+        "total_energy_mj": total_energy,
+        "total_time_ms": total_time,
+        "function_count": len(functions),
+    }
+    return results
+
+
+def _read_blocks(
+    data: Any, use_numpy: bool
+) -> Tuple[Dict[str, Any], StatsTable, List[Dict[str, Any]]]:
+    """Decode the blocks of a mapped trace log and replay each thread."""
+    metadata: Dict[str, Any] = {}
+    names: List[str] = []
+    threads: Dict[int, Tuple[int, str]] = {}
+    chunks: Dict[int, List[memoryview]] = defaultdict(list)
+
+    for tag, payload in read_blocks(data):
+        if tag == b"RECS":
+            if len(payload) >= RECORD_SIZE:
+                thread = RECORD.unpack_from(payload, 0)[2]
+                chunks[thread].append(payload)
+        elif tag == b"STRS":
+            first, count = struct.unpack_from("<II", payload, 0)
+            offset = 8
+            del names[first:]
+            for _ in range(count):
+                (length,) = struct.unpack_from("<I", payload, offset)
+                offset += 4
+                names.append(bytes(payload[offset:offset + length]).decode())
+                offset += length
+        elif tag == b"THRD":
+            index, ident = struct.unpack_from("<HQ", payload, 0)
+            threads[index] = (ident, bytes(payload[10:]).decode())
+        elif tag == b"META":
+            metadata = json.loads(bytes(payload).decode())
+
+    stats = StatsTable()
+    for name in names:
+        stats.intern(name)
+
+    thread_results = []
+    for index, (ident, name) in sorted(threads.items()):
+        shard = stats.shard()
+        if chunks.get(index):
+            if use_numpy:
+                _replay_numpy(shard, chunks[index])
+            else:
+                _replay(shard, chunks[index])
+        thread_results.append(thread_summary(shard, name, ident))
+        stats.merge(shard)
+    return metadata, stats, thread_results
+
+
+def _replay(stats: StatsTable, chunks: List[memoryview]) -> None:
+    """Replay one thread's records through a call stack, like the tracer."""
+    stack: List[list] = []
+    active = stats.active
+    for chunk in chunks:
+        for func_id, event, _, timestamp_ns, energy in RECORD.iter_unpack(chunk):
+            if event == EVENT_ENTER:
+                stack.append([func_id, timestamp_ns, energy, 0, 0.0])
+                active[func_id] += 1
+                continue
+            if not stack:
+                continue
+            frame = stack.pop()
+            active[func_id] -= 1
+            if energy != energy:
+                # Measurement failed at exit
+                continue
+            energy_mj = energy - frame[2]
+            time_ns = timestamp_ns - frame[1]
+            if stack:
+                parent = stack[-1]
+                parent[3] += time_ns
+                parent[4] += energy_mj
+            stats.update(
+                func_id,
+                energy_mj,
+                time_ns / 1e6,
+                energy_mj - frame[4],
+                (time_ns - frame[3]) / 1e6,
+                active[func_id] > 0,
+            )
+    for frame in stack:
+        active[frame[0]] -= 1
+
+
+def _replay_numpy(stats: StatsTable, chunks: List[memoryview]) -> None:
+    """Vectorized equivalent of _replay for large logs."""
+    import numpy as np
+
+    dtype = np.dtype(
+        [("func", "<u4"), ("event", "u1"), ("pad", "V1"), ("thread", "<u2"),
+         ("ts", "<i8"), ("energy", "<f8")]
+    )
+    records = np.frombuffer(b"".join(chunks), dtype=dtype)
+    count = len(records)
+    func = records["func"].astype(np.int64)
+    is_enter = records["event"] == EVENT_ENTER
+    timestamps = records["ts"]
+    energy = records["energy"]
+
+    # Stack level of each event: an enter and its matching exit share a
+    # level and are adjacent once events are ordered by level then position
+    depth = np.cumsum(np.where(is_enter, 1, -1))
+    level = np.where(is_enter, depth, depth + 1)
+    order = _stable_argsort(level)
+    sorted_enter = is_enter[order]
+    sorted_level = level[order]
+    matched = sorted_enter[:-1] & ~sorted_enter[1:] & (sorted_level[:-1] == sorted_level[1:])
+    enters = order[:-1][matched]
+    exits = order[1:][matched]
+    if not len(enters):
+        return
+
+    pair_func = func[enters]
+    pair_level = level[enters]
+    time_ns = timestamps[exits] - timestamps[enters]
+    energy_mj = energy[exits] - energy[enters]
+    measured = ~np.isnan(energy_mj)
+
+    # Parent of each call: the last call one level up that started before it
+    stride = count + 1
+    keys = pair_level * stride + enters
+    parent = np.searchsorted(keys, (pair_level - 1) * stride + enters) - 1
+    valid = parent >= 0
+    valid[valid] &= (pair_level[parent[valid]] == pair_level[valid] - 1) & (
+        exits[parent[valid]] > enters[valid]
+    )
+    valid &= measured
+    calls = len(enters)
+    child_ns = np.bincount(parent[valid], weights=time_ns[valid], minlength=calls)
+    child_mj = np.bincount(parent[valid], weights=energy_mj[valid], minlength=calls)
+
+    # A call is recursive when another frame of the same function is open:
+    # grouped by function in time order, that is a per-function depth above 1
+    by_func = _stable_argsort(func)
+    func_depth = np.cumsum(np.where(is_enter[by_func], 1, -1))
+    group_start = np.flatnonzero(np.diff(func[by_func], prepend=-1))
+    baseline = np.concatenate(([0], func_depth[group_start[1:] - 1]))
+    sizes = np.diff(np.append(group_start, count))
+    func_depth -= np.repeat(baseline, sizes)
+    event_depth = np.empty(count, dtype=func_depth.dtype)
+    event_depth[by_func] = func_depth
+    recursive = event_depth[enters] > 1
+
+    pair_func = pair_func[measured]
+    time_ns = time_ns[measured]
+    energy_mj = energy_mj[measured]
+    self_ns = time_ns - child_ns[measured]
+    self_mj = energy_mj - child_mj[measured]
+    outer = ~recursive[measured]
+
+    # The shard is empty, so every column is simply replaced
+    size = len(stats.calls)
+    _set_column(stats.calls, np.bincount(pair_func, minlength=size))
+    _set_column(stats.total_energy, np.bincount(pair_func, weights=energy_mj * outer, minlength=size))
+    _set_column(stats.total_time, np.bincount(pair_func, weights=time_ns * outer, minlength=size) / 1e6)
+    _set_column(stats.self_energy, np.bincount(pair_func, weights=self_mj, minlength=size))
+    _set_column(stats.self_time, np.bincount(pair_func, weights=self_ns, minlength=size) / 1e6)
+    minimum = np.full(size, np.inf)
+    np.minimum.at(minimum, pair_func, energy_mj)
+    _set_column(stats.min_energy, minimum)
+    maximum = np.zeros(size)
+    np.maximum.at(maximum, pair_func, energy_mj)
+    _set_column(stats.max_energy, maximum)
+
+
+def _stable_argsort(values: Any) -> Any:
+    """Stable argsort, narrowing small non-negative keys to use radix sort."""
+    import numpy as np
+
+    if len(values) and values.min() >= 0 and values.max() < 1 << 16:
+        values = values.astype(np.uint16)
+    return np.argsort(values, kind="stable")
+
+
+def _set_column(column: array, values: Any) -> None:
+    """Overwrite a StatsTable column with a NumPy vector of the same length."""
+    column[:] = array(column.typecode, values.astype(column.typecode).tobytes())
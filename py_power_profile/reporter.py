@@ -1,13 +1,17 @@
 """Reporting and output generation."""
 
 import json
-from typing import Any, Dict, TextIO
+import linecache
+from typing import Any, Dict, List, TextIO
 
 from rich.console import Console
 from rich.table import Table
 from rich.progress import BarColumn
 from rich.text import Text
 
+from .flamegraph import hot_path
+from .significance import METHODS, compare_samples, min_p_value
+
 
 class Reporter:
     """Generate reports and output for energy profiling results."""
@@ -40,6 +44,7 @@ class Reporter:
         table.add_column("Function", style="cyan", no_wrap=True)
         table.add_column("Calls", justify="right", style="green")
         table.add_column("Total Energy (mJ)", justify="right", style="red")
+        table.add_column("Self Energy (mJ)", justify="right", style="red")
         table.add_column("Avg Energy (mJ)", justify="right", style="yellow")
         table.add_column("Total Time (ms)", justify="right", style="blue")
         table.add_column("Energy %", justify="right", style="magenta")
@@ -57,12 +62,15 @@ class Reporter:
             # Create a simple bar representation
             bar_length = 20
             filled_length = int((energy_percent / 100) * bar_length)
+            # Overhead subtraction can leave tiny functions slightly negative
+            filled_length = min(max(filled_length, 0), bar_length)
             bar = "█" * filled_length + "░" * (bar_length - filled_length)
             
             table.add_row(
                 display_name,
                 str(stats["calls"]),
                 f"{stats['total_energy_mj']:.1f}",
+                f"{stats.get('self_energy_mj', stats['total_energy_mj']):.1f}",
                 f"{stats['avg_energy_mj']:.1f}",
                 f"{stats['total_time_ms']:.1f}",
                 f"{energy_percent:.1f}% {bar}"
@@ -75,6 +83,7 @@ class Reporter:
             str(sum(f["calls"] for f in functions.values())),
             f"[bold]{total_energy:.1f}[/bold]",
             "-",
+            "-",
             f"{summary.get('total_time_ms', 0):.1f}",
             "100% " + "█" * 20
         )
@@ -82,28 +91,316 @@ class Reporter:
         self.console.print(table)
         
         # Print summary
-        self.console.print(f"\n[bold]Summary:[/bold]")
+        self.console.print("\n[bold]Summary:[/bold]")
         self.console.print(f"  Total Energy: {total_energy:.1f} mJ")
         self.console.print(f"  Total Time: {summary.get('total_time_ms', 0):.1f} ms")
         self.console.print(f"  Functions Profiled: {summary.get('function_count', 0)}")
         self.console.print(f"  Backend: {results['metadata']['backend']}")
+        overhead = results["metadata"].get("overhead")
+        if overhead:
+            per_call_us = overhead["inner_time_us"] + overhead["outer_time_us"]
+            state = "subtracted" if overhead.get("subtracted") else "not subtracted"
+            self.console.print(f"  Tracer Overhead: {per_call_us:.2f} us per call ({state})")
+
+        if results.get("call_paths"):
+            path = hot_path(results)
+            if path:
+                self.console.print("\n[bold]Hot Path:[/bold]")
+                for depth, (function, energy_mj) in enumerate(path):
+                    self.console.print(f"  {'  ' * depth}{function}: {energy_mj:.1f} mJ")
+
+        threads = results.get("threads", [])
+        if len(threads) > 1:
+            self.console.print("\n[bold]Threads:[/bold]")
+            for thread in sorted(threads, key=lambda t: t["total_energy_mj"], reverse=True):
+                self.console.print(
+                    f"  {thread['name']}: {thread['total_energy_mj']:.1f} mJ, "
+                    f"{thread['function_count']} functions"
+                )
+
+        processes = results.get("processes", {})
+        if len(processes) > 1:
+            self.console.print("\n[bold]Processes:[/bold]")
+            for pid, process in sorted(processes.items(), key=lambda p: p[1]["total_energy_mj"], reverse=True):
+                command = " ".join(process.get("argv", [])) or "?"
+                if len(command) > 50:
+                    command = command[:47] + "..."
+                self.console.print(
+                    f"  {pid} ({command}): {process['total_energy_mj']:.1f} mJ, "
+                    f"{process['function_count']} functions"
+                )
+
+        async_results = results.get("asyncio")
+        if async_results:
+            self.console.print("\n[bold]Asyncio Tasks:[/bold]")
+            tasks = async_results.get("tasks", {})
+            for name, task in sorted(tasks.items(), key=lambda t: t[1]["energy_mj"], reverse=True):
+                coroutine = task["coroutine"].rsplit(":", 1)[-1]
+                self.console.print(
+                    f"  {name} ({coroutine}): {task['energy_mj']:.1f} mJ, "
+                    f"{task['steps']} steps"
+                )
+            idle = async_results.get("idle", {})
+            self.console.print(
+                f"  Event loop idle: {idle.get('energy_mj', 0.0):.1f} mJ, "
+                f"{idle.get('time_ms', 0.0):.1f} ms in {idle.get('waits', 0)} waits"
+            )
+
+    def print_timeline(self, buckets: List[Dict[str, Any]], title: str = "Power Timeline") -> None:
+        """Print downsampled timeline buckets as a table of power bars."""
+        if not buckets:
+            self.console.print("The timeline has no samples.", style="yellow")
+            return
+
+        table = Table(title=title, show_header=True, header_style="bold magenta")
+        table.add_column("Time (ms)", justify="right", style="blue", no_wrap=True)
+        table.add_column("Energy (mJ)", justify="right", style="red")
+        table.add_column("Avg Power (W)", justify="right", style="yellow")
+        table.add_column("Peak (W)", justify="right", style="yellow")
+        table.add_column("Power", no_wrap=True, style="magenta")
+        table.add_column("Top Function", style="cyan", no_wrap=True)
+
+        max_power = max(bucket["avg_power_w"] for bucket in buckets)
+        bar_length = 20
+        for bucket in buckets:
+            filled_length = int(bucket["avg_power_w"] / max_power * bar_length) if max_power > 0 else 0
+            filled_length = min(max(filled_length, 0), bar_length)
+            bar = "█" * filled_length + "░" * (bar_length - filled_length)
+            function = bucket["top_function"] or "-"
+            if len(function) > 50:
+                function = "..." + function[-47:]
+            table.add_row(
+                f"{bucket['start_ms']:.0f}-{bucket['end_ms']:.0f}",
+                f"{bucket['energy_mj']:.1f}",
+                f"{bucket['avg_power_w']:.2f}",
+                f"{bucket['peak_power_w']:.2f}",
+                bar,
+                function,
+            )
+
+        self.console.print(table)
+
+    def print_benchmark(self, results: Dict[str, Any]) -> None:
+        """Print the per-call statistics of a benchmark."""
+        bench = results["benchmark"]
+        table = Table(
+            title=f"Benchmark: {bench['name']} (Backend: {results['metadata']['backend']})",
+            show_header=True,
+            header_style="bold magenta",
+        )
+        table.add_column("Per Call", style="cyan")
+        table.add_column("Mean", justify="right", style="red")
+        table.add_column("Median", justify="right", style="yellow")
+        table.add_column("Std Dev", justify="right", style="blue")
+        energies = results["samples"]["functions"][bench["name"]]
+        table.add_row(
+            "Energy (mJ)",
+            f"{bench['mean_energy_mj']:.4g}",
+            f"{bench['median_energy_mj']:.4g}",
+            f"{bench['stdev_energy_mj']:.2g}",
+        )
+        table.add_row(
+            "Time (ms)",
+            f"{bench['mean_time_ms']:.4g}",
+            f"{bench['median_time_ms']:.4g}",
+            f"{bench['stdev_time_ms']:.2g}",
+        )
+        self.console.print(table)
+
+        self.console.print("\n[bold]Summary:[/bold]")
+        self.console.print(
+            f"  Samples: {bench['samples']} x {bench['loops']} loops ({bench['warmups']} warmups)"
+        )
+        self.console.print(f"  Range: {min(energies):.4g} - {max(energies):.4g} mJ per call")
+        self.console.print(f"  Idle Power Subtracted: {bench['idle_power_w']:.3f} W")
+        self.console.print(f"  Counter Update Period: {bench['counter_period_ms']:.3g} ms")
+
+    def print_overhead(self, report: Dict[str, Any]) -> None:
+        """Print the tracer's own cost per call in each configuration."""
+        table = Table(
+            title=f"Tracer Overhead (Backend: {report['backend']}, Python {report['python']})",
+            show_header=True,
+            header_style="bold magenta",
+        )
+        table.add_column("Engine", style="cyan")
+        table.add_column("Options", style="cyan")
+        table.add_column("Read (us)", justify="right", style="blue")
+        table.add_column("Inner (us)", justify="right", style="yellow")
+        table.add_column("Outer (us)", justify="right", style="yellow")
+        table.add_column("Per Call (us)", justify="right", style="red")
+        table.add_column("Per Call (mJ)", justify="right", style="red")
+        for row in report["configurations"]:
+            table.add_row(
+                row["engine"],
+                ", ".join(row["options"]) or "-",
+                f"{row['read_time_us']:.3f}",
+                f"{row['inner_time_us']:.3f}",
+                f"{row['outer_time_us']:.3f}",
+                f"{row['inner_time_us'] + row['outer_time_us']:.3f}",
+                f"{row['inner_energy_mj'] + row['outer_energy_mj']:.4g}",
+            )
+        self.console.print(table)
+
+    def print_backends(self, rows: List[Dict[str, Any]]) -> None:
+        """Print the registered backends with their availability and capabilities."""
+        table = Table(title="Energy Backends", show_header=True, header_style="bold magenta")
+        table.add_column("Backend", style="cyan")
+        table.add_column("Available")
+        table.add_column("Kind")
+        table.add_column("Step (mJ)", justify="right", style="blue")
+        table.add_column("Update (ms)", justify="right", style="yellow")
+        table.add_column("Read (us)", justify="right", style="yellow")
+        table.add_column("Domains")
+        table.add_column("Auto")
+        for row in rows:
+            capabilities = row["capabilities"]
+            if capabilities is None:
+                table.add_row(row["name"], f"[red]error: {row['error']}[/red]", *["-"] * 6)
+                continue
+            table.add_row(
+                row["name"],
+                "[green]yes[/green]" if row["available"] else "[red]no[/red]",
+                "measured" if capabilities["measured"] else "estimated",
+                f"{capabilities['resolution_mj']:.3g}",
+                f"{capabilities['update_period_ms']:.3g}",
+                f"{capabilities['read_cost_us']:.3g}",
+                "yes" if capabilities["per_domain"] else "no",
+                "yes" if capabilities["auto"] else "no",
+            )
+        self.console.print(table)
+
+    def print_annotated_source(self, results: Dict[str, Any], top: int = 3) -> None:
+        """Print the source of the hottest line-profiled functions with per-line energy.
+
+        Functions are ranked by self energy, so wrappers around the real work
+        (``<module>``, runpy) do not crowd it out.  Lines are listed from the
+        first to the last executed one; figures of a line include the calls
+        made from it.
+        """
+        by_function: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        for line_key, stats in results.get("lines", {}).items():
+            line = int(line_key.rsplit(":", 1)[1])
+            by_function.setdefault(stats["function"], {})[line] = stats
+        if not by_function:
+            return
+
+        functions = results.get("functions", {})
+
+        def function_energy(func_key: str, field: str) -> float:
+            if func_key in functions:
+                return functions[func_key].get(field, functions[func_key]["total_energy_mj"])
+            return sum(stats["energy_mj"] for stats in by_function[func_key].values())
+
+        hottest = sorted(
+            by_function, key=lambda func_key: function_energy(func_key, "self_energy_mj"), reverse=True
+        )[:top]
+        for func_key in hottest:
+            lines = by_function[func_key]
+            filename = func_key.rsplit(":", 1)[0]
+            energy_mj = function_energy(func_key, "total_energy_mj")
+            table = Table(
+                title=f"{func_key} ({energy_mj:.1f} mJ)",
+                show_header=True,
+                header_style="bold magenta",
+            )
+            table.add_column("Line", justify="right", style="dim")
+            table.add_column("Hits", justify="right", style="green")
+            table.add_column("Energy (mJ)", justify="right", style="red")
+            table.add_column("Time (ms)", justify="right", style="blue")
+            table.add_column("%", justify="right", style="magenta")
+            table.add_column("Source", no_wrap=True)
+            for line in range(min(lines), max(lines) + 1):
+                source = Text(linecache.getline(filename, line).rstrip())
+                stats = lines.get(line)
+                if stats is None:
+                    table.add_row(str(line), "", "", "", "", source)
+                    continue
+                share = stats["energy_mj"] / energy_mj * 100 if energy_mj > 0 else 0.0
+                table.add_row(
+                    str(line),
+                    str(stats["hits"]),
+                    f"{stats['energy_mj']:.1f}",
+                    f"{stats['time_ms']:.1f}",
+                    f"{share:.1f}",
+                    source,
+                )
+            self.console.print(table)
 
     def write_json(self, results: Dict[str, Any], output_file: TextIO) -> None:
         """Write results to JSON file."""
         json.dump(results, output_file, indent=2)
 
-    def compare_results(self, old_results: Dict[str, Any], new_results: Dict[str, Any]) -> Dict[str, Any]:
-        """Compare two profiling results and return differences."""
+    def compare_results(
+        self,
+        old_results: Dict[str, Any],
+        new_results: Dict[str, Any],
+        method: str = "auto",
+        alpha: float = 0.05,
+        min_change_percent: float = 10.0,
+    ) -> Dict[str, Any]:
+        """Compare two profiling results and return differences.
+
+        ``method`` is ``threshold`` (flag any change beyond
+        ``min_change_percent``), ``mannwhitney`` or ``bootstrap`` (flag
+        changes beyond ``min_change_percent`` that are also significant at
+        ``alpha`` across the per-run samples of ``--repeat``).  ``auto``
+        picks Mann-Whitney when both results have enough runs for it to
+        reach ``alpha``, the bootstrap when they have at least 2, and the
+        threshold otherwise.
+        """
         old_functions = old_results.get("functions", {})
         new_functions = new_results.get("functions", {})
+        old_samples = old_results.get("samples")
+        new_samples = new_results.get("samples")
+        if method == "auto":
+            old_runs = old_samples.get("runs", 0) if old_samples is not None else 0
+            new_runs = new_samples.get("runs", 0) if new_samples is not None else 0
+            if min(old_runs, new_runs) < 2:
+                method = "threshold"
+            elif min_p_value(old_runs, new_runs) < alpha:
+                method = "mannwhitney"
+            else:
+                # Too few runs for any Mann-Whitney p-value to reach alpha
+                method = "bootstrap"
+        if method != "threshold" and method not in METHODS:
+            raise ValueError(f"Unknown comparison method: {method}")
+        if method != "threshold" and (old_samples is None or new_samples is None):
+            raise ValueError(f"The {method} method needs results profiled with --repeat")
         
         comparison = {
             "old_summary": old_results.get("summary", {}),
             "new_summary": new_results.get("summary", {}),
+            "method": method,
+            "alpha": alpha,
+            "min_change_percent": min_change_percent,
             "changes": {},
             "regressions": [],
             "improvements": []
         }
+
+        if method != "threshold":
+            tests = compare_samples(
+                old_samples["functions"], new_samples["functions"], method, alpha, min_change_percent
+            )
+            for func_key, change in sorted(tests.items()):
+                change["old_calls"] = old_functions.get(func_key, {}).get("calls", 0)
+                change["new_calls"] = new_functions.get(func_key, {}).get("calls", 0)
+                comparison["changes"][func_key] = change
+                if change["significant"]:
+                    if change["change_percent"] > 0:
+                        comparison["regressions"].append(func_key)
+                    else:
+                        comparison["improvements"].append(func_key)
+            total = compare_samples(
+                {"total": old_samples["total_energy_mj"]},
+                {"total": new_samples["total_energy_mj"]},
+                method,
+                alpha,
+                min_change_percent,
+            )["total"]
+            comparison["total_change_percent"] = total["change_percent"]
+            comparison["total_significant"] = total["significant"]
+            return comparison
         
         # Calculate changes for each function
         all_functions = set(old_functions.keys()) | set(new_functions.keys())
@@ -128,10 +425,10 @@ class Reporter:
                 "new_calls": new_stats.get("calls", 0),
             }
             
-            # Check for regressions (>10% increase) and improvements (>10% decrease)
-            if change_percent > 10:
+            # Check for regressions and improvements beyond the threshold
+            if change_percent > min_change_percent:
                 comparison["regressions"].append(func_key)
-            elif change_percent < -10:
+            elif change_percent < -min_change_percent:
                 comparison["improvements"].append(func_key)
         
         # Overall change
@@ -156,7 +453,7 @@ class Reporter:
         total_change = comparison["total_change_percent"]
         
         # Overall summary
-        self.console.print(f"\n[bold]Overall Change:[/bold]")
+        self.console.print("\n[bold]Overall Change:[/bold]")
         self.console.print(f"  Old Total: {old_total:.1f} mJ")
         self.console.print(f"  New Total: {new_total:.1f} mJ")
         
@@ -166,20 +463,38 @@ class Reporter:
             self.console.print(f"  Change: [green]{total_change:.1f}%[/green] (improvement)")
         else:
             self.console.print(f"  Change: [yellow]{total_change:.1f}%[/yellow] (no change)")
+        if "total_significant" in comparison:
+            verdict = "significant" if comparison["total_significant"] else "not significant"
+            self.console.print(f"  Runs: {verdict} ({comparison['method']})")
+        
+        method = comparison.get("method", "threshold")
+        threshold = comparison.get("min_change_percent", 10.0)
+        if method == "threshold":
+            criterion = f"{threshold:g}%"
+        else:
+            criterion = f"{threshold:g}%, {method} at alpha {comparison['alpha']:g}"
         
         # Regressions
         if comparison["regressions"]:
-            self.console.print(f"\n[bold red]Regressions (>10% increase):[/bold red]")
+            self.console.print(f"\n[bold red]Regressions (>{criterion} increase):[/bold red]")
             for func_key in comparison["regressions"]:
                 change = comparison["changes"][func_key]
-                self.console.print(f"  {func_key}: +{change['change_percent']:.1f}%")
+                self.console.print(f"  {func_key}: +{change['change_percent']:.1f}%{self._test_note(change)}")
         
         # Improvements
         if comparison["improvements"]:
-            self.console.print(f"\n[bold green]Improvements (>10% decrease):[/bold green]")
+            self.console.print(f"\n[bold green]Improvements (>{criterion} decrease):[/bold green]")
             for func_key in comparison["improvements"]:
                 change = comparison["changes"][func_key]
-                self.console.print(f"  {func_key}: {change['change_percent']:.1f}%")
+                self.console.print(f"  {func_key}: {change['change_percent']:.1f}%{self._test_note(change)}")
         
         if not comparison["regressions"] and not comparison["improvements"]:
-            self.console.print(f"\n[yellow]No significant changes detected.[/yellow]") 
\ No newline at end of file
+            self.console.print("\n[yellow]No significant changes detected.[/yellow]") 
+
+    def _test_note(self, change: Dict[str, Any]) -> str:
+        """Format the p-value or confidence interval of a tested change."""
+        if "p_value" in change:
+            return f" (p={change['p_value']:.3g})"
+        if "ci_low_mj" in change:
+            return f" (CI {change['ci_low_mj']:+.1f} to {change['ci_high_mj']:+.1f} mJ)"
+        return ""
@@ -0,0 +1,167 @@
+"""Statistical sampling profiler as a low-overhead alternative to tracing."""
+
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+from .backends import BaseBackend
+from .tracer import (
+    _ACTIVE_THREADS,
+    IGNORED,
+    INTERNAL_THREAD_PREFIX,
+    EnergyTracer,
+    FunctionStats,
+)
+
+if TYPE_CHECKING:
+    from types import FrameType
+
+
+class SamplingTracer(EnergyTracer):
+    """Profiler that periodically snapshots thread stacks instead of tracing.
+
+    A watcher thread wakes up every ``interval_ms``, reads the energy consumed
+    since the previous tick and credits it to every profiled function on the
+    stacks of the target threads as inclusive energy, and to the innermost
+    one as self energy.  ``calls`` counts the samples in which a function was
+    on the stack; with ``call_paths`` each sample's stack is also credited
+    to its call path.  The sampling interval is stretched whenever a tick takes longer than
+    ``max_overhead`` of the interval, which bounds the profiler's cost
+    independently of how many calls the program makes.
+    """
+
+    def __init__(
+        self,
+        backend: BaseBackend,
+        interval_ms: float = 10.0,
+        max_overhead: float = 0.05,
+        all_threads: bool = False,
+        call_paths: bool = False,
+    ) -> None:
+        super().__init__(backend, call_paths=call_paths)
+        if interval_ms <= 0:
+            raise ValueError("Sampling interval must be positive")
+        if not 0 < max_overhead < 1:
+            raise ValueError("Maximum overhead must be between 0 and 1")
+
+        self.interval_s = interval_ms / 1000
+        self.max_overhead = max_overhead
+        self.all_threads = all_threads
+        self.samples = 0
+        self._target_ids: Optional[Set[int]] = None
+        self._base_frames: Set[int] = set()
+        # (timestamp_ns, energy_mj) of the previous tick
+        self._last_reading: Tuple[int, float] = (0, 0.0)
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def _walk_stack(self, frame: Any) -> List[int]:
+        """Return the profiled function IDs of a stack, innermost first."""
+        func_ids = []
+        base_frames = self._base_frames
+        while frame is not None and id(frame) not in base_frames:
+            func_id = self._get_code_id(frame.f_code)
+            if func_id != IGNORED:
+                func_ids.append(func_id)
+            frame = frame.f_back
+        return func_ids
+
+    def _sample(self) -> None:
+        """Read the energy counter once and credit it to the sampled stacks."""
+        timestamp_ns, energy = self.backend.read()
+        last_ns, last_energy = self._last_reading
+        self._last_reading = (timestamp_ns, energy)
+        energy_mj = energy - last_energy
+        time_ms = (timestamp_ns - last_ns) / 1e6
+
+        watcher_id = threading.get_ident()
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == watcher_id:
+                continue
+            if self._target_ids is not None and thread_id not in self._target_ids:
+                continue
+            thread = _ACTIVE_THREADS.get(thread_id)
+            if thread is not None and thread.name.startswith(INTERNAL_THREAD_PREFIX):
+                continue
+            stack = self._walk_stack(frame)
+            if stack:
+                stacks.append(stack)
+
+        if not stacks:
+            return
+
+        with self._lock:
+            self.samples += 1
+            # Split the tick evenly between the threads that were running code
+            share_energy = energy_mj / len(stacks)
+            share_time = time_ms / len(stacks)
+            for stack in stacks:
+                leaf = stack[0]
+                # Recursive functions are credited once per sample
+                for func_id in dict.fromkeys(stack):
+                    if func_id == leaf:
+                        self.stats.update(func_id, share_energy, share_time, share_energy, share_time)
+                    else:
+                        self.stats.update(func_id, share_energy, share_time, 0.0, 0.0)
+                if self.call_tree is not None:
+                    node = 0
+                    for func_id in reversed(stack):
+                        node = self.call_tree.child(node, func_id)
+                    self.call_tree.add(node, share_energy, share_time)
+
+    def _run(self) -> None:
+        """Sampling loop executed on the watcher thread."""
+        interval = self.interval_s
+        while not self._stop_event.wait(interval):
+            tick_start = time.perf_counter()
+            try:
+                self._sample()
+            except Exception as e:
+                print(f"Warning: Energy sample failed: {e}", file=sys.stderr)
+            cost = time.perf_counter() - tick_start
+            # Keep cost / interval below the configured overhead budget
+            interval = max(self.interval_s, cost / self.max_overhead)
+
+    def start(self) -> None:
+        """Start sampling the calling thread (or every thread)."""
+        if self.all_threads:
+            self._target_ids = None
+        else:
+            self._target_ids = {threading.get_ident()}
+
+        # Frames already on the stack belong to the caller, not the program
+        frame: Optional[FrameType] = sys._getframe(1)
+        self._base_frames = set()
+        while frame is not None:
+            self._base_frames.add(id(frame))
+            frame = frame.f_back
+
+        self._stop_event.clear()
+        self._last_reading = self.backend.read()
+        self._thread = threading.Thread(
+            target=self._run, name="py-power-sampling", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> Dict[str, FunctionStats]:
+        """Stop sampling and return collected statistics."""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        return self.stats.to_function_stats()
+
+    def get_results(self) -> Dict[str, Any]:
+        """Get results in a format suitable for JSON serialization."""
+        results = super().get_results()
+        results["metadata"].update(
+            {
+                "mode": "sample",
+                "sample_interval_ms": self.interval_s * 1000,
+                "samples": self.samples,
+            }
+        )
+        return results
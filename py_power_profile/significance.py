@@ -0,0 +1,263 @@
+"""Significance tests for comparing repeated profiling runs.
+
+Both tests work on a matrix of per-run samples, one row per function, and
+are vectorized across all functions when NumPy is installed, with a
+pure-Python fallback that gives the same results more slowly.
+"""
+
+import functools
+import math
+import random
+from typing import Any, Dict, List, Sequence, Tuple
+
+METHODS = ("mannwhitney", "bootstrap")
+
+# Bootstrap resamples per comparison
+RESAMPLES = 2000
+
+# Largest run count per side for exact Mann-Whitney p-values
+EXACT_MAX_RUNS = 25
+
+
+def _has_numpy() -> bool:
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _average_ranks(values: Sequence[float]) -> List[float]:
+    """Return 1-based ranks, ties sharing their average rank."""
+    order = sorted(range(len(values)), key=values.__getitem__)
+    ranks = [0.0] * len(values)
+    start = 0
+    while start < len(order):
+        end = start
+        while end + 1 < len(order) and values[order[end + 1]] == values[order[start]]:
+            end += 1
+        rank = (start + end) / 2 + 1
+        for index in order[start:end + 1]:
+            ranks[index] = rank
+        start = end + 1
+    return ranks
+
+
+@functools.lru_cache(maxsize=None)
+def _u_counts(n1: int, n2: int) -> Tuple[int, ...]:
+    """Number of orderings of two untied samples giving each value of U."""
+    if not n1 or not n2:
+        return (1,)
+    counts = [0] * (n1 * n2 + 1)
+    # The largest value is either from the first sample, beating all n2
+    # values of the second, or from the second
+    for u, count in enumerate(_u_counts(n1 - 1, n2)):
+        counts[u + n2] += count
+    for u, count in enumerate(_u_counts(n1, n2 - 1)):
+        counts[u] += count
+    return tuple(counts)
+
+
+def min_p_value(n1: int, n2: int) -> float:
+    """Smallest two-sided Mann-Whitney p-value possible with these run counts.
+
+    Reached by fully separated samples; with 3 runs a side it is 0.1, so
+    no change can be significant at 0.05.
+    """
+    return min(1.0, 2 / math.comb(n1 + n2, n1))
+
+
+def _mann_whitney_p(u: float, n1: int, n2: int, tie_sum: float) -> float:
+    """Two-sided p-value of U.
+
+    Exact for small samples without ties, and under the tie-corrected
+    normal approximation otherwise.
+    """
+    if not tie_sum and max(n1, n2) <= EXACT_MAX_RUNS:
+        counts = _u_counts(n1, n2)
+        tail = round(min(u, n1 * n2 - u))
+        return min(1.0, 2 * sum(counts[:tail + 1]) / math.comb(n1 + n2, n1))
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_sum / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    delta = u - n1 * n2 / 2
+    # Continuity correction
+    delta -= math.copysign(0.5, delta) if delta else 0.0
+    return min(1.0, math.erfc(abs(delta) / math.sqrt(2 * variance)))
+
+
+def mann_whitney(old: List[List[float]], new: List[List[float]]) -> List[float]:
+    """Two-sided Mann-Whitney U p-values, row by row.
+
+    p-values are exact for up to ``EXACT_MAX_RUNS`` untied runs per side;
+    otherwise the normal approximation with tie correction is used, which
+    is accurate from about eight runs per side.
+    """
+    if not old:
+        return []
+    n1 = len(old[0])
+    n2 = len(new[0])
+    if not _has_numpy():
+        p_values = []
+        for old_row, new_row in zip(old, new):
+            values = list(old_row) + list(new_row)
+            ranks = _average_ranks(values)
+            u = sum(ranks[:n1]) - n1 * (n1 + 1) / 2
+            counts: Dict[float, int] = {}
+            for value in values:
+                counts[value] = counts.get(value, 0) + 1
+            tie_sum = sum(t ** 3 - t for t in counts.values())
+            p_values.append(_mann_whitney_p(u, n1, n2, tie_sum))
+        return p_values
+
+    import numpy as np
+
+    samples = np.concatenate((np.asarray(old, dtype=float), np.asarray(new, dtype=float)), axis=1)
+    rows, n = samples.shape
+    order = np.argsort(samples, axis=1, kind="stable")
+    ordered = np.take_along_axis(samples, order, axis=1)
+    # Runs of equal values within a row form a tie group; groups are
+    # numbered across the whole matrix so one bincount averages them all
+    starts = np.ones((rows, n), dtype=bool)
+    starts[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    group = np.cumsum(starts.ravel()) - 1
+    positions = np.tile(np.arange(1, n + 1, dtype=float), rows)
+    sizes = np.bincount(group)
+    average = (np.bincount(group, weights=positions) / sizes)[group].reshape(rows, n)
+    ranks = np.empty_like(average)
+    np.put_along_axis(ranks, order, average, axis=1)
+
+    u_rows = ranks[:, :n1].sum(axis=1) - n1 * (n1 + 1) / 2
+    group_rows = np.repeat(np.arange(rows), n)[starts.ravel()]
+    tie_sums = np.bincount(group_rows, weights=sizes ** 3.0 - sizes, minlength=rows)
+    return [
+        _mann_whitney_p(float(u_row), n1, n2, float(ties))
+        for u_row, ties in zip(u_rows, tie_sums)
+    ]
+
+
+def bootstrap_interval(
+    old: List[List[float]],
+    new: List[List[float]],
+    alpha: float = 0.05,
+    resamples: int = RESAMPLES,
+    seed: int = 0,
+) -> List[Tuple[float, float]]:
+    """Percentile bootstrap intervals of mean(new) - mean(old), row by row.
+
+    The same resampled runs are used for every row, which turns the
+    resampled means into two matrix products.
+    """
+    if not old:
+        return []
+    n1 = len(old[0])
+    n2 = len(new[0])
+    low_q = alpha / 2
+    high_q = 1 - alpha / 2
+    if not _has_numpy():
+        rng = random.Random(seed)
+        draws = [
+            ([rng.randrange(n1) for _ in range(n1)], [rng.randrange(n2) for _ in range(n2)])
+            for _ in range(resamples)
+        ]
+        intervals = []
+        for old_row, new_row in zip(old, new):
+            differences = sorted(
+                sum(new_row[i] for i in new_draw) / n2 - sum(old_row[i] for i in old_draw) / n1
+                for old_draw, new_draw in draws
+            )
+            intervals.append((
+                _percentile(differences, low_q),
+                _percentile(differences, high_q),
+            ))
+        return intervals
+
+    import numpy as np
+
+    generator = np.random.default_rng(seed)
+    # How often each run is drawn in each resample, as mean weights
+    old_weights = generator.multinomial(n1, np.full(n1, 1 / n1), size=resamples) / n1
+    new_weights = generator.multinomial(n2, np.full(n2, 1 / n2), size=resamples) / n2
+    mean_differences = (
+        np.asarray(new, dtype=float) @ new_weights.T - np.asarray(old, dtype=float) @ old_weights.T
+    )
+    low, high = np.quantile(mean_differences, [low_q, high_q], axis=1)
+    return list(zip(low.tolist(), high.tolist()))
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """Linearly interpolated quantile of sorted values."""
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def compare_samples(
+    old: Dict[str, List[float]],
+    new: Dict[str, List[float]],
+    method: str = "mannwhitney",
+    alpha: float = 0.05,
+    min_change_percent: float = 10.0,
+) -> Dict[str, Dict[str, Any]]:
+    """Compare per-run energy samples of each function.
+
+    A change is significant when the test rejects "no change" at ``alpha``
+    and the mean changed by at least ``min_change_percent``.  Functions
+    missing from one side count as 0 mJ in every run of that side.
+    Mann-Whitney is refused when too few runs could ever reject at ``alpha``.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown comparison method: {method}")
+    if not 0 < alpha < 1:
+        raise ValueError("Significance level must be between 0 and 1")
+
+    keys = sorted(set(old) | set(new))
+    if not keys:
+        return {}
+    n1 = max(len(runs) for runs in old.values()) if old else 0
+    n2 = max(len(runs) for runs in new.values()) if new else 0
+    if n1 < 2 or n2 < 2:
+        raise ValueError("Significance tests need at least 2 runs on each side")
+    if method == "mannwhitney" and min_p_value(n1, n2) >= alpha:
+        raise ValueError(
+            f"Mann-Whitney cannot be significant at alpha {alpha:g} with {n1} and {n2} runs;"
+            " repeat more runs or use the bootstrap method"
+        )
+
+    old_rows = [_pad(old.get(key, []), n1) for key in keys]
+    new_rows = [_pad(new.get(key, []), n2) for key in keys]
+
+    if method == "mannwhitney":
+        tests = [{"p_value": p} for p in mann_whitney(old_rows, new_rows)]
+        rejected = [test["p_value"] < alpha for test in tests]
+    else:
+        tests = [
+            {"ci_low_mj": low, "ci_high_mj": high}
+            for low, high in bootstrap_interval(old_rows, new_rows, alpha)
+        ]
+        rejected = [test["ci_low_mj"] > 0 or test["ci_high_mj"] < 0 for test in tests]
+
+    comparison = {}
+    for key, old_row, new_row, test, reject in zip(keys, old_rows, new_rows, tests, rejected):
+        old_mean = sum(old_row) / n1
+        new_mean = sum(new_row) / n2
+        if old_mean != 0:
+            # Means below idle power can be negative, e.g. from benchmarks
+            change_percent = (new_mean - old_mean) / abs(old_mean) * 100
+        else:
+            change_percent = 0.0 if new_mean == 0 else float("inf")
+        comparison[key] = {
+            "old_energy_mj": old_mean,
+            "new_energy_mj": new_mean,
+            "change_percent": change_percent,
+            "significant": reject and abs(change_percent) >= min_change_percent,
+            **test,
+        }
+    return comparison
+
+
+def _pad(runs: List[float], count: int) -> List[float]:
+    """Fill in 0 mJ for runs in which a function did not appear."""
+    return list(runs) + [0.0] * (count - len(runs))
@@ -0,0 +1,419 @@
+"""Per-function statistics storage."""
+
+import threading
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+INF = float('inf')
+
+
+class FunctionStats:
+    """Statistics for a single function.
+
+    ``total_*`` figures are inclusive of callees, ``self_*`` figures exclude
+    them.  Recursive calls only add to the inclusive totals at the outermost
+    level so that a recursive function is not counted several times over.
+    ``domain_energy_mj`` holds inclusive energy per backend domain
+    (e.g. RAPL core/dram) when the backend reports domains.
+    """
+
+    __slots__ = (
+        "calls",
+        "total_energy_mj",
+        "total_time_ms",
+        "self_energy_mj",
+        "self_time_ms",
+        "min_energy_mj",
+        "max_energy_mj",
+        "domain_energy_mj",
+    )
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total_energy_mj = 0.0
+        self.total_time_ms = 0.0
+        self.self_energy_mj = 0.0
+        self.self_time_ms = 0.0
+        self.min_energy_mj = INF
+        self.max_energy_mj = 0.0
+        self.domain_energy_mj: Optional[List[float]] = None
+
+    def update(
+        self,
+        energy_mj: float,
+        time_ms: float,
+        self_energy_mj: Optional[float] = None,
+        self_time_ms: Optional[float] = None,
+        recursive: bool = False,
+        domain_energy_mj: Optional[Sequence[float]] = None,
+    ) -> None:
+        """Update statistics with new measurement."""
+        self.calls += 1
+        if not recursive:
+            self.total_energy_mj += energy_mj
+            self.total_time_ms += time_ms
+            if domain_energy_mj is not None:
+                if self.domain_energy_mj is None:
+                    self.domain_energy_mj = list(domain_energy_mj)
+                else:
+                    for index, value in enumerate(domain_energy_mj):
+                        self.domain_energy_mj[index] += value
+        self.self_energy_mj += energy_mj if self_energy_mj is None else self_energy_mj
+        self.self_time_ms += time_ms if self_time_ms is None else self_time_ms
+        self.min_energy_mj = min(self.min_energy_mj, energy_mj)
+        self.max_energy_mj = max(self.max_energy_mj, energy_mj)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for JSON serialization."""
+        return {
+            "calls": self.calls,
+            "total_energy_mj": self.total_energy_mj,
+            "total_time_ms": self.total_time_ms,
+            "self_energy_mj": self.self_energy_mj,
+            "self_time_ms": self.self_time_ms,
+            "avg_energy_mj": self.total_energy_mj / self.calls if self.calls > 0 else 0.0,
+            "avg_time_ms": self.total_time_ms / self.calls if self.calls > 0 else 0.0,
+            "min_energy_mj": self.min_energy_mj if self.min_energy_mj != INF else 0.0,
+            "max_energy_mj": self.max_energy_mj,
+        }
+
+
+class StatsTable:
+    """Columnar statistics for many functions, indexed by interned IDs.
+
+    Function keys are interned to dense integer IDs on first sight, and each
+    statistic lives in its own ``array`` column indexed by that ID, so a
+    tracked function costs a few machine words instead of an object with a
+    ``__dict__``.  The table also behaves as a mapping from function keys to
+    ``FunctionStats`` snapshots, which are only built on access or export.
+
+    ``shard()`` creates a table that shares the key registry, so the same
+    function has the same ID in every shard (e.g. one per thread) and shards
+    can be merged column by column.
+    """
+
+    def __init__(self, domain_count: int = 0) -> None:
+        self.names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        # Tables sharing this registry; interning grows all of them
+        self._group: List["StatsTable"] = [self]
+        self._lock = threading.Lock()
+        self.calls = array("q")
+        self.total_energy = array("d")
+        self.total_time = array("d")
+        self.self_energy = array("d")
+        self.self_time = array("d")
+        self.min_energy = array("d")
+        self.max_energy = array("d")
+        # Number of frames of each function currently on the stack
+        self.active = array("q")
+        self.domain_count = domain_count
+        self.domain_energy = [array("d") for _ in range(domain_count)]
+
+    def shard(self) -> "StatsTable":
+        """Create an empty table sharing this table's key registry."""
+        table = StatsTable(self.domain_count)
+        with self._lock:
+            table.names = self.names
+            table._ids = self._ids
+            table._group = self._group
+            table._lock = self._lock
+            for _ in self.names:
+                table._append_row()
+            self._group.append(table)
+        return table
+
+    def _append_row(self) -> None:
+        """Append an empty row to every column."""
+        self.calls.append(0)
+        self.total_energy.append(0.0)
+        self.total_time.append(0.0)
+        self.self_energy.append(0.0)
+        self.self_time.append(0.0)
+        self.min_energy.append(INF)
+        self.max_energy.append(0.0)
+        self.active.append(0)
+        for column in self.domain_energy:
+            column.append(0.0)
+
+    def intern(self, key: str) -> int:
+        """Return the ID of a function key, allocating a row if needed."""
+        func_id = self._ids.get(key)
+        if func_id is None:
+            with self._lock:
+                func_id = self._ids.get(key)
+                if func_id is None:
+                    for table in self._group:
+                        table._append_row()
+                    func_id = len(self.names)
+                    self.names.append(key)
+                    self._ids[key] = func_id
+        return func_id
+
+    def merge(self, other: "StatsTable") -> None:
+        """Add the statistics of a shard of the same registry to this table."""
+        for func_id in range(min(len(self.calls), len(other.calls))):
+            if not other.calls[func_id]:
+                continue
+            self.calls[func_id] += other.calls[func_id]
+            self.total_energy[func_id] += other.total_energy[func_id]
+            self.total_time[func_id] += other.total_time[func_id]
+            self.self_energy[func_id] += other.self_energy[func_id]
+            self.self_time[func_id] += other.self_time[func_id]
+            self.min_energy[func_id] = min(self.min_energy[func_id], other.min_energy[func_id])
+            self.max_energy[func_id] = max(self.max_energy[func_id], other.max_energy[func_id])
+            for column, other_column in zip(self.domain_energy, other.domain_energy):
+                column[func_id] += other_column[func_id]
+
+    def update(
+        self,
+        func_id: int,
+        energy_mj: float,
+        time_ms: float,
+        self_energy_mj: float,
+        self_time_ms: float,
+        recursive: bool = False,
+        domain_energy_mj: Optional[Sequence[float]] = None,
+    ) -> None:
+        """Update a function's row with a new measurement."""
+        self.calls[func_id] += 1
+        if not recursive:
+            self.total_energy[func_id] += energy_mj
+            self.total_time[func_id] += time_ms
+            if domain_energy_mj is not None:
+                for column, value in zip(self.domain_energy, domain_energy_mj):
+                    column[func_id] += value
+        self.self_energy[func_id] += self_energy_mj
+        self.self_time[func_id] += self_time_ms
+        if energy_mj < self.min_energy[func_id]:
+            self.min_energy[func_id] = energy_mj
+        if energy_mj > self.max_energy[func_id]:
+            self.max_energy[func_id] = energy_mj
+
+    def get(self, func_id: int) -> FunctionStats:
+        """Build a FunctionStats snapshot of a row."""
+        stats = FunctionStats()
+        stats.calls = self.calls[func_id]
+        stats.total_energy_mj = self.total_energy[func_id]
+        stats.total_time_ms = self.total_time[func_id]
+        stats.self_energy_mj = self.self_energy[func_id]
+        stats.self_time_ms = self.self_time[func_id]
+        stats.min_energy_mj = self.min_energy[func_id]
+        stats.max_energy_mj = self.max_energy[func_id]
+        if self.domain_count:
+            stats.domain_energy_mj = [column[func_id] for column in self.domain_energy]
+        return stats
+
+    def set(self, key: str, stats: FunctionStats) -> None:
+        """Overwrite a function's row from a FunctionStats object."""
+        func_id = self.intern(key)
+        self.calls[func_id] = stats.calls
+        self.total_energy[func_id] = stats.total_energy_mj
+        self.total_time[func_id] = stats.total_time_ms
+        self.self_energy[func_id] = stats.self_energy_mj
+        self.self_time[func_id] = stats.self_time_ms
+        self.min_energy[func_id] = stats.min_energy_mj
+        self.max_energy[func_id] = stats.max_energy_mj
+        if stats.domain_energy_mj is not None:
+            for column, value in zip(self.domain_energy, stats.domain_energy_mj):
+                column[func_id] = value
+
+    def to_dict(self, func_id: int) -> Dict[str, Any]:
+        """Convert a row to a dictionary for JSON serialization."""
+        return self.get(func_id).to_dict()
+
+    def rows(self) -> Iterator[Tuple[int, str]]:
+        """Yield (id, key) for every function that completed at least one call."""
+        calls = self.calls
+        for func_id, key in enumerate(self.names[:len(calls)]):
+            if calls[func_id]:
+                yield func_id, key
+
+    # Mapping interface over FunctionStats snapshots
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __getitem__(self, key: str) -> FunctionStats:
+        func_id = self._ids.get(key)
+        if func_id is None:
+            raise KeyError(key)
+        return self.get(func_id)
+
+    def __setitem__(self, key: str, stats: FunctionStats) -> None:
+        self.set(key, stats)
+
+    def items(self) -> Iterator[Tuple[str, FunctionStats]]:
+        """Yield (key, FunctionStats) pairs for completed functions."""
+        for func_id, key in self.rows():
+            yield key, self.get(func_id)
+
+    def to_function_stats(self) -> Dict[str, FunctionStats]:
+        """Materialize the table as a dictionary of FunctionStats."""
+        return dict(self.items())
+
+
+class CallTree:
+    """Prefix tree of call paths with per-node self figures.
+
+    Every distinct call path is a node, identified by its parent node and the
+    function ID of its last frame, so a path shared by many calls is stored
+    once however deep it is.  Node 0 is the root above all outermost frames.
+    Like ``StatsTable``, ``shard()`` creates a tree sharing the node registry
+    whose columns can be merged into this one.
+    """
+
+    def __init__(self) -> None:
+        # Node ID by parent node ID and function ID, packed into one int
+        self._nodes: Dict[int, int] = {}
+        self.parent = array("q", [-1])
+        self.func = array("q", [-1])
+        self._group: List["CallTree"] = [self]
+        self._lock = threading.Lock()
+        self.calls = array("q", [0])
+        self.self_energy = array("d", [0.0])
+        self.self_time = array("d", [0.0])
+
+    def shard(self) -> "CallTree":
+        """Create an empty tree sharing this tree's node registry."""
+        tree = CallTree()
+        with self._lock:
+            tree._nodes = self._nodes
+            tree.parent = self.parent
+            tree.func = self.func
+            tree._group = self._group
+            tree._lock = self._lock
+            for _ in range(len(self.parent) - 1):
+                tree._append_row()
+            self._group.append(tree)
+        return tree
+
+    def _append_row(self) -> None:
+        """Append an empty row to every counter column."""
+        self.calls.append(0)
+        self.self_energy.append(0.0)
+        self.self_time.append(0.0)
+
+    def child(self, node: int, func_id: int) -> int:
+        """Return the node of a call of func_id made from node, creating it if needed."""
+        key = (node << 32) | func_id
+        child = self._nodes.get(key)
+        if child is None:
+            with self._lock:
+                child = self._nodes.get(key)
+                if child is None:
+                    child = len(self.parent)
+                    self.parent.append(node)
+                    self.func.append(func_id)
+                    for tree in self._group:
+                        tree._append_row()
+                    self._nodes[key] = child
+        return child
+
+    def add(self, node: int, self_energy_mj: float, self_time_ms: float) -> None:
+        """Add a completed call's self figures to its node."""
+        self.calls[node] += 1
+        self.self_energy[node] += self_energy_mj
+        self.self_time[node] += self_time_ms
+
+    def merge(self, other: "CallTree") -> None:
+        """Add the figures of a shard of the same registry to this tree."""
+        for node in range(min(len(self.calls), len(other.calls))):
+            if other.calls[node]:
+                self.calls[node] += other.calls[node]
+                self.self_energy[node] += other.self_energy[node]
+                self.self_time[node] += other.self_time[node]
+
+    def paths(self, names: Sequence[str], separator: str = ";") -> Iterator[Tuple[int, str]]:
+        """Yield (node, path) for every node with calls, outermost frame first."""
+        paths: Dict[int, str] = {0: ""}
+        parent = self.parent
+        func = self.func
+        for node in range(1, len(self.calls)):
+            # Parents are always created before their children
+            prefix = paths[parent[node]]
+            path = f"{prefix}{separator}{names[func[node]]}" if prefix else names[func[node]]
+            paths[node] = path
+            if self.calls[node]:
+                yield node, path
+
+
+class LineTable:
+    """Per-line figures of profiled functions, stored as arrays by line offset.
+
+    Each function ID owns a base line and ``hits``/``energy``/``time``
+    columns indexed by ``line - base``, so recording a line event is a dict
+    lookup and three array updates with no string key.  Rows grow (and move
+    their base down) when a line outside the current range shows up, e.g.
+    from another code object sharing the function key.  Shards are plain
+    tables, since function IDs come from the shared ``StatsTable`` registry.
+    """
+
+    def __init__(self) -> None:
+        # [base line, hits, energy mJ, time ms] by function ID
+        self._rows: Dict[int, list] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def shard(self) -> "LineTable":
+        """Create an empty table for another thread."""
+        return LineTable()
+
+    def _row(self, func_id: int, line: int) -> list:
+        """Return the row of a function, widened to include line."""
+        row = self._rows.get(func_id)
+        if row is None:
+            row = [line, array("q", [0]), array("d", [0.0]), array("d", [0.0])]
+            self._rows[func_id] = row
+            return row
+        base = row[0]
+        size = len(row[1])
+        if line < base:
+            # Prepend rows for the lines before the current base
+            pad = base - line
+            row[0] = line
+            row[1] = array("q", [0] * pad) + row[1]
+            row[2] = array("d", [0.0] * pad) + row[2]
+            row[3] = array("d", [0.0] * pad) + row[3]
+        elif line >= base + size:
+            pad = line - base - size + 1
+            row[1].extend([0] * pad)
+            row[2].extend([0.0] * pad)
+            row[3].extend([0.0] * pad)
+        return row
+
+    def add(self, func_id: int, line: int, energy_mj: float, time_ms: float) -> None:
+        """Credit one execution of a line of a function."""
+        row = self._rows.get(func_id)
+        if row is None or not 0 <= line - row[0] < len(row[1]):
+            row = self._row(func_id, line)
+        offset = line - row[0]
+        row[1][offset] += 1
+        row[2][offset] += energy_mj
+        row[3][offset] += time_ms
+
+    def merge(self, other: "LineTable") -> None:
+        """Add the figures of another table to this one."""
+        for func_id, (base, hits, energy, time_ms) in other._rows.items():
+            for offset, count in enumerate(hits):
+                if count:
+                    line = base + offset
+                    row = self._row(func_id, line)
+                    index = line - row[0]
+                    row[1][index] += count
+                    row[2][index] += energy[offset]
+                    row[3][index] += time_ms[offset]
+
+    def rows(self) -> Iterator[Tuple[int, int, int, float, float]]:
+        """Yield (function ID, line, hits, energy mJ, time ms) for executed lines."""
+        for func_id, (base, hits, energy, time_ms) in self._rows.items():
+            for offset, count in enumerate(hits):
+                if count:
+                    yield func_id, base + offset, count, energy[offset], time_ms[offset]
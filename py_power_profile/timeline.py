@@ -0,0 +1,219 @@
+"""Power-over-time recording and streaming downsampling.
+
+A ``TimelineRecorder`` runs next to a tracer and appends one CSV row per
+interval: the time since the start, the energy of the interval, the average
+power and the profiled stack of the traced thread at the end of the
+interval (function keys joined with ``;``, outermost first).  Rows go
+straight to disk, so hour-long runs use constant memory, and
+``downsample()`` folds a timeline of any length into a bounded number of
+buckets for display.
+"""
+
+import contextlib
+import csv
+import sys
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set
+
+from .tracer import IGNORED, PACKAGE_DIR, EnergyTracer
+
+if TYPE_CHECKING:
+    from types import FrameType
+
+COLUMNS = ("time_ms", "energy_mj", "power_w", "stack")
+
+# Separator of function keys in the stack column
+STACK_SEPARATOR = ";"
+
+
+class TimelineRecorder:
+    """Sample the energy counter at a fixed interval, tagged with the stack.
+
+    The recorder shares the tracer's backend and function keys (so ignored
+    code is left out of the stacks) and samples the thread that calls
+    ``start()``.
+    """
+
+    def __init__(self, tracer: EnergyTracer, path: str, interval_ms: float = 10.0) -> None:
+        if interval_ms <= 0:
+            raise ValueError("Timeline interval must be positive")
+
+        self.tracer = tracer
+        self.path = path
+        self.interval_s = interval_ms / 1000
+        self.samples = 0
+        self._target_id: Optional[int] = None
+        self._base_frames: Set[int] = set()
+        self._file: Any = None
+        self._writer: Any = None
+        self._start_ns = 0
+        self._last_ns = 0
+        self._last_mj = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def _current_stack(self) -> str:
+        """Return the profiled stack of the target thread, outermost first."""
+        if self._target_id is None:
+            return ""
+        frame = sys._current_frames().get(self._target_id)
+        tracer = self.tracer
+        names = tracer.stats.names
+        base_frames = self._base_frames
+        keys = []
+        while frame is not None and id(frame) not in base_frames:
+            code = frame.f_code
+            # Frames of py-power-profile itself (tracer callbacks) are skipped
+            if not code.co_filename.startswith(PACKAGE_DIR):
+                func_id = tracer._get_code_id(code)
+                if func_id != IGNORED:
+                    keys.append(names[func_id])
+            frame = frame.f_back
+        keys.reverse()
+        return STACK_SEPARATOR.join(keys)
+
+    def _sample(self) -> None:
+        """Write the row of the interval that just ended."""
+        timestamp_ns, energy_mj = self.tracer.backend.read()
+        elapsed_ms = (timestamp_ns - self._last_ns) / 1e6
+        interval_mj = energy_mj - self._last_mj
+        self._last_ns = timestamp_ns
+        self._last_mj = energy_mj
+        # mJ per ms is W
+        power_w = interval_mj / elapsed_ms if elapsed_ms > 0 else 0.0
+        self._writer.writerow(
+            (
+                f"{(timestamp_ns - self._start_ns) / 1e6:.3f}",
+                f"{interval_mj:.6g}",
+                f"{power_w:.6g}",
+                self._current_stack(),
+            )
+        )
+        self.samples += 1
+
+    def _run(self) -> None:
+        """Sampling loop executed on the watcher thread."""
+        while not self._stop_event.wait(self.interval_s):
+            try:
+                self._sample()
+            except Exception as e:
+                print(f"Warning: Timeline sample failed: {e}", file=sys.stderr)
+
+    def start(self) -> None:
+        """Open the timeline file and start sampling the calling thread."""
+        self._target_id = threading.get_ident()
+
+        # Frames already on the stack belong to the caller, not the program
+        frame: Optional[FrameType] = sys._getframe(1)
+        self._base_frames = set()
+        while frame is not None:
+            self._base_frames.add(id(frame))
+            frame = frame.f_back
+
+        # Close the file again if anything fails before sampling starts
+        with contextlib.ExitStack() as stack:
+            self._file = stack.enter_context(open(self.path, "w", newline=""))
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(COLUMNS)
+            self._start_ns, self._last_mj = self.tracer.backend.read()
+            self._last_ns = self._start_ns
+            self.samples = 0
+            self._stop_event.clear()
+            thread = threading.Thread(
+                target=self._run, name="py-power-timeline", daemon=True
+            )
+            thread.start()
+            stack.pop_all()
+        self._thread = thread
+
+    def stop(self) -> None:
+        """Write the last partial interval and close the file."""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        try:
+            self._sample()
+        except Exception as e:
+            print(f"Warning: Timeline sample failed: {e}", file=sys.stderr)
+        self._file.close()
+        self._file = None
+
+
+def _merge(first: List[Any], second: List[Any]) -> List[Any]:
+    """Merge two adjacent buckets."""
+    if first[4] == second[4]:
+        top, top_mj = first[4], first[5] + second[5]
+    elif first[5] >= second[5]:
+        top, top_mj = first[4], first[5]
+    else:
+        top, top_mj = second[4], second[5]
+    return [
+        first[0], second[1], first[2] + second[2], max(first[3], second[3]),
+        top, top_mj, first[6] + second[6],
+    ]
+
+
+def _halve(buckets: List[List[Any]]) -> List[List[Any]]:
+    """Merge buckets pairwise, doubling their span."""
+    merged = [_merge(buckets[i], buckets[i + 1]) for i in range(0, len(buckets) - 1, 2)]
+    if len(buckets) % 2:
+        merged.append(buckets[-1])
+    return merged
+
+
+def downsample(path: str, rows: int = 40) -> List[Dict[str, Any]]:
+    """Fold a timeline file into at most ``rows`` buckets in one pass.
+
+    Buckets hold their energy, peak sample power and the innermost function
+    with the most energy.  Whenever ``2 * rows`` buckets have filled up,
+    neighbours are merged pairwise and every later bucket spans twice as
+    many samples, so memory stays bounded by ``rows`` for any file length.
+    The top function of a merged bucket is the heavier of the two; it is
+    exact only while buckets hold few samples.
+    """
+    if rows < 1:
+        raise ValueError("Row count must be at least 1")
+
+    buckets: List[List[Any]] = []
+    # [start_ms, end_ms, energy_mj, peak_w, top function, its energy, samples]
+    pending: Optional[List[Any]] = None
+    span = 1
+    previous_ms = 0.0
+    with open(path, "r", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None or tuple(header[:len(COLUMNS)]) != COLUMNS:
+            raise ValueError(f"Not a timeline file: {path}")
+        for row in reader:
+            time_ms = float(row[0])
+            energy_mj = float(row[1])
+            leaf = row[3].rsplit(STACK_SEPARATOR, 1)[-1]
+            sample: List[Any] = [previous_ms, time_ms, energy_mj, float(row[2]), leaf, energy_mj, 1]
+            previous_ms = time_ms
+            pending = sample if pending is None else _merge(pending, sample)
+            if pending[6] < span:
+                continue
+            buckets.append(pending)
+            pending = None
+            if len(buckets) == 2 * rows:
+                buckets = _halve(buckets)
+                span *= 2
+    if pending is not None:
+        buckets.append(pending)
+    while len(buckets) > rows:
+        buckets = _halve(buckets)
+
+    return [
+        {
+            "start_ms": bucket[0],
+            "end_ms": bucket[1],
+            "energy_mj": bucket[2],
+            "avg_power_w": bucket[2] / (bucket[1] - bucket[0]) if bucket[1] > bucket[0] else 0.0,
+            "peak_power_w": bucket[3],
+            "top_function": bucket[4],
+            "samples": bucket[6],
+        }
+        for bucket in buckets
+    ]
@@ -1,130 +1,1153 @@
 """Function tracing and energy measurement."""
 
+import copy
+import dis
+import functools
+import inspect
+import os
+import selectors
 import sys
+import sysconfig
+import threading
 import time
 from collections import defaultdict
-from typing import Any, Callable, Dict, Optional, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
 from .backends import BaseBackend
 from .config import config
+from .stats import CallTree, FunctionStats, LineTable, StatsTable
 
+if TYPE_CHECKING:
+    from types import CodeType, FrameType
 
-class FunctionStats:
-    """Statistics for a single function."""
+ENGINES = ("auto", "settrace", "monitoring")
 
-    def __init__(self) -> None:
-        self.calls = 0
-        self.total_energy_mj = 0.0
-        self.total_time_ms = 0.0
-        self.min_energy_mj = float('inf')
-        self.max_energy_mj = 0.0
+# sys.monitoring (PEP 669) is available from Python 3.12
+_monitoring: Any = getattr(sys, "monitoring", None)
+HAS_MONITORING = _monitoring is not None
+MONITORING_DISABLE = _monitoring.DISABLE if HAS_MONITORING else None
 
-    def update(self, energy_mj: float, time_ms: float) -> None:
-        """Update statistics with new measurement."""
-        self.calls += 1
-        self.total_energy_mj += energy_mj
-        self.total_time_ms += time_ms
-        self.min_energy_mj = min(self.min_energy_mj, energy_mj)
-        self.max_energy_mj = max(self.max_energy_mj, energy_mj)
+# Upper bound on memoized code objects before the cache is reset
+CODE_CACHE_SIZE = 65536
 
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for JSON serialization."""
-        return {
-            "calls": self.calls,
-            "total_energy_mj": self.total_energy_mj,
-            "total_time_ms": self.total_time_ms,
-            "avg_energy_mj": self.total_energy_mj / self.calls if self.calls > 0 else 0.0,
-            "avg_time_ms": self.total_time_ms / self.calls if self.calls > 0 else 0.0,
-            "min_energy_mj": self.min_energy_mj if self.min_energy_mj != float('inf') else 0.0,
-            "max_energy_mj": self.max_energy_mj,
-        }
+# Function ID cached for code that is not traced
+IGNORED = -1
+
+# Threads owned by py-power-profile itself (samplers, watchers) are not traced
+# and neither is its own code (profiling API wrappers, run_script)
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+INTERNAL_THREAD_PREFIX = "py-power"
+
+# Code flags of frames that can suspend and resume: generators, coroutines
+# and async generators
+RESUMABLE_FLAGS = (
+    inspect.CO_GENERATOR
+    | inspect.CO_COROUTINE
+    | inspect.CO_ITERABLE_COROUTINE
+    | inspect.CO_ASYNC_GENERATOR
+)
+
+_YIELD_VALUE = dis.opmap["YIELD_VALUE"]
+# Python 3.11+ marks where a frame starts or resumes with RESUME
+_RESUME = dis.opmap.get("RESUME", -1)
+# Python < 3.11 awaits with YIELD_FROM
+_YIELD_FROM = dis.opmap.get("YIELD_FROM", -1)
+
+# Event loops wait for I/O in the select() methods of this file
+_SELECTORS_FILE = selectors.BaseSelector.get_key.__code__.co_filename
+
+_MISSING: Any = object()
+
+# Registry of started threads by ident, maintained by the threading module
+_ACTIVE_THREADS: Dict[int, threading.Thread] = getattr(threading, "_active", {})
+
+# Traced empty calls per calibration round, and rounds per calibration
+CALIBRATION_CALLS = 5000
+CALIBRATION_ROUNDS = 3
+
+# Calibrations measured in this process, by backend and tracer options
+_calibrations: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+_calibrations_lock = threading.Lock()
 
 
 class EnergyTracer:
-    """Tracer that measures energy consumption of function calls."""
+    """Tracer that measures energy consumption of function calls.
+
+    On Python 3.12+ the tracer registers ``sys.monitoring`` (PEP 669)
+    callbacks, which lets it switch off events per code object for ignored
+    code.  Older interpreters fall back to ``sys.settrace``.  Pass
+    ``engine="settrace"`` or ``engine="monitoring"`` to force either one.
+
+    ``call_limit`` caps how many calls of each function are measured.  Under
+    the monitoring engine a function that reaches the limit, like ignored
+    code, has its events disabled and runs untraced from then on.
+
+    Threads started while tracing get their own shard: a shallow copy of the
+    tracer with a private call stack and a ``StatsTable`` shard sharing the
+    function IDs.  Shards are merged into ``stats`` at ``stop()`` and kept as
+    a per-thread breakdown.  Energy backends that measure the whole package
+    credit concurrently running threads with the same energy.
+
+    With ``async_mode`` generators and coroutines are measured per call
+    rather than per resumption: a suspended frame is taken off the call stack
+    with its partial figures, which are carried over when it resumes, so the
+    time it spends suspended is not charged to it and ``calls`` counts
+    completed calls.  Each resumption of an asyncio task's coroutine is also
+    credited to the task, and the time the event loop spends waiting in its
+    selector is reported as idle.
+
+    With ``call_paths`` the self figures of every call are also kept per
+    call path in a ``CallTree``, which results export as ``call_paths``
+    keyed by collapsed stack for flame graphs.
+
+    With ``line_level`` each line event closes the previous line's segment
+    of the innermost profiled frame, credited to that line in a
+    ``LineTable``; results export them as ``lines`` keyed by ``file:line``.
+    Line events never touch the function figures.  ``line_functions``
+    limits line events to the given function keys, e.g. the hottest ones of
+    an earlier function-level run (see ``hottest_functions()``): settrace
+    only turns on line events for their frames, and ``sys.monitoring``
+    enables LINE locally on their code objects, so other code runs at
+    function-level cost.
+
+    With ``subtract_overhead`` ``start()`` takes the tracer's own cost per
+    call (see ``calibrate()``, measured once per process for a backend and
+    set of options) out of every call's inclusive and self figures: the part
+    of the callbacks inside a call's measurement window from the call
+    itself, and the whole cost of each traced descendant from its ancestors.
+    Corrected figures of calls cheaper than the calibration noise are
+    clamped at 0.  Line figures are not corrected.
+    """
+
+    def __init__(
+        self,
+        backend: BaseBackend,
+        line_level: bool = False,
+        engine: str = "auto",
+        call_limit: Optional[int] = None,
+        async_mode: bool = False,
+        call_paths: bool = False,
+        subtract_overhead: bool = False,
+        line_functions: Optional[Collection[str]] = None,
+    ) -> None:
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown tracing engine: {engine}")
+        if engine == "monitoring" and not HAS_MONITORING:
+            raise ValueError("The monitoring engine requires Python 3.12 or newer")
+        if call_limit is not None and call_limit < 1:
+            raise ValueError("Call limit must be at least 1")
 
-    def __init__(self, backend: BaseBackend, line_level: bool = False) -> None:
         self.backend = backend
         self.line_level = line_level
-        self.stats: Dict[str, FunctionStats] = defaultdict(FunctionStats)
+        self.engine = engine
+        self.call_limit = call_limit
+        self.async_mode = async_mode
+        self._domains: Tuple[str, ...] = backend.get_domains()
+        self.stats = StatsTable(domain_count=len(self._domains))
         self.call_stack: list = []
-        self.original_trace = None
+        self.line_stats = LineTable()
+        # Function IDs getting line events, or None for every function
+        self.line_functions = sorted(line_functions) if line_functions is not None else None
+        self._line_ids: Optional[Set[int]] = (
+            {self.stats.intern(key) for key in line_functions} if line_functions is not None else None
+        )
+        # Code objects with LINE enabled locally under sys.monitoring
+        self._line_codes: Optional[List[Any]] = None
+        self.original_trace: Optional[Callable] = None
+        self._active_engine: Optional[str] = None
+        self._running = False
+        self.thread_name = threading.current_thread().name
+        self.thread_ident: Optional[int] = None
+        self.thread_results: List[Dict[str, Any]] = []
+        self._shards: List["EnergyTracer"] = []
+        # Shard of the current thread; thread-local so reused idents are safe
+        self._local = threading.local()
+        self._shard_lock = threading.Lock()
+        self._original_thread_trace: Optional[Callable] = None
+        # Function IDs memoized per code object id; IGNORED marks code that is
+        # not traced. _code_refs keeps the cached code objects alive so their
+        # ids stay unique.
+        self._code_ids: Dict[int, int] = {}
+        self._code_refs: List[Any] = []
+        self._open_frames: Dict[int, int] = defaultdict(int)
+        # Suspended resumable frames by frame id: (elapsed ns, energy mJ,
+        # child ns, child mJ, line, per-domain mJ, task ID, overhead ns,
+        # overhead mJ)
+        self._suspended: Dict[int, tuple] = {}
+        # Frame that raised the exception being propagated (settrace only)
+        self._raising_frame: Any = None
+        # Per-task figures, one row per task name, and the task coroutines
+        self.task_stats = StatsTable()
+        self._task_coroutines: Dict[str, str] = {}
+        # File of the selector whose select() counts as event loop idle time
+        self._idle_file = _SELECTORS_FILE if async_mode else None
+        # Self figures per call path, when call paths are kept
+        self.call_tree: Optional[CallTree] = CallTree() if call_paths else None
+        # Tracer cost per traced call inside its own measurement window and
+        # outside of it, subtracted when subtract_overhead is set
+        self.subtract_overhead = subtract_overhead
+        self.calibration: Optional[Dict[str, Any]] = None
+        self._inner_ns = 0
+        self._inner_mj = 0.0
+        self._outer_ns = 0
+        self._outer_mj = 0.0
+
+    def _make_code_key(self, code: "CodeType") -> str:
+        """Generate a unique key for a code object, or "" if it is ignored."""
+        filename = code.co_filename
 
-    def _get_function_key(self, frame) -> str:
-        """Generate a unique key for a function."""
-        filename = frame.f_code.co_filename
-        funcname = frame.f_code.co_name
-        
         # Skip if file should be ignored
-        if config.should_ignore(filename):
+        if config.should_ignore(filename) and filename != self._idle_file:
             return ""
-        
-        return f"{filename}:{funcname}"
+        if filename.startswith(PACKAGE_DIR):
+            return ""
+        # Code outside an include allow-list is ignored like excluded code:
+        # no local trace under settrace, events disabled under sys.monitoring
+        qualname = getattr(code, "co_qualname", code.co_name)
+        if not config.should_include(filename, qualname) and filename != self._idle_file:
+            return ""
+
+        return f"{filename}:{code.co_name}"
+
+    def _get_code_id(self, code: "CodeType") -> int:
+        """Return the memoized function ID of a code object."""
+        func_id = self._code_ids.get(id(code))
+        if func_id is None:
+            func_key = self._make_code_key(code)
+            func_id = self.stats.intern(func_key) if func_key else IGNORED
+            if (
+                self._line_ids is not None
+                and self._line_codes is not None
+                and func_id in self._line_ids
+            ):
+                monitoring = _monitoring
+                monitoring.set_local_events(monitoring.PROFILER_ID, code, monitoring.events.LINE)
+                self._line_codes.append(code)
+            if len(self._code_ids) >= CODE_CACHE_SIZE:
+                self._code_ids.clear()
+                self._code_refs.clear()
+            self._code_ids[id(code)] = func_id
+            self._code_refs.append(code)
+        return func_id
+
+    def _get_function_key(self, frame: "FrameType") -> str:
+        """Generate a unique key for a function."""
+        func_id = self._get_code_id(frame.f_code)
+        return self.stats.names[func_id] if func_id != IGNORED else ""
+
+    def _enter(self, func_id: int) -> None:
+        """Record entry into a profiled function."""
+        if self._domains:
+            timestamp_ns, energy_mj, domains_mj = self.backend.read_domains()
+        else:
+            timestamp_ns, energy_mj = self.backend.read()
+            domains_mj = None
+        if self.call_tree is not None:
+            node = self.call_tree.child(self.call_stack[-1][12] if self.call_stack else 0, func_id)
+        else:
+            node = 0
+        # [id, start_ns, start_mj, child_ns, child_mj, line, line_ns, line_mj,
+        #  start per-domain mJ, resume_ns, resume_mj, task ID, call path node,
+        #  overhead ns, overhead mJ, overhead ns at resume, overhead mJ at resume]
+        # Overhead is the tracer cost inside the measurement window: this
+        # call's own share plus everything spent on traced descendants
+        self.call_stack.append(
+            [func_id, timestamp_ns, energy_mj, 0, 0.0, 0, timestamp_ns, energy_mj,
+             domains_mj, timestamp_ns, energy_mj, -1, node,
+             self._inner_ns, self._inner_mj, 0, 0.0]
+        )
+        self.stats.active[func_id] += 1
+
+    def _exit(self) -> None:
+        """Record exit from the innermost profiled function."""
+        frame = self.call_stack.pop()
+        func_id = frame[0]
+        stats = self.stats
+        stats.active[func_id] -= 1
+        try:
+            if self._domains:
+                timestamp_ns, energy, domains_mj = self.backend.read_domains()
+                domain_delta = [end - begin for end, begin in zip(domains_mj, frame[8])]
+            else:
+                timestamp_ns, energy = self.backend.read()
+                domain_delta = None
+        except Exception as e:
+            # Log error but continue tracing
+            print(f"Warning: Energy measurement failed for {stats.names[func_id]}: {e}", file=sys.stderr)
+            return
+
+        if frame[5]:
+            self._record_line(frame, timestamp_ns, energy)
+
+        energy_mj = energy - frame[2] - frame[14]
+        time_ns = timestamp_ns - frame[1] - frame[13]
+        # Only the last resumption is new to the parent; earlier ones were
+        # credited when the frame suspended
+        overhead_ns = frame[13] - frame[15]
+        overhead_mj = frame[14] - frame[16]
+        segment_ns = timestamp_ns - frame[9] - overhead_ns
+        segment_mj = energy - frame[10] - overhead_mj
+        if self.call_stack:
+            parent = self.call_stack[-1]
+            parent[3] += segment_ns
+            parent[4] += segment_mj
+            parent[13] += overhead_ns + self._outer_ns
+            parent[14] += overhead_mj + self._outer_mj
+        if frame[11] >= 0:
+            self.task_stats.update(
+                frame[11], segment_mj, segment_ns / 1e6, segment_mj, segment_ns / 1e6
+            )
+
+        self_energy_mj = energy_mj - frame[4]
+        self_time_ms = (time_ns - frame[3]) / 1e6
+        if self.subtract_overhead:
+            # Calls cheaper than the calibration noise would come out negative
+            if energy_mj < 0.0:
+                energy_mj = 0.0
+            if time_ns < 0:
+                time_ns = 0
+            if self_energy_mj < 0.0:
+                self_energy_mj = 0.0
+            if self_time_ms < 0.0:
+                self_time_ms = 0.0
+        stats.update(
+            func_id,
+            energy_mj,
+            time_ns / 1e6,
+            self_energy_mj,
+            self_time_ms,
+            stats.active[func_id] > 0,
+            domain_delta,
+        )
+        if self.call_tree is not None:
+            self.call_tree.add(frame[12], self_energy_mj, self_time_ms)
+
+    def _line(self, lineno: int) -> None:
+        """Record a line boundary inside the innermost profiled function."""
+        frame = self.call_stack[-1]
+        try:
+            timestamp_ns, energy = self.backend.read()
+        except Exception as e:
+            print(f"Warning: Line-level energy measurement failed: {e}", file=sys.stderr)
+            return
+        if frame[5]:
+            self._record_line(frame, timestamp_ns, energy)
+        frame[5] = lineno
+        frame[6] = timestamp_ns
+        frame[7] = energy
+
+    def _record_line(self, frame: list, timestamp_ns: int, energy: float) -> None:
+        """Credit the segment since the previous line event to that line."""
+        self.line_stats.add(frame[0], frame[5], energy - frame[7], (timestamp_ns - frame[6]) / 1e6)
+
+    def _enter_resumable(self, func_id: int, frame: "FrameType", resumed: bool) -> None:
+        """Record entry into, or resumption of, a generator or coroutine."""
+        # Frames that were never resumed (e.g. closed without running) can
+        # leave an entry behind for a later frame at the same address
+        saved = self._suspended.pop(id(frame), None)
+        self._enter(func_id)
+        entry = self.call_stack[-1]
+        if saved is None or not resumed:
+            entry[11] = self._task_id(frame, func_id)
+            return
 
-    def _trace_callback(self, frame, event: str, arg) -> Optional[Callable]:
+        # Move the start back by the figures of the earlier resumptions
+        (time_ns, energy_mj, child_ns, child_mj, line, domains_mj, task_id,
+         overhead_ns, overhead_mj) = saved
+        entry[1] -= time_ns
+        entry[2] -= energy_mj
+        entry[3] = child_ns
+        entry[4] = child_mj
+        entry[5] = line
+        entry[13] += overhead_ns
+        entry[14] += overhead_mj
+        entry[15] = overhead_ns
+        entry[16] = overhead_mj
+        if domains_mj is not None:
+            entry[8] = [start - used for start, used in zip(entry[8], domains_mj)]
+        entry[11] = task_id
+
+    def _suspend(self, frame: "FrameType") -> None:
+        """Take a suspending frame off the stack, keeping its partial figures."""
+        entry = self.call_stack.pop()
+        func_id = entry[0]
+        self.stats.active[func_id] -= 1
+        try:
+            if self._domains:
+                timestamp_ns, energy, domains_mj = self.backend.read_domains()
+                domains_used = [end - start for end, start in zip(domains_mj, entry[8])]
+            else:
+                timestamp_ns, energy = self.backend.read()
+                domains_used = None
+        except Exception as e:
+            print(f"Warning: Energy measurement failed for {self.stats.names[func_id]}: {e}", file=sys.stderr)
+            return
+
+        if entry[5]:
+            self._record_line(entry, timestamp_ns, energy)
+
+        overhead_ns = entry[13] - entry[15]
+        overhead_mj = entry[14] - entry[16]
+        segment_ns = timestamp_ns - entry[9] - overhead_ns
+        segment_mj = energy - entry[10] - overhead_mj
+        if self.call_stack:
+            parent = self.call_stack[-1]
+            parent[3] += segment_ns
+            parent[4] += segment_mj
+            parent[13] += overhead_ns + self._outer_ns
+            parent[14] += overhead_mj + self._outer_mj
+        if entry[11] >= 0:
+            self.task_stats.update(
+                entry[11], segment_mj, segment_ns / 1e6, segment_mj, segment_ns / 1e6
+            )
+
+        self._suspended[id(frame)] = (
+            timestamp_ns - entry[1],
+            energy - entry[2],
+            entry[3],
+            entry[4],
+            entry[5],
+            domains_used,
+            entry[11],
+            entry[13],
+            entry[14],
+        )
+
+    def _task_id(self, frame: "FrameType", func_id: int) -> int:
+        """Return the task ID of the coroutine of a running asyncio task, or -1."""
+        asyncio = sys.modules.get("asyncio")
+        if asyncio is None or not frame.f_code.co_flags & inspect.CO_COROUTINE:
+            return -1
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            # No running event loop
+            return -1
+        if task is None or getattr(task.get_coro(), "cr_frame", None) is not frame:
+            return -1
+
+        name = task.get_name()
+        self._task_coroutines.setdefault(name, self.stats.names[func_id])
+        return self.task_stats.intern(name)
+
+    def _trace_callback(self, frame: "FrameType", event: str, arg: Any) -> Optional[Callable]:
         """Trace callback for sys.settrace."""
         if event == "call":
-            func_key = self._get_function_key(frame)
-            if func_key:  # Only trace if not ignored
-                self.call_stack.append(func_key)
-                self.backend.start()
-        
+            if not self._running:
+                # Tracing stopped while this thread was still running
+                sys.settrace(None)
+                return None
+            code = frame.f_code
+            func_id = self._code_ids.get(id(code))
+            if func_id is None:
+                func_id = self._get_code_id(code)
+            if func_id == IGNORED or self._over_call_limit(func_id):
+                # No local tracing for ignored frames: no return/line events
+                return None
+            if not self.line_level or (self._line_ids is not None and func_id not in self._line_ids):
+                # Line events would cost a callback per line for nothing,
+                # and make the per-call overhead depend on the body
+                frame.f_trace_lines = False
+            self._enter(func_id)
+
         elif event == "return":
             if self.call_stack:
-                func_key = self.call_stack.pop()
-                try:
-                    energy_mj, time_ms = self.backend.stop()
-                    self.stats[func_key].update(energy_mj, time_ms)
-                except Exception as e:
-                    # Log error but continue tracing
-                    print(f"Warning: Energy measurement failed for {func_key}: {e}", file=sys.stderr)
-        
+                self._exit()
+
         elif event == "line" and self.line_level:
             # Line-level tracing (coarser accuracy)
             if self.call_stack:
-                func_key = self.call_stack[-1]
-                try:
-                    energy_mj, time_ms = self.backend.stop()
-                    self.backend.start()  # Restart for next line
-                    self.stats[func_key].update(energy_mj, time_ms)
-                except Exception as e:
-                    print(f"Warning: Line-level energy measurement failed: {e}", file=sys.stderr)
-        
+                self._line(frame.f_lineno)
+
         return self._trace_callback
 
+    def _async_trace_callback(self, frame: "FrameType", event: str, arg: Any) -> Optional[Callable]:
+        """Trace callback for sys.settrace in async mode."""
+        if event == "call":
+            if not self._running:
+                sys.settrace(None)
+                return None
+            code = frame.f_code
+            func_id = self._code_ids.get(id(code))
+            if func_id is None:
+                func_id = self._get_code_id(code)
+            if func_id == IGNORED:
+                return None
+            if code.co_flags & RESUMABLE_FLAGS:
+                resumed = not _is_first_entry(frame)
+                # Frames measured before reaching the limit still resume
+                if not resumed and self._over_call_limit(func_id):
+                    return None
+                self._enter_resumable(func_id, frame, resumed)
+            elif self._over_call_limit(func_id):
+                return None
+            else:
+                self._enter(func_id)
+
+        elif event == "return":
+            if self.call_stack:
+                if (
+                    frame.f_code.co_flags & RESUMABLE_FLAGS
+                    and frame is not self._raising_frame
+                    and _is_suspended(frame)
+                ):
+                    self._suspend(frame)
+                else:
+                    self._exit()
+            self._raising_frame = None
+
+        elif event == "exception":
+            # An exception thrown in at a yield leaves the frame at that yield;
+            # StopIteration is how an awaited coroutine hands back its result
+            if arg[0] is not StopIteration and arg[0] is not StopAsyncIteration:
+                self._raising_frame = frame
+
+        elif event == "line":
+            self._raising_frame = None
+            if self.line_level and self.call_stack and (
+                self._line_ids is None or self.call_stack[-1][0] in self._line_ids
+            ):
+                self._line(frame.f_lineno)
+
+        return self._async_trace_callback
+
+    def _over_call_limit(self, func_id: int) -> bool:
+        """Check whether a function has been measured call_limit times."""
+        return self.call_limit is not None and self.stats.calls[func_id] >= self.call_limit
+
+    def _thread_shard(self) -> Optional["EnergyTracer"]:
+        """Return the shard of the calling thread, creating it on first use."""
+        shard: Optional["EnergyTracer"] = getattr(self._local, "shard", _MISSING)
+        if shard is not _MISSING:
+            return shard
+
+        # current_thread() would register a dummy thread while a new thread is
+        # still bootstrapping, so only look at threads that are registered
+        thread = _ACTIVE_THREADS.get(threading.get_ident())
+        if thread is None:
+            return None
+
+        with self._shard_lock:
+            if thread.name.startswith(INTERNAL_THREAD_PREFIX) or not self._running:
+                shard = None
+            else:
+                shard = copy.copy(self)
+                shard.call_stack = []
+                shard.stats = self.stats.shard()
+                shard.line_stats = self.line_stats.shard()
+                shard._open_frames = defaultdict(int)
+                shard._suspended = {}
+                shard._raising_frame = None
+                shard.task_stats = self.task_stats.shard()
+                if self.call_tree is not None:
+                    shard.call_tree = self.call_tree.shard()
+                shard.thread_name = thread.name
+                shard.thread_ident = thread.ident
+                shard._shards = []
+                self._shards.append(shard)
+        self._local.shard = shard
+        return shard
+
+    def _thread_trace_hook(self, frame: "FrameType", event: str, arg: Any) -> Optional[Callable]:
+        """threading.settrace hook installing a shard's callback in new threads."""
+        shard = self._thread_shard()
+        if shard is None:
+            sys.settrace(None)
+            return None
+        callback = shard._async_trace_callback if shard.async_mode else shard._trace_callback
+        sys.settrace(callback)
+        return callback(frame, event, arg)
+
+    def _code_start(self, code: "CodeType") -> Any:
+        """Handle PY_START/PY_RESUME for the calling thread's shard."""
+        func_id = self._code_ids.get(id(code))
+        if func_id is None:
+            func_id = self._get_code_id(code)
+        if func_id == IGNORED:
+            # Ignored code costs nothing after its first hit
+            return MONITORING_DISABLE
+        if self._over_call_limit(func_id):
+            return MONITORING_DISABLE
+
+        self._open_frames[id(code)] += 1
+        self._enter(func_id)
+        return None
+
+    def _code_return(self, code: "CodeType") -> Any:
+        """Handle PY_RETURN/PY_YIELD for the calling thread's shard."""
+        open_frames = self._open_frames.get(id(code), 0)
+        if not open_frames:
+            # Frame was never entered: ignored, or over the call limit
+            func_id = self._code_ids.get(id(code))
+            if func_id == IGNORED or (func_id is not None and self._over_call_limit(func_id)):
+                return MONITORING_DISABLE
+            return None
+
+        self._open_frames[id(code)] = open_frames - 1
+        self._exit()
+        return None
+
+    def _code_start_resumable(self, code: "CodeType", frame: "FrameType", resumed: bool) -> Any:
+        """Handle PY_START/PY_RESUME/PY_THROW of a generator or coroutine."""
+        func_id = self._code_ids.get(id(code))
+        if func_id is None:
+            func_id = self._get_code_id(code)
+        if func_id == IGNORED:
+            return MONITORING_DISABLE
+        if not resumed and self._over_call_limit(func_id):
+            return MONITORING_DISABLE
+
+        self._open_frames[id(code)] += 1
+        self._enter_resumable(func_id, frame, resumed)
+        return None
+
+    def _code_yield(self, code: "CodeType", frame: "FrameType") -> Any:
+        """Handle PY_YIELD in async mode."""
+        open_frames = self._open_frames.get(id(code), 0)
+        if not open_frames:
+            return self._code_return(code)
+
+        self._open_frames[id(code)] = open_frames - 1
+        self._suspend(frame)
+        return None
+
+    def _code_unwind(self, code: "CodeType") -> None:
+        """Handle PY_UNWIND for the calling thread's shard."""
+        if self._open_frames.get(id(code), 0):
+            self._open_frames[id(code)] -= 1
+            self._exit()
+
+    def _code_line(self, code: "CodeType", line_number: int) -> Any:
+        """Handle LINE for the calling thread's shard."""
+        func_id = self._code_ids.get(id(code))
+        if func_id == IGNORED:
+            return MONITORING_DISABLE
+        if self.call_stack and self.call_stack[-1][0] == func_id:
+            self._line(line_number)
+        return None
+
+    def _monitor_start(self, code: "CodeType", instruction_offset: int) -> Any:
+        """sys.monitoring PY_START/PY_RESUME callback."""
+        shard: Optional["EnergyTracer"] = getattr(self._local, "shard", _MISSING)
+        if shard is _MISSING:
+            shard = self._thread_shard()
+        if shard is None:
+            return None
+        return shard._code_start(code)
+
+    def _monitor_return(self, code: "CodeType", instruction_offset: int, retval: Any) -> Any:
+        """sys.monitoring PY_RETURN/PY_YIELD callback."""
+        shard: Optional["EnergyTracer"] = getattr(self._local, "shard", _MISSING)
+        if shard is _MISSING:
+            shard = self._thread_shard()
+        if shard is None:
+            return None
+        return shard._code_return(code)
+
+    def _monitor_async_start(self, code: "CodeType", instruction_offset: int) -> Any:
+        """sys.monitoring PY_START callback in async mode."""
+        shard: Optional["EnergyTracer"] = getattr(self._local, "shard", _MISSING)
+        if shard is _MISSING:
+            shard = self._thread_shard()
+        if shard is None:
+            return None
+        if code.co_flags & RESUMABLE_FLAGS:
+            return shard._code_start_resumable(code, sys._getframe(1), False)
+        return shard._code_start(code)
+
+    def _monitor_resume(self, code: "CodeType", instruction_offset: int) -> Any:
+        """sys.monitoring PY_RESUME callback in async mode."""
+        shard: Optional["EnergyTracer"] = getattr(self._local, "shard", _MISSING)
+        if shard is _MISSING:
+            shard = self._thread_shard()
+        if shard is None:
+            return None
+        return shard._code_start_resumable(code, sys._getframe(1), True)
+
+    def _monitor_yield(self, code: "CodeType", instruction_offset: int, retval: Any) -> Any:
+        """sys.monitoring PY_YIELD callback in async mode."""
+        shard: Optional["EnergyTracer"] = getattr(self._local, "shard", _MISSING)
+        if shard is _MISSING:
+            shard = self._thread_shard()
+        if shard is None:
+            return None
+        return shard._code_yield(code, sys._getframe(1))
+
+    def _monitor_throw(self, code: "CodeType", instruction_offset: int, exception: BaseException) -> Any:
+        """sys.monitoring PY_THROW callback in async mode."""
+        shard: Optional["EnergyTracer"] = getattr(self._local, "shard", _MISSING)
+        if shard is _MISSING:
+            shard = self._thread_shard()
+        if shard is None:
+            return None
+        return shard._code_start_resumable(code, sys._getframe(1), True)
+
+    def _monitor_unwind(self, code: "CodeType", instruction_offset: int, exception: BaseException) -> None:
+        """sys.monitoring PY_UNWIND callback (cannot be disabled)."""
+        shard: Optional["EnergyTracer"] = getattr(self._local, "shard", None)
+        if shard is not None:
+            shard._code_unwind(code)
+
+    def _monitor_line(self, code: "CodeType", line_number: int) -> Any:
+        """sys.monitoring LINE callback."""
+        shard: Optional["EnergyTracer"] = getattr(self._local, "shard", _MISSING)
+        if shard is _MISSING:
+            shard = self._thread_shard()
+        if shard is None:
+            return None
+        return shard._code_line(code, line_number)
+
+    def _select_engine(self) -> str:
+        """Resolve the engine to use for this run."""
+        if self.engine != "auto":
+            return self.engine
+        return "monitoring" if HAS_MONITORING else "settrace"
+
+    def _start_monitoring(self) -> bool:
+        """Register sys.monitoring callbacks, returning False if unavailable."""
+        monitoring = _monitoring
+        tool_id = monitoring.PROFILER_ID
+        try:
+            monitoring.use_tool_id(tool_id, "py-power-profile")
+        except ValueError:
+            # Another profiler already owns the tool id
+            return False
+
+        events = monitoring.events
+        callbacks = {
+            events.PY_START: self._monitor_start,
+            events.PY_RESUME: self._monitor_start,
+            events.PY_RETURN: self._monitor_return,
+            events.PY_YIELD: self._monitor_return,
+            events.PY_UNWIND: self._monitor_unwind,
+        }
+        if self.async_mode:
+            callbacks[events.PY_START] = self._monitor_async_start
+            callbacks[events.PY_RESUME] = self._monitor_resume
+            callbacks[events.PY_YIELD] = self._monitor_yield
+            # throw() and close() resume a frame without PY_RESUME
+            callbacks[events.PY_THROW] = self._monitor_throw
+        if self.line_level:
+            callbacks[events.LINE] = self._monitor_line
+
+        event_set = 0
+        for event, callback in callbacks.items():
+            monitoring.register_callback(tool_id, event, callback)
+            event_set |= event
+        if self.line_level and self._line_ids is not None:
+            # LINE is enabled per code object as selected code shows up
+            event_set &= ~events.LINE
+            self._line_codes = []
+        # Locations disabled by a previous run start out enabled again
+        monitoring.restart_events()
+        monitoring.set_events(tool_id, event_set)
+        return True
+
+    def _stop_monitoring(self) -> None:
+        """Unregister sys.monitoring callbacks and release the tool id."""
+        monitoring = _monitoring
+        tool_id = monitoring.PROFILER_ID
+        monitoring.set_events(tool_id, 0)
+        if self._line_codes is not None:
+            for code in self._line_codes:
+                monitoring.set_local_events(tool_id, code, 0)
+            self._line_codes = None
+        for event in (
+            monitoring.events.PY_START,
+            monitoring.events.PY_RESUME,
+            monitoring.events.PY_RETURN,
+            monitoring.events.PY_YIELD,
+            monitoring.events.PY_THROW,
+            monitoring.events.PY_UNWIND,
+            monitoring.events.LINE,
+        ):
+            monitoring.register_callback(tool_id, event, None)
+        monitoring.free_tool_id(tool_id)
+
+    def calibrate(
+        self, calls: int = CALIBRATION_CALLS, rounds: int = CALIBRATION_ROUNDS
+    ) -> Dict[str, Any]:
+        """Measure what this tracer's callbacks add to every traced call.
+
+        A scratch tracer with the same backend, engine and options traces an
+        empty function ``calls`` times per round.  Its measured figures are
+        the cost inside a call's own measurement window (``inner``); the
+        extra cost of the traced loop over the same loop untraced, less the
+        inner part, is the cost a call adds to its caller on top of that
+        (``outer``).  Times are the fastest round, energy the average over
+        all rounds.  The cost of one counter read is reported alongside.
+        """
+        if calls < 1 or rounds < 1:
+            raise ValueError("Calibration needs at least 1 call and 1 round")
+        read = self.backend.read_domains if self._domains else self.backend.read
+
+        read_ns = []
+        for _ in range(rounds):
+            start_ns = time.perf_counter_ns()
+            for _ in range(calls):
+                read()
+            read_ns.append((time.perf_counter_ns() - start_ns) / calls)
+
+        def run_rounds() -> Tuple[int, float]:
+            elapsed_ns = []
+            energy_mj = 0.0
+            for _ in range(rounds):
+                start_ns, start_mj = self.backend.read()
+                _calibration_loop(calls)
+                end_ns, end_mj = self.backend.read()
+                elapsed_ns.append(end_ns - start_ns)
+                energy_mj += end_mj - start_mj
+            return min(elapsed_ns), energy_mj
+
+        plain_ns, plain_mj = run_rounds()
+
+        scratch = EnergyTracer(
+            self.backend,
+            engine=self.engine,
+            async_mode=self.async_mode,
+            call_paths=self.call_tree is not None,
+        )
+        # Only the empty function is measured, whatever the ignore patterns
+        target = _calibration_target.__code__
+        scratch._code_ids[id(target)] = scratch.stats.intern("<calibration>")
+        scratch._code_ids[id(_calibration_loop.__code__)] = IGNORED
+        scratch._code_refs.extend((target, _calibration_loop.__code__))
+        scratch.start()
+        try:
+            traced_ns, traced_mj = run_rounds()
+        finally:
+            scratch.stop()
+
+        stats = scratch.stats["<calibration>"]
+        measured = max(stats.calls, 1)
+        inner_ns = max(stats.total_time_ms * 1e6 / measured, 0.0)
+        inner_mj = max(stats.total_energy_mj / measured, 0.0)
+        outer_ns = max((traced_ns - plain_ns) / calls - inner_ns, 0.0)
+        outer_mj = max((traced_mj - plain_mj) / (calls * rounds) - inner_mj, 0.0)
+        return {
+            "engine": scratch._active_engine,
+            "calls": calls * rounds,
+            "read_time_us": min(read_ns) / 1e3,
+            "inner_time_us": inner_ns / 1e3,
+            "inner_energy_mj": inner_mj,
+            "outer_time_us": outer_ns / 1e3,
+            "outer_energy_mj": outer_mj,
+        }
+
+    def ensure_calibration(self) -> Dict[str, Any]:
+        """Return the calibration, measuring it only once per process.
+
+        A calibration set beforehand (e.g. by a parent process) is kept;
+        otherwise tracers with the same kind of backend and options share
+        the first one measured in this process.
+        """
+        if self.calibration is None:
+            key = (
+                type(self.backend),
+                self.backend.get_name(),
+                self._select_engine(),
+                self.async_mode,
+                self.call_tree is not None,
+            )
+            with _calibrations_lock:
+                calibration = _calibrations.get(key)
+                if calibration is None:
+                    calibration = _calibrations[key] = self.calibrate()
+            self.calibration = calibration
+        return self.calibration
+
     def start(self) -> None:
-        """Start tracing."""
+        """Start tracing the calling thread and threads it starts."""
+        if self.subtract_overhead:
+            calibration = self.ensure_calibration()
+            self._inner_ns = int(calibration["inner_time_us"] * 1e3)
+            self._inner_mj = calibration["inner_energy_mj"]
+            self._outer_ns = int(calibration["outer_time_us"] * 1e3)
+            self._outer_mj = calibration["outer_energy_mj"]
+        self.thread_ident = threading.get_ident()
+        self.thread_name = threading.current_thread().name
+        self.thread_results = []
+        self._shards = []
+        self._local = threading.local()
+        self._local.shard = self
+        self._running = True
+        engine = self._select_engine()
+        if engine == "monitoring" and self._start_monitoring():
+            self._active_engine = "monitoring"
+            return
+
+        self._active_engine = "settrace"
         self.original_trace = sys.gettrace()
-        sys.settrace(self._trace_callback)
+        self._original_thread_trace = _get_thread_trace()
+        threading.settrace(self._thread_trace_hook)
+        sys.settrace(self._async_trace_callback if self.async_mode else self._trace_callback)
 
     def stop(self) -> Dict[str, FunctionStats]:
-        """Stop tracing and return collected statistics."""
-        sys.settrace(self.original_trace)
-        return dict(self.stats)
+        """Stop tracing, merge per-thread shards and return the statistics."""
+        if self._running:
+            self._running = False
+            if self._active_engine == "monitoring":
+                self._stop_monitoring()
+            else:
+                sys.settrace(self.original_trace)
+                threading.settrace(self._original_thread_trace)
+
+            with self._shard_lock:
+                shards = list(self._shards)
+                for shard in shards:
+                    shard._running = False
+            self.thread_results = [self._thread_summary(self)]
+            # Coroutines still suspended never completed a call
+            self._suspended.clear()
+            for shard in shards:
+                self.thread_results.append(self._thread_summary(shard))
+                self.stats.merge(shard.stats)
+                self.line_stats.merge(shard.line_stats)
+                self.task_stats.merge(shard.task_stats)
+                if self.call_tree is not None and shard.call_tree is not None:
+                    self.call_tree.merge(shard.call_tree)
+                shard._suspended.clear()
+        return self.stats.to_function_stats()
+
+    @staticmethod
+    def _thread_summary(shard: "EnergyTracer") -> Dict[str, Any]:
+        """Summarize the statistics collected by one thread's shard."""
+        return thread_summary(shard.stats, shard.thread_name, shard.thread_ident)
+
+    def _asyncio_summary(self) -> Dict[str, Any]:
+        """Summarize per-task figures and event loop idle time."""
+        task_stats = self.task_stats
+        tasks = {}
+        for task_id, name in task_stats.rows():
+            tasks[name] = {
+                "coroutine": self._task_coroutines.get(name, ""),
+                "steps": task_stats.calls[task_id],
+                "energy_mj": task_stats.total_energy[task_id],
+                "time_ms": task_stats.total_time[task_id],
+            }
+
+        idle_key = f"{self._idle_file}:select"
+        idle = self.stats[idle_key] if idle_key in self.stats else FunctionStats()
+        return {
+            "tasks": tasks,
+            "idle": {
+                "waits": idle.calls,
+                "energy_mj": idle.total_energy_mj,
+                "time_ms": idle.total_time_ms,
+            },
+        }
 
     def get_results(self) -> Dict[str, Any]:
         """Get results in a format suitable for JSON serialization."""
-        results = {
+        results: Dict[str, Any] = {
             "metadata": {
                 "backend": self.backend.get_name(),
                 "line_level": self.line_level,
+                "engine": self._active_engine or self._select_engine(),
+                "domains": list(self._domains),
                 "timestamp": time.time(),
             },
             "functions": {}
         }
+        if self.line_level and self.line_functions is not None:
+            results["metadata"]["line_functions"] = self.line_functions
+        if self.calibration is not None:
+            results["metadata"]["overhead"] = {
+                **self.calibration,
+                "subtracted": self.subtract_overhead,
+            }
         
         total_energy = 0.0
         total_time = 0.0
         
-        for func_key, stats in self.stats.items():
-            results["functions"][func_key] = stats.to_dict()
-            total_energy += stats.total_energy_mj
-            total_time += stats.total_time_ms
-        
+        # Self figures partition the run, inclusive ones overlap along stacks
+        stats = self.stats
+        functions = results["functions"]
+        for func_id, func_key in stats.rows():
+            functions[func_key] = stats.to_dict(func_id)
+            if self._domains:
+                functions[func_key]["energy_by_domain"] = {
+                    domain: column[func_id]
+                    for domain, column in zip(self._domains, stats.domain_energy)
+                }
+            total_energy += stats.self_energy[func_id]
+            total_time += stats.self_time[func_id]
+
+        if self.thread_results:
+            results["threads"] = self.thread_results
+
+        if self.async_mode:
+            results["asyncio"] = self._asyncio_summary()
+
+        if self.call_tree is not None:
+            results["call_paths"] = call_path_results(self.call_tree, stats.names)
+
+        if len(self.line_stats):
+            results["lines"] = line_results(self.line_stats, stats.names)
+
         results["summary"] = {
             "total_energy_mj": total_energy,
             "total_time_ms": total_time,
-            "function_count": len(self.stats),
+            "function_count": len(functions),
         }
         
-        return results 
\ No newline at end of file
+        return results 
+
+
+def _calibration_target() -> None:
+    """Empty function whose traced calls measure the tracer's own cost."""
+
+
+def _calibration_loop(calls: int) -> None:
+    """Call the calibration target calls times."""
+    target = _calibration_target
+    for _ in range(calls):
+        target()
+
+
+def call_path_results(tree: CallTree, names: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Export the self figures of every call path, keyed by collapsed stack."""
+    return {
+        path: {
+            "calls": tree.calls[node],
+            "self_energy_mj": tree.self_energy[node],
+            "self_time_ms": tree.self_time[node],
+        }
+        for node, path in tree.paths(names)
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def _stdlib_dirs() -> Tuple[str, ...]:
+    """Return the standard library directories, with a trailing separator."""
+    paths = sysconfig.get_paths()
+    return tuple({os.path.join(paths[name], "") for name in ("stdlib", "platstdlib")})
+
+
+def is_stdlib_file(filename: str) -> bool:
+    """Whether a code filename belongs to the standard library (or is frozen)."""
+    if filename.startswith("<frozen"):
+        return True
+    if not filename.startswith(_stdlib_dirs()):
+        return False
+    # Third-party packages can live below the standard library directory
+    return not any(f"{os.sep}{name}{os.sep}" in filename for name in ("site-packages", "dist-packages"))
+
+
+def hottest_functions(results: Dict[str, Any], count: int) -> List[str]:
+    """Return the keys of the count functions with the most self energy.
+
+    Ties, common with coarse counters, go to the most self time.  Standard
+    library and frozen code is left out: its lines are rarely the ones to
+    optimize.
+    """
+    functions = results.get("functions", {})
+
+    def heat(key: str) -> Tuple[float, float]:
+        stats = functions[key]
+        return (
+            stats.get("self_energy_mj", stats["total_energy_mj"]),
+            stats.get("self_time_ms", stats.get("total_time_ms", 0.0)),
+        )
+
+    candidates = [key for key in functions if not is_stdlib_file(key.rsplit(":", 1)[0])]
+    return sorted(candidates, key=heat, reverse=True)[:count]
+
+
+def line_results(table: LineTable, names: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Export per-line figures keyed by "file:line".
+
+    Line figures include the calls made from the line.  A line executed by
+    two code objects (a comprehension or lambda and its enclosing function
+    before Python 3.12) keeps the figures of the enclosing one, which cover
+    the inner code's.
+    """
+    lines: Dict[str, Dict[str, Any]] = {}
+    for func_id, line, hits, energy_mj, time_ms in table.rows():
+        func_key = names[func_id]
+        line_key = f"{func_key.rsplit(':', 1)[0]}:{line}"
+        previous = lines.get(line_key)
+        if previous is None or time_ms > previous["time_ms"]:
+            lines[line_key] = {
+                "function": func_key,
+                "hits": hits,
+                "energy_mj": energy_mj,
+                "time_ms": time_ms,
+            }
+    return lines
+
+
+def thread_summary(stats: StatsTable, name: str, ident: Optional[int]) -> Dict[str, Any]:
+    """Summarize the statistics collected on one thread."""
+    functions = {}
+    total_energy = 0.0
+    total_time = 0.0
+    for func_id, func_key in stats.rows():
+        functions[func_key] = {
+            "calls": stats.calls[func_id],
+            "total_energy_mj": stats.total_energy[func_id],
+            "self_energy_mj": stats.self_energy[func_id],
+        }
+        total_energy += stats.self_energy[func_id]
+        total_time += stats.self_time[func_id]
+    return {
+        "name": name,
+        "ident": ident,
+        "total_energy_mj": total_energy,
+        "total_time_ms": total_time,
+        "function_count": len(functions),
+        "functions": functions,
+    }
+
+
+def _get_thread_trace() -> Optional[Callable]:
+    """Return the trace function installed with threading.settrace."""
+    gettrace = getattr(threading, "gettrace", None)
+    trace: Optional[Callable]
+    if gettrace is not None:
+        trace = gettrace()
+    else:
+        # Python 3.9
+        trace = getattr(threading, "_trace_hook", None)
+    return trace
+
+
+def _is_suspended(frame: "FrameType") -> bool:
+    """Check whether a returning generator or coroutine frame is suspending.
+
+    Suspension returns from a yield, or on Python < 3.11 from the instruction
+    before the YIELD_FROM of an await; Python 3.13 reports the RESUME that
+    follows the yield.
+    """
+    code = frame.f_code.co_code
+    offset = frame.f_lasti
+    if offset < 0:
+        return False
+    if code[offset] == _YIELD_VALUE:
+        return True
+    if offset >= 2 and code[offset - 2] == _YIELD_VALUE:
+        return True
+    return offset + 2 < len(code) and code[offset + 2] == _YIELD_FROM
+
+
+def _is_first_entry(frame: "FrameType") -> bool:
+    """Check whether a "call" event starts a generator or coroutine frame.
+
+    A new frame has not executed any instruction before Python 3.11, and
+    from 3.11 starts at a RESUME whose location bits are zero.
+    """
+    offset = frame.f_lasti
+    if offset < 0:
+        return True
+    code = frame.f_code.co_code
+    return code[offset] == _RESUME and not code[offset + 1] & 3
@@ -1,56 +1,106 @@
 """Utility functions for py-power-profile."""
 
 import json
+import os
 import sys
-from pathlib import Path
-from typing import Dict, Any, Optional
+import threading
+import types
+from typing import Dict, Any, List
 
-from .backends import (
-    BaseBackend,
-    RAPLBackend,
-    HwmonBackend,
-    PsutilEstBackend,
-    MockBackend,
-)
+from .backends import BaseBackend, auto_candidates, backend_names, get_backend_class
+
+ATTRIBUTIONS = ("full", "proportional")
 
 
 def get_backend(backend_name: str) -> BaseBackend:
     """Get the appropriate backend based on name."""
     if backend_name == "auto":
         return get_auto_backend()
-    elif backend_name == "rapl":
-        return RAPLBackend()
-    elif backend_name == "hwmon":
-        return HwmonBackend()
-    elif backend_name == "psutil_est":
-        return PsutilEstBackend()
-    elif backend_name == "mock":
-        return MockBackend()
+    return get_backend_class(backend_name)()
+
+
+def apply_attribution(backend: BaseBackend, attribution: str) -> BaseBackend:
+    """Wrap a backend according to an energy attribution mode.
+
+    ``full`` credits all energy measured by the backend, ``proportional``
+    only this process's share of the busy CPU time.
+    """
+    if attribution == "full":
+        return backend
+    elif attribution == "proportional":
+        from .backends.proportional import ProportionalBackend
+
+        return ProportionalBackend(backend)
     else:
-        raise ValueError(f"Unknown backend: {backend_name}")
+        raise ValueError(f"Unknown attribution mode: {attribution}")
 
 
 def get_auto_backend() -> BaseBackend:
-    """Automatically select the best available backend."""
-    # Try backends in order of preference
-    backends = [
-        ("rapl", RAPLBackend),
-        ("hwmon", HwmonBackend),
-        ("psutil_est", PsutilEstBackend),
-    ]
-    
-    for name, backend_class in backends:
-        try:
-            backend = backend_class()
-            if backend.is_available():
+    """Automatically select the best available backend.
+
+    Backends, including installed plugins, are tried best first by their
+    declared capabilities.  Those found unavailable earlier in this boot are
+    skipped without probing them again; ``probe_backends()`` re-probes.
+    """
+    from .backends.probe import open_probe_cache
+
+    cache = open_probe_cache()
+    try:
+        for name, backend_class in auto_candidates():
+            if cache.known_unavailable(name):
+                continue
+            try:
+                backend = backend_class()
+                available = backend.is_available()
+            except Exception:
+                cache.record(name, False)
+                continue
+            cache.record(name, available)
+            if available:
                 print(f"Using {name} backend", file=sys.stderr)
                 return backend
-        except Exception:
-            continue
-    
+            backend.close()
+    finally:
+        cache.save()
+
     # Fallback to psutil estimation
     print("Using psutil_est backend (fallback)", file=sys.stderr)
-    return PsutilEstBackend()
+    return get_backend_class("psutil_est")()
+
+
+def probe_backends() -> List[Dict[str, Any]]:
+    """Probe every registered backend and refresh the probe cache.
+
+    Returns one row per backend with its availability and capabilities
+    (as probed when available, else as declared), in auto-selection order
+    for the backends "auto" may pick, followed by the others.
+    """
+    from .backends.probe import open_probe_cache
+
+    cache = open_probe_cache()
+    cache.clear()
+    ranked = [name for name, _ in auto_candidates()]
+    rows = []
+    for name in ranked + [name for name in backend_names() if name not in ranked]:
+        row: Dict[str, Any] = {"name": name, "available": False, "error": None}
+        try:
+            backend_class = get_backend_class(name)
+            capabilities = backend_class.capabilities
+            backend = backend_class()
+            try:
+                row["available"] = backend.is_available()
+                if row["available"]:
+                    capabilities = backend.get_capabilities()
+            finally:
+                backend.close()
+        except Exception as e:
+            row["error"] = str(e)
+            capabilities = None
+        row["capabilities"] = capabilities._asdict() if capabilities is not None else None
+        cache.record(name, row["available"])
+        rows.append(row)
+    cache.save()
+    return rows
 
 
 def load_results(file_path: str) -> Dict[str, Any]:
@@ -65,9 +115,48 @@ def load_results(file_path: str) -> Dict[str, Any]:
 
 
 def save_results(results: Dict[str, Any], file_path: str) -> None:
-    """Save results to JSON file."""
-    with open(file_path, "w") as f:
-        json.dump(results, f, indent=2)
+    """Save results to JSON file.
+
+    The file is written under a temporary name next to the target and
+    renamed over it, so readers never see a partially written file.
+    """
+    directory, name = os.path.split(os.path.abspath(file_path))
+    # Unique per writer; open() keeps the usual permissions, unlike mkstemp
+    temp_path = os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temp_path, "w") as f:
+            json.dump(results, f, indent=2)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def combine_runs(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine the results of repeated runs of the same script.
+
+    The run with the median total energy is kept as the representative
+    result.  ``samples`` adds every run's total energy and the total energy
+    of each function per run (0 mJ for runs it did not appear in), which
+    ``compare`` uses for significance testing.
+    """
+    totals = [run.get("summary", {}).get("total_energy_mj", 0.0) for run in runs]
+    median_index = sorted(range(len(runs)), key=totals.__getitem__)[(len(runs) - 1) // 2]
+
+    functions: Dict[str, List[float]] = {}
+    for index, run in enumerate(runs):
+        for func_key, stats in run.get("functions", {}).items():
+            functions.setdefault(func_key, [0.0] * len(runs))[index] = stats["total_energy_mj"]
+
+    results = runs[median_index]
+    results["samples"] = {
+        "runs": len(runs),
+        "representative_run": median_index,
+        "total_energy_mj": totals,
+        "functions": functions,
+    }
+    return results
 
 
 def run_script(script_path: str, args: list = None) -> None:
@@ -75,23 +164,33 @@ def run_script(script_path: str, args: list = None) -> None:
     if args is None:
         args = []
     
+    # This runs while tracing, so it sticks to builtins: pathlib or runpy
+    # helpers would show up as rows in every profile.
     # Add the script path to sys.path so it can be imported
-    script_dir = Path(script_path).parent
-    if str(script_dir) not in sys.path:
-        sys.path.insert(0, str(script_dir))
-    
-    # Read and execute the script
-    with open(script_path, "r") as f:
-        script_code = f.read()
-    
-    # Set up the script's namespace
-    script_globals = {
-        "__name__": "__main__",
-        "__file__": script_path,
-    }
-    
-    # Execute the script
-    exec(script_code, script_globals)
+    script_dir, sep, _ = script_path.rpartition(os.sep)
+    script_dir = script_dir if sep else "."
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+
+    with open(script_path, "rb") as f:
+        code = compile(f.read(), script_path, "exec")
+
+    # Execute the script as the __main__ module, so that objects it defines
+    # can be pickled by reference (e.g. multiprocessing targets)
+    main_module = types.ModuleType("__main__")
+    main_module.__file__ = script_path
+    saved_main = sys.modules.get("__main__")
+    saved_argv0 = sys.argv[0] if sys.argv else None
+    sys.modules["__main__"] = main_module
+    if sys.argv:
+        sys.argv[0] = script_path
+    try:
+        exec(code, main_module.__dict__)
+    finally:
+        if saved_main is not None:
+            sys.modules["__main__"] = saved_main
+        if saved_argv0 is not None:
+            sys.argv[0] = saved_argv0
 
 
 def format_energy(energy_mj: float) -> str:
@@ -0,0 +1,571 @@
+"""Tests for energy measurement backends."""
+
+import time
+
+import pytest
+
+from py_power_profile import backends as backends_module
+from py_power_profile import utils
+from py_power_profile.backends import (
+    BackendCapabilities,
+    BaseBackend,
+    HwmonBackend,
+    MockBackend,
+    PowercapBackend,
+    ProportionalBackend,
+    PsutilEstBackend,
+)
+from py_power_profile.backends import probe
+from py_power_profile.backends.probe import ProbeCache
+from py_power_profile.backends.sampler import BackgroundSampler
+from py_power_profile.config import config
+from py_power_profile.tracer import EnergyTracer
+from py_power_profile.backends.sysfs import (
+    SysfsCounter,
+    find_hwmon_channels,
+    find_hwmon_power_files,
+    find_rapl_zones,
+    open_rapl_counter,
+)
+
+
+def make_rapl_zone(root, name, energy_uj, max_range_uj=1_000_000, label=None):
+    """Create a fake powercap zone directory."""
+    zone = root / name
+    zone.mkdir(parents=True)
+    (zone / "energy_uj").write_text(f"{energy_uj}\n")
+    (zone / "max_energy_range_uj").write_text(f"{max_range_uj}\n")
+    if label:
+        (zone / "name").write_text(f"{label}\n")
+    return zone
+
+
+def write_proc_times(root, process_ticks, busy_ticks, idle_ticks=1000):
+    """Write fake /proc/self/stat and /proc/stat CPU times."""
+    (root / "self").mkdir(parents=True, exist_ok=True)
+    # utime and stime are fields 14 and 15; the command name has a space
+    fields = ["S"] + ["0"] * 10 + [str(process_ticks), "0"] + ["0"] * 30
+    (root / "self" / "stat").write_text(f"4242 (my app) {' '.join(fields)}\n")
+    (root / "stat").write_text(
+        f"cpu  {busy_ticks} 0 0 {idle_ticks} 0 0 0 0 0 0\ncpu0 0 0 0 0 0 0 0 0 0 0\n"
+    )
+
+
+@pytest.fixture
+def powercap_tree(tmp_path):
+    """Fake powercap tree with package, core, dram and psys zones."""
+    make_rapl_zone(tmp_path, "intel-rapl:0", 10_000, label="package-0")
+    make_rapl_zone(tmp_path, "intel-rapl:0:0", 6_000, label="core")
+    make_rapl_zone(tmp_path, "intel-rapl:0:1", 2_000, label="dram")
+    make_rapl_zone(tmp_path, "intel-rapl:1", 50_000, label="psys")
+    return tmp_path
+
+
+class TestBackgroundSampler:
+    """Test BackgroundSampler ring buffer integration."""
+
+    def test_energy_between_samples(self):
+        """Test integration across recorded samples."""
+        sampler = BackgroundSampler(lambda: 0.0, capacity=8)
+        sampler._append(0, 0.0)
+        sampler._append(1_000_000_000, 1000.0)  # 1 W for 1 s
+        sampler._append(2_000_000_000, 2000.0)  # 2 W for 1 s
+
+        assert sampler.energy_at(1_000_000_000) == pytest.approx(1000.0)
+        assert sampler.energy_between(0, 2_000_000_000) == pytest.approx(3000.0)
+        # Halfway through the second interval uses that interval's power
+        assert sampler.energy_between(1_000_000_000, 1_500_000_000) == pytest.approx(1000.0)
+
+    def test_clamps_past_newest_sample(self):
+        """Test timestamps after the newest sample read its energy."""
+        sampler = BackgroundSampler(lambda: 0.0, capacity=8)
+        sampler._append(0, 0.0)
+        sampler._append(1_000_000_000, 500.0)
+
+        assert sampler.energy_at(3_000_000_000) == pytest.approx(500.0)
+        assert sampler.energy_between(1_000_000_000, 3_000_000_000) == 0.0
+
+    def test_readings_never_decrease(self):
+        """Test readings between samples of alternating power stay monotonic."""
+        sampler = BackgroundSampler(lambda: 0.0, capacity=8)
+        sampler._append(0, 0.0)
+        previous = sampler.energy_at(0)
+        for i in range(1, 21):
+            # Read twice before each sample arrives, as a tracer would
+            for offset_ns in (300_000_000, 900_000_000):
+                energy = sampler.energy_at((i - 1) * 1_000_000_000 + offset_ns)
+                assert energy >= previous
+                previous = energy
+            sampler._append(i * 1_000_000_000, 5000.0 if i % 2 else 10.0)
+
+    def test_ring_buffer_wraparound(self):
+        """Test the buffer keeps integrating after overwriting old samples."""
+        sampler = BackgroundSampler(lambda: 0.0, capacity=4)
+        for i in range(10):
+            sampler._append(i * 1_000_000_000, 100.0)
+
+        assert sampler.energy_between(7_000_000_000, 9_000_000_000) == pytest.approx(200.0)
+        # Timestamps older than the retained window clamp to the oldest sample
+        assert sampler.energy_at(0) == sampler.energy_at(6_000_000_000)
+
+    def test_invalid_arguments(self):
+        """Test invalid sampler configuration is rejected."""
+        with pytest.raises(ValueError):
+            BackgroundSampler(lambda: 0.0, interval_s=0)
+        with pytest.raises(ValueError):
+            BackgroundSampler(lambda: 0.0, capacity=1)
+
+
+class TestPsutilEstBackend:
+    """Test PsutilEstBackend."""
+
+    def test_start_stop_does_not_block(self):
+        """Test start/stop only take timestamps instead of sleeping."""
+        backend = PsutilEstBackend(sample_interval_ms=5)
+        try:
+            backend.start()
+            backend.stop()
+
+            begin = time.perf_counter()
+            for _ in range(100):
+                backend.start()
+                energy_mj, time_ms = backend.stop()
+            elapsed = time.perf_counter() - begin
+
+            assert elapsed < 0.1
+            assert energy_mj >= 0.0
+            assert time_ms >= 0.0
+        finally:
+            backend.close()
+
+        assert not backend._sampler.running
+
+
+class TestSysfsCounter:
+    """Test persistent-descriptor sysfs counters against a fake tree."""
+
+    def test_rereads_through_same_descriptor(self, tmp_path):
+        """Test the counter sees updated values without reopening."""
+        zone = make_rapl_zone(tmp_path, "intel-rapl:0", 1000)
+        counter = open_rapl_counter(str(zone))
+        try:
+            assert counter.read_raw() == 1000
+            (zone / "energy_uj").write_text("2500\n")
+            assert counter.read_raw() == 2500
+        finally:
+            counter.close()
+
+    def test_wraparound(self, tmp_path):
+        """Test counter wraparound is corrected using max_energy_range_uj."""
+        zone = make_rapl_zone(tmp_path, "intel-rapl:0", 900_000)
+        counter = open_rapl_counter(str(zone))
+        try:
+            assert counter.max_range == 1_000_000
+            start = counter.read()
+            (zone / "energy_uj").write_text("100000\n")
+            assert counter.read() - start == 200_000
+        finally:
+            counter.close()
+
+    def test_discovery(self, tmp_path):
+        """Test RAPL zones and hwmon power files are discovered."""
+        make_rapl_zone(tmp_path / "powercap", "intel-rapl:0", 1)
+        make_rapl_zone(tmp_path / "powercap", "intel-rapl:0:0", 1)
+        (tmp_path / "powercap" / "intel-rapl").mkdir()
+        hwmon = tmp_path / "hwmon" / "hwmon0"
+        hwmon.mkdir(parents=True)
+        (hwmon / "power1_input").write_text("5\n")
+
+        zones = find_rapl_zones(str(tmp_path / "powercap"))
+        assert [z.rsplit("/", 1)[1] for z in zones] == ["intel-rapl:0", "intel-rapl:0:0"]
+        assert find_hwmon_power_files(str(tmp_path / "hwmon")) == [str(hwmon / "power1_input")]
+
+    def test_missing_file(self, tmp_path):
+        """Test opening a missing attribute raises OSError."""
+        with pytest.raises(OSError):
+            SysfsCounter(str(tmp_path / "energy_uj"))
+
+
+def make_hwmon_device(root, directory, name, interval_ms=None, **attributes):
+    """Create a fake hwmon device directory with the given attributes."""
+    device = root / directory
+    device.mkdir(parents=True)
+    (device / "name").write_text(f"{name}\n")
+    if interval_ms is not None:
+        (device / "update_interval").write_text(f"{interval_ms}\n")
+    for attribute, value in attributes.items():
+        (device / attribute).write_text(f"{value}\n")
+    return device
+
+
+class TestHwmonBackend:
+    """Test HwmonBackend against a fake hwmon tree."""
+
+    def test_channel_discovery(self, tmp_path):
+        """Test channels are named by device and label, energy preferred over power."""
+        make_hwmon_device(
+            tmp_path, "hwmon0", "ina3221", interval_ms=5,
+            power1_input=1, power1_label="VDD_CPU", power2_input=2,
+        )
+        make_hwmon_device(tmp_path, "hwmon1", "soc", energy1_input=10, power1_input=3)
+
+        channels = find_hwmon_channels(str(tmp_path))
+        assert [(c.name, c.kind, c.update_interval_ms) for c in channels] == [
+            ("ina3221/VDD_CPU", "power", 5.0),
+            ("ina3221/power2", "power", 5.0),
+            ("soc/energy1", "energy", None),
+        ]
+
+    def test_prefers_energy_counters(self, tmp_path):
+        """Test cumulative energy*_input counters are read without sampling."""
+        device = make_hwmon_device(
+            tmp_path, "hwmon0", "soc", energy1_input=1_000_000, power1_input=5_000_000,
+            energy2_input=0, energy2_label="gpu",
+        )
+
+        backend = HwmonBackend(hwmon_root=str(tmp_path))
+        try:
+            assert backend.get_domains() == ("soc/energy1", "soc/gpu")
+            _, first = backend.read()
+            (device / "energy1_input").write_text("1500000\n")
+            (device / "energy2_input").write_text("250000\n")
+            _, second, domains = backend.read_domains()
+            # 500 mJ + 250 mJ, in uJ on disk
+            assert second - first == pytest.approx(750.0)
+            assert domains == (1500.0, 250.0)
+            assert backend._sampler is None
+        finally:
+            backend.close()
+
+    def test_samples_all_power_channels(self, tmp_path):
+        """Test power-only channels are summed at the sensors' update interval."""
+        make_hwmon_device(
+            tmp_path, "hwmon0", "ina3221", interval_ms=5,
+            power1_input=1_000_000, power2_input=2_000_000,
+        )
+
+        backend = HwmonBackend(hwmon_root=str(tmp_path))
+        try:
+            assert backend.channels == ("ina3221/power1", "ina3221/power2")
+            assert backend.get_domains() == ()
+            assert backend._sampler.interval_s == pytest.approx(0.005)
+            start_ns, first = backend.read()
+            time.sleep(0.2)
+            end_ns, second = backend.read()
+            # 3 W in total
+            assert second - first == pytest.approx(3.0 * (end_ns - start_ns) / 1e6, rel=0.05)
+        finally:
+            backend.close()
+
+    def test_channel_selection(self, tmp_path, monkeypatch):
+        """Test channels are picked with globs, from config by default."""
+        make_hwmon_device(
+            tmp_path, "hwmon0", "ina3221",
+            power1_input=1, power1_label="VDD_CPU", power2_input=2, power2_label="VDD_GPU",
+        )
+
+        monkeypatch.setattr(config, "hwmon_channels", ["*/VDD_GPU"])
+        backend = HwmonBackend(hwmon_root=str(tmp_path))
+        assert backend.channels == ("ina3221/VDD_GPU",)
+        backend.close()
+
+        backend = HwmonBackend(hwmon_root=str(tmp_path), channels=["*CPU", "*GPU"])
+        assert backend.channels == ("ina3221/VDD_CPU", "ina3221/VDD_GPU")
+        backend.close()
+
+        assert not HwmonBackend(hwmon_root=str(tmp_path), channels=["none/*"]).is_available()
+
+    def test_reads_power_in_microwatts(self, tmp_path):
+        """Test power*_input values are converted from uW to mW."""
+        hwmon = tmp_path / "hwmon0"
+        hwmon.mkdir()
+        (hwmon / "power1_input").write_text("2000000\n")
+
+        backend = HwmonBackend(hwmon_root=str(tmp_path))
+        try:
+            assert backend.is_available()
+            assert backend._read_power() == 2000.0
+            _, first = backend.read()
+            time.sleep(0.1)
+            _, second = backend.read()
+            # 2 W for at least the 50 ms up to the newest sample
+            assert second - first >= 100.0
+        finally:
+            backend.close()
+
+    def test_unavailable_without_sensors(self, tmp_path):
+        """Test the backend reports unavailable on an empty tree."""
+        backend = HwmonBackend(hwmon_root=str(tmp_path))
+        assert not backend.is_available()
+        with pytest.raises(RuntimeError):
+            backend.read()
+
+
+class TestPowercapBackend:
+    """Test PowercapBackend against a synthetic powercap tree."""
+
+    def test_domains(self, powercap_tree):
+        """Test zones and subzones become named domains."""
+        backend = PowercapBackend(powercap_root=str(powercap_tree))
+        try:
+            assert backend.is_available()
+            assert backend.get_domains() == (
+                "package-0",
+                "package-0/core",
+                "package-0/dram",
+                "psys",
+            )
+        finally:
+            backend.close()
+
+    def test_read_totals_package_and_dram(self, powercap_tree):
+        """Test the scalar counter sums packages and DRAM, not psys or core."""
+        backend = PowercapBackend(powercap_root=str(powercap_tree))
+        try:
+            _, total = backend.read()
+            assert total == pytest.approx(12.0)
+
+            _, total, domains = backend.read_domains()
+            assert total == pytest.approx(12.0)
+            assert domains == pytest.approx((10.0, 6.0, 2.0, 50.0))
+        finally:
+            backend.close()
+
+    def test_unavailable_without_zones(self, tmp_path):
+        """Test the backend reports unavailable on an empty tree."""
+        backend = PowercapBackend(powercap_root=str(tmp_path))
+        assert not backend.is_available()
+        assert backend.get_domains() == ()
+
+    def test_tracer_energy_by_domain(self, powercap_tree):
+        """Test the tracer reports per-domain deltas for each function."""
+        backend = PowercapBackend(powercap_root=str(powercap_tree))
+        try:
+            tracer = EnergyTracer(backend)
+            tracer._enter(tracer.stats.intern("test.py:work"))
+            (powercap_tree / "intel-rapl:0" / "energy_uj").write_text("15000\n")
+            (powercap_tree / "intel-rapl:0:0" / "energy_uj").write_text("9000\n")
+            (powercap_tree / "intel-rapl:0:1" / "energy_uj").write_text("3000\n")
+            tracer._exit()
+
+            results = tracer.get_results()
+            func = results["functions"]["test.py:work"]
+            assert results["metadata"]["domains"] == list(backend.get_domains())
+            assert func["total_energy_mj"] == pytest.approx(6.0)
+            assert func["energy_by_domain"] == pytest.approx(
+                {"package-0": 5.0, "package-0/core": 3.0, "package-0/dram": 1.0, "psys": 0.0}
+            )
+        finally:
+            backend.close()
+
+
+class TestProportionalBackend:
+    """Test ProportionalBackend against a synthetic /proc."""
+
+    def test_scales_energy_by_cpu_share(self, tmp_path):
+        """Test increments are scaled by the share of the previous interval."""
+        write_proc_times(tmp_path, process_ticks=0, busy_ticks=0)
+        backend = ProportionalBackend(MockBackend(), proc_root=str(tmp_path), interval_ms=0)
+        assert backend.is_available()
+
+        # 10 of 40 busy ticks since the backend was created
+        write_proc_times(tmp_path, process_ticks=10, busy_ticks=40)
+        _, first = backend.read()
+        assert backend.share == 0.25
+
+        # Mock energy advances 10 mJ per read: a quarter is ours
+        _, second = backend.read()
+        assert second - first == 2.5
+
+        write_proc_times(tmp_path, process_ticks=30, busy_ticks=80)
+        _, third = backend.read()
+        assert third - second == 2.5
+        assert backend.share == 0.5
+        backend.close()
+
+    def test_share_kept_while_system_is_idle(self, tmp_path):
+        """Test intervals without busy ticks keep the previous share."""
+        write_proc_times(tmp_path, process_ticks=0, busy_ticks=0)
+        backend = ProportionalBackend(MockBackend(), proc_root=str(tmp_path), interval_ms=0)
+        write_proc_times(tmp_path, process_ticks=5, busy_ticks=10)
+        backend.read()
+        backend.read()
+        assert backend.share == 0.5
+
+    def test_unavailable_without_proc(self, tmp_path):
+        """Test the backend reports unavailable without /proc files."""
+        backend = ProportionalBackend(MockBackend(), proc_root=str(tmp_path))
+        assert not backend.is_available()
+        with pytest.raises(RuntimeError):
+            backend.read()
+
+    def test_scales_domains(self, tmp_path, powercap_tree):
+        """Test per-domain counters are scaled with the same share."""
+        proc = tmp_path / "proc"
+        write_proc_times(proc, process_ticks=0, busy_ticks=0)
+        backend = ProportionalBackend(
+            PowercapBackend(powercap_root=str(powercap_tree)), proc_root=str(proc), interval_ms=0
+        )
+        assert backend.get_domains() == backend.backend.get_domains()
+
+        write_proc_times(proc, process_ticks=1, busy_ticks=4)
+        _, _, first = backend.read_domains()
+        (powercap_tree / "intel-rapl:0" / "energy_uj").write_text("14000\n")
+        _, total, second = backend.read_domains()
+        package = backend.get_domains().index("package-0")
+        # 4000 uJ on the package, a quarter of it ours
+        assert second[package] - first[package] == 1.0
+        assert total == 1.0
+        backend.close()
+
+
+class SensorBackend(MockBackend):
+    """Plugin backend declaring better capabilities than any built-in."""
+
+    capabilities = BackendCapabilities(
+        measured=True, resolution_mj=0.001, update_period_ms=0.1, read_cost_us=1.0
+    )
+    available = False
+    probes = 0
+
+    def __init__(self):
+        super().__init__()
+        type(self).probes += 1
+
+    def is_available(self):
+        return self.available
+
+    def get_name(self):
+        return "sensor"
+
+
+@pytest.fixture(autouse=True)
+def isolated_probe_cache(tmp_path, monkeypatch):
+    """Keep probe results and plugin listings out of the user's cache."""
+    monkeypatch.setattr(config, "probe_cache", str(tmp_path / "probe-cache.json"))
+    plugin_backends = backends_module._plugin_backends
+    plugin_backends.cache_clear()
+    yield
+    plugin_backends.cache_clear()
+
+
+@pytest.fixture
+def sensor_plugin(monkeypatch):
+    """Install SensorBackend as the 'sensor' plugin."""
+    monkeypatch.setattr(SensorBackend, "probes", 0)
+    monkeypatch.setattr(
+        backends_module,
+        "_plugin_backends",
+        lambda: {"sensor": f"{__name__}:SensorBackend", "broken": "os:sep"},
+    )
+    return SensorBackend
+
+
+class TestBackendRegistry:
+    """Test backend lookup, plugins and capability-driven auto-selection."""
+
+    def test_builtin_auto_order(self):
+        """Test built-ins rank hardware counters first and never pick mock."""
+        names = [name for name, _ in backends_module.auto_candidates()]
+        assert names[:4] == ["powercap", "rapl", "hwmon", "psutil_est"]
+        assert "mock" not in names
+
+    def test_unknown_backend(self):
+        """Test unknown names raise ValueError."""
+        with pytest.raises(ValueError, match="Unknown backend"):
+            utils.get_backend("nonexistent")
+
+    def test_plugins(self, sensor_plugin):
+        """Test plugins are found by name, validated and ranked by capabilities."""
+        assert backends_module.get_backend_class("sensor") is sensor_plugin
+        assert "sensor" in backends_module.backend_names()
+        with pytest.raises(ValueError, match="not a BaseBackend subclass"):
+            backends_module.get_backend_class("broken")
+        names = [name for name, _ in backends_module.auto_candidates()]
+        assert names[0] == "sensor"
+        assert "broken" not in names
+
+    def test_undeclared_capabilities_not_auto(self):
+        """Test backends without capabilities are only used by name."""
+        assert not BaseBackend.capabilities.auto
+
+    def test_instance_capabilities(self, tmp_path):
+        """Test backends refine their capabilities once configured."""
+        backend = PsutilEstBackend(sample_interval_ms=5.0)
+        assert backend.get_capabilities().update_period_ms == 5.0
+        assert not backend.get_capabilities().measured
+
+        make_hwmon_device(tmp_path, "hwmon0", "ina3221", interval_ms=2, power1_input=1_000_000)
+        backend = HwmonBackend(hwmon_root=str(tmp_path))
+        capabilities = backend.get_capabilities()
+        assert capabilities.update_period_ms == 2.0
+        assert not capabilities.per_domain
+        backend.close()
+
+
+class TestProbeCache:
+    """Test probe results are cached per host and boot."""
+
+    def test_round_trip(self, tmp_path):
+        """Test results are read back under the same key only."""
+        path = str(tmp_path / "cache" / "probes.json")
+        cache = ProbeCache(path, {"hwmon_channels": []}, boot="boot-1")
+        cache.record("powercap", False)
+        cache.record("psutil_est", True)
+        cache.save()
+
+        cache = ProbeCache(path, {"hwmon_channels": []}, boot="boot-1")
+        assert cache.known_unavailable("powercap")
+        assert not cache.known_unavailable("psutil_est")
+        assert not cache.known_unavailable("rapl")
+
+        assert ProbeCache(path, {"hwmon_channels": []}, boot="boot-2").available == {}
+        assert ProbeCache(path, {"hwmon_channels": ["*/VDD_CPU"]}, boot="boot-1").available == {}
+
+    def test_disabled_without_boot_id(self, tmp_path, monkeypatch):
+        """Test nothing is cached when the boot cannot be identified."""
+        monkeypatch.setattr(probe, "boot_id", lambda: None)
+        path = tmp_path / "probes.json"
+        cache = ProbeCache(str(path), {})
+        cache.record("powercap", False)
+        cache.save()
+        assert not path.exists()
+
+    def test_entry_points_cached_until_packages_change(self, tmp_path, monkeypatch):
+        """Test plugin entry points are rescanned only when site-packages changes."""
+        scans = []
+        monkeypatch.setattr(
+            probe, "scan_entry_points", lambda group: scans.append(group) or {"nvml": "pkg:Nvml"}
+        )
+        monkeypatch.setattr(probe, "site_fingerprint", lambda: [["site-packages", 1]])
+        path = str(tmp_path / "probes.json")
+
+        for _ in range(2):
+            cache = ProbeCache(path, {}, boot="boot-1")
+            assert cache.entry_points("group") == {"nvml": "pkg:Nvml"}
+            cache.record("powercap", False)
+            cache.save()
+        assert len(scans) == 1
+        # Saving availability kept the cached entry points
+        assert ProbeCache(path, {}, boot="boot-1").known_unavailable("powercap")
+
+        monkeypatch.setattr(probe, "site_fingerprint", lambda: [["site-packages", 2]])
+        ProbeCache(path, {}, boot="boot-1").entry_points("group")
+        assert len(scans) == 2
+
+    def test_auto_skips_cached_unavailable(self, tmp_path, monkeypatch, sensor_plugin):
+        """Test auto probes an unavailable backend once per boot, until re-probed."""
+        monkeypatch.setattr(probe, "boot_id", lambda: "boot-1")
+
+        for _ in range(2):
+            backend = utils.get_auto_backend()
+            assert backend.get_name() != "sensor"
+            backend.close()
+        assert sensor_plugin.probes == 1
+
+        monkeypatch.setattr(sensor_plugin, "available", True)
+        rows = utils.probe_backends()
+        assert rows[0]["name"] == "sensor" and rows[0]["available"]
+        assert rows[-1]["name"] == "broken" and rows[-1]["error"]
+        backend = utils.get_auto_backend()
+        assert backend.get_name() == "sensor"
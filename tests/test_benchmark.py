@@ -0,0 +1,119 @@
+"""Tests for benchmarking callables."""
+
+import time
+
+import pytest
+
+import py_power_profile
+from py_power_profile.backends import BaseBackend, MockBackend
+from py_power_profile.benchmark import (
+    OVERHEAD_OPTIONS,
+    bench,
+    counter_period_ns,
+    load_callable,
+    tracer_overhead,
+)
+from py_power_profile.reporter import Reporter
+from py_power_profile.tracer import HAS_MONITORING
+
+
+class WorkBackend(BaseBackend):
+    """Counter of 2 mJ per unit of work on top of 1 W of idle power."""
+
+    def __init__(self):
+        self.work = 0
+        self.start_ns = time.monotonic_ns()
+
+    def read(self):
+        timestamp_ns = time.monotonic_ns()
+        return timestamp_ns, 2.0 * self.work + (timestamp_ns - self.start_ns) / 1e6
+
+    def is_available(self):
+        return True
+
+    def get_name(self):
+        return "work"
+
+
+class TestBench:
+    """Test energy benchmarks of callables."""
+
+    def test_energy_per_call_without_idle(self):
+        """Test idle power is subtracted and figures are per call."""
+        backend = WorkBackend()
+
+        def work(units):
+            backend.work += units
+
+        results = bench(work, 3, backend=backend, samples=5, warmups=1, min_sample_ms=5)
+        benchmark = results["benchmark"]
+        assert benchmark["idle_power_w"] == pytest.approx(1.0)
+        assert benchmark["mean_energy_mj"] == pytest.approx(6.0, rel=0.05)
+        assert benchmark["loops"] >= 1
+        assert results["summary"]["total_energy_mj"] == benchmark["mean_energy_mj"]
+        assert len(results["samples"]["functions"][benchmark["name"]]) == 5
+
+    def test_results_work_with_compare(self):
+        """Test benchmark results can be compared and printed."""
+        backend = WorkBackend()
+
+        def cheap():
+            backend.work += 1
+
+        def expensive():
+            backend.work += 2
+
+        old = bench(cheap, backend=backend, samples=6, min_sample_ms=2, name="bench:f")
+        new = bench(expensive, backend=backend, samples=6, min_sample_ms=2, name="bench:f")
+        reporter = Reporter()
+        comparison = reporter.compare_results(old, new)
+        assert comparison["method"] == "mannwhitney"
+        assert comparison["regressions"] == ["bench:f"]
+        reporter.print_benchmark(new)
+
+    def test_fixed_loops_and_validation(self):
+        """Test explicit loop counts are kept and bad settings are rejected."""
+        results = bench(lambda: None, backend=MockBackend(), samples=3, loops=7, subtract_idle=False)
+        assert results["benchmark"]["loops"] == 7
+        assert results["benchmark"]["mean_energy_mj"] == pytest.approx(10.0 / 7)
+        with pytest.raises(ValueError):
+            bench(lambda: None, backend=MockBackend(), samples=1)
+        with pytest.raises(ValueError):
+            bench(lambda: None, backend=MockBackend(), loops=0)
+
+    def test_counter_period(self):
+        """Test a counter that never changes falls back to the default period."""
+
+        class FrozenBackend(WorkBackend):
+            def read(self):
+                return time.monotonic_ns(), 0.0
+
+        assert counter_period_ns(MockBackend()) < 1_000_000
+        assert counter_period_ns(FrozenBackend(), timeout_ms=1) == 1_000_000
+
+
+def test_load_callable():
+    """Test module:callable targets are resolved, including dotted names."""
+    assert load_callable("os.path:join") is __import__("os").path.join
+    assert load_callable("py_power_profile.reporter:Reporter.print_benchmark")
+    with pytest.raises(ValueError):
+        load_callable("os.path")
+    with pytest.raises(AttributeError):
+        load_callable("os.path:missing")
+
+
+def test_package_exports_bench():
+    """Test bench is available from the package."""
+    assert py_power_profile.bench is bench
+
+
+def test_tracer_overhead():
+    """Test the overhead report covers every engine and option set."""
+    report = tracer_overhead(MockBackend(), calls=100, rounds=1)
+    engines = 2 if HAS_MONITORING else 1
+    assert len(report["configurations"]) == engines * len(OVERHEAD_OPTIONS)
+    assert report["backend"] == "mock"
+    for row in report["configurations"]:
+        assert row["inner_energy_mj"] == pytest.approx(10.0)
+        assert row["read_time_us"] > 0
+    Reporter().print_overhead(report)
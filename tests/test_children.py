@@ -0,0 +1,198 @@
+"""Tests for child process profiling."""
+
+import multiprocessing
+import os
+import subprocess
+import sys
+
+import pytest
+
+from py_power_profile.children import (
+    collect_child_results,
+    disable_child_tracing,
+    enable_child_tracing,
+    merge_child_results,
+)
+
+CHILD_SCRIPT = """
+def child_work():
+    return sum(range(1000))
+
+child_work()
+child_work()
+"""
+
+# Sends SIGTERM while the shard is written, as Pool.terminate() does when it
+# reaches a worker that is already exiting
+TERMINATED_WHILE_WRITING_SCRIPT = CHILD_SCRIPT + """
+import json
+import os
+import signal
+
+dump = json.dump
+
+
+def dump_after_sigterm(*args, **kwargs):
+    os.kill(os.getpid(), signal.SIGTERM)
+    return dump(*args, **kwargs)
+
+
+json.dump = dump_after_sigterm
+"""
+
+
+def forked_work():
+    """Target of a forked child process."""
+    return sum(range(1000))
+
+
+def pool_work(n):
+    """Task of a worker in a process pool."""
+    return sum(range(n))
+
+
+def function_result(calls, energy):
+    """Build the exported statistics of a function."""
+    return {
+        "calls": calls,
+        "total_energy_mj": energy,
+        "total_time_ms": 1.0,
+        "self_energy_mj": energy,
+        "self_time_ms": 1.0,
+        "avg_energy_mj": energy / calls,
+        "avg_time_ms": 1.0 / calls,
+        "min_energy_mj": energy / calls,
+        "max_energy_mj": energy / calls,
+    }
+
+
+class TestChildProfiling:
+    """Test child bootstrapping, shards and merging."""
+
+    def test_merge_child_results(self):
+        """Test child functions are summed and broken down by pid."""
+        results = {
+            "functions": {"a.py:f": function_result(2, 20.0)},
+            "summary": {"total_energy_mj": 20.0, "total_time_ms": 1.0, "function_count": 1},
+        }
+        children = {
+            "123": {
+                "functions": {
+                    "a.py:f": function_result(1, 5.0),
+                    "a.py:g": function_result(1, 7.0),
+                },
+                "summary": {"total_energy_mj": 12.0, "total_time_ms": 2.0, "function_count": 2},
+                "process": {"pid": 123, "ppid": os.getpid(), "argv": ["worker.py"]},
+            }
+        }
+
+        merge_child_results(results, children)
+
+        assert results["functions"]["a.py:f"]["calls"] == 3
+        assert results["functions"]["a.py:f"]["total_energy_mj"] == 25.0
+        assert results["functions"]["a.py:f"]["min_energy_mj"] == 5.0
+        assert results["functions"]["a.py:g"]["calls"] == 1
+        assert results["summary"]["total_energy_mj"] == 32.0
+        assert results["summary"]["process_count"] == 2
+        assert results["processes"]["123"]["argv"] == ["worker.py"]
+        assert results["processes"][str(os.getpid())]["total_energy_mj"] == 20.0
+
+    def test_subprocess_writes_shard(self):
+        """Test a child interpreter is bootstrapped through PYTHONPATH."""
+        old_pythonpath = os.environ.get("PYTHONPATH")
+        shard_dir = enable_child_tracing(None, {"backend": "mock", "engine": "settrace"})
+        try:
+            completed = subprocess.run([sys.executable, "-c", CHILD_SCRIPT])
+        finally:
+            disable_child_tracing()
+        children = collect_child_results(shard_dir)
+
+        assert completed.returncode == 0
+        assert os.environ.get("PYTHONPATH") == old_pythonpath
+        assert not os.path.exists(shard_dir)
+        assert len(children) == 1
+        shard = next(iter(children.values()))
+        assert shard["process"]["ppid"] == os.getpid()
+        work = [v for k, v in shard["functions"].items() if k.endswith(":child_work")]
+        assert work and work[0]["calls"] == 2
+
+    def test_child_reuses_parent_calibration(self):
+        """Test children subtract the parent's calibration instead of measuring their own."""
+        calibration = {
+            "engine": "settrace",
+            "calls": 1,
+            "read_time_us": 0.0,
+            "inner_time_us": 0.0,
+            "inner_energy_mj": 10.0,
+            "outer_time_us": 0.0,
+            "outer_energy_mj": 10.0,
+        }
+        shard_dir = enable_child_tracing(
+            None,
+            {
+                "backend": "mock",
+                "engine": "settrace",
+                "subtract_overhead": True,
+                "calibration": calibration,
+            },
+        )
+        try:
+            completed = subprocess.run([sys.executable, "-c", CHILD_SCRIPT])
+        finally:
+            disable_child_tracing()
+        children = collect_child_results(shard_dir)
+
+        assert completed.returncode == 0
+        shard = next(iter(children.values()))
+        assert shard["metadata"]["overhead"] == {**calibration, "subtracted": True}
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+    def test_forked_child_writes_shard(self):
+        """Test a forked multiprocessing child traces itself afresh."""
+        shard_dir = enable_child_tracing(None, {"backend": "mock"})
+        try:
+            child = multiprocessing.get_context("fork").Process(target=forked_work)
+            child.start()
+            child.join()
+        finally:
+            disable_child_tracing()
+        children = collect_child_results(shard_dir)
+
+        assert child.exitcode == 0
+        shard = children[str(child.pid)]
+        assert any(k.endswith(":forked_work") for k in shard["functions"])
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+    def test_terminated_pool_writes_shards(self):
+        """Test workers of a pool left through terminate() write their shards."""
+        shard_dir = enable_child_tracing(None, {"backend": "mock"})
+        try:
+            # Leaving the with block calls Pool.terminate()
+            with multiprocessing.get_context("fork").Pool(2) as pool:
+                pool.map(pool_work, [1000] * 4)
+        finally:
+            disable_child_tracing()
+        children = collect_child_results(shard_dir)
+
+        calls = [
+            stats["calls"]
+            for shard in children.values()
+            for key, stats in shard["functions"].items()
+            if key.endswith(":pool_work")
+        ]
+        assert sum(calls) == 4
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="requires POSIX signals")
+    def test_sigterm_while_writing_shard(self):
+        """Test a SIGTERM arriving during the shard write does not lose it."""
+        shard_dir = enable_child_tracing(None, {"backend": "mock", "engine": "settrace"})
+        try:
+            completed = subprocess.run([sys.executable, "-c", TERMINATED_WHILE_WRITING_SCRIPT])
+        finally:
+            disable_child_tracing()
+        children = collect_child_results(shard_dir)
+
+        assert completed.returncode == 0
+        shard = next(iter(children.values()))
+        work = [v for k, v in shard["functions"].items() if k.endswith(":child_work")]
+        assert work and work[0]["calls"] == 2
@@ -198,4 +198,65 @@ class TestReporterComparison:
                 loaded_results = json.load(f)
                 assert loaded_results == results
         finally:
-            Path(temp_file).unlink(missing_ok=True) 
\ No newline at end of file
+            Path(temp_file).unlink(missing_ok=True) 
+
+
+def repeated_results(runs_by_function):
+    """Build results of repeated runs from per-function run energies."""
+    run_count = len(next(iter(runs_by_function.values())))
+    totals = [sum(runs[i] for runs in runs_by_function.values()) for i in range(run_count)]
+    return {
+        "functions": {
+            key: {"total_energy_mj": sum(runs) / run_count, "calls": 10}
+            for key, runs in runs_by_function.items()
+        },
+        "summary": {"total_energy_mj": sum(totals) / run_count},
+        "samples": {
+            "runs": run_count,
+            "representative_run": 0,
+            "total_energy_mj": totals,
+            "functions": runs_by_function,
+        },
+    }
+
+
+class TestRepeatedComparison:
+    """Test comparison of results profiled with --repeat."""
+
+    def test_auto_uses_significance_test(self):
+        """Test noisy changes beyond the threshold are not regressions."""
+        reporter = Reporter()
+        old_results = repeated_results({
+            "test.py:noisy": [100.0, 60.0, 140.0, 90.0, 110.0, 70.0],
+            "test.py:slow": [50.0, 51.0, 49.0, 50.5, 49.5, 50.0],
+        })
+        new_results = repeated_results({
+            "test.py:noisy": [112.0, 150.0, 70.0, 120.0, 95.0, 125.0],
+            "test.py:slow": [60.0, 61.0, 59.0, 60.5, 59.5, 60.0],
+        })
+
+        comparison = reporter.compare_results(old_results, new_results)
+        assert comparison["method"] == "mannwhitney"
+        assert comparison["regressions"] == ["test.py:slow"]
+        assert comparison["changes"]["test.py:slow"]["p_value"] < 0.05
+        assert comparison["changes"]["test.py:slow"]["new_calls"] == 10
+
+        threshold = reporter.compare_results(old_results, new_results, method="threshold")
+        assert sorted(threshold["regressions"]) == ["test.py:noisy", "test.py:slow"]
+
+    @pytest.mark.parametrize("runs", [2, 3])
+    def test_auto_detects_small_repeat_regressions(self, runs):
+        """Test fully separated regressions are found with only 2 or 3 runs."""
+        reporter = Reporter()
+        old_results = repeated_results({"test.py:slow": [100.0, 101.0, 99.0][:runs]})
+        new_results = repeated_results({"test.py:slow": [200.0, 201.0, 199.0][:runs]})
+
+        comparison = reporter.compare_results(old_results, new_results)
+        assert comparison["method"] == "bootstrap"
+        assert comparison["regressions"] == ["test.py:slow"]
+
+    def test_tests_need_repeated_runs(self):
+        """Test significance methods reject single-run results."""
+        results = {"functions": {}, "summary": {"total_energy_mj": 1.0}}
+        with pytest.raises(ValueError):
+            Reporter().compare_results(results, results, method="bootstrap")
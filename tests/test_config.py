@@ -0,0 +1,133 @@
+"""Tests for configuration handling."""
+
+import fnmatch
+import os
+
+import pytest
+
+from py_power_profile import config as config_module
+from py_power_profile.config import Config, module_name
+
+
+PATHS = [
+    "tests/test_tracer.py",
+    "/usr/lib/python3.11/json/__init__.py",
+    "/home/user/.venv/lib/site-packages/rich/table.py",
+    "<frozen importlib._bootstrap>",
+    "/home/user/project/app.py",
+]
+
+
+class TestShouldIgnore:
+    """Test the compiled and memoized ignore matcher."""
+
+    @pytest.mark.parametrize("path", PATHS)
+    def test_matches_fnmatch(self, path):
+        """Test the combined regex agrees with fnmatch on every pattern."""
+        config = Config()
+        config.ignore_patterns = ["tests/*", "*/site-packages/*", "<frozen *>", "*/lib/python3*/*"]
+
+        expected = any(fnmatch.fnmatch(path, p) for p in config.ignore_patterns)
+        assert config.should_ignore(path) is expected
+        # Second lookup is served from the cache
+        assert config.should_ignore(path) is expected
+
+    def test_changing_patterns_resets_cache(self):
+        """Test assigning new patterns invalidates memoized decisions."""
+        config = Config()
+        config.ignore_patterns = ["*.py"]
+        assert config.should_ignore("app.py")
+
+        config.ignore_patterns = []
+        assert not config.should_ignore("app.py")
+
+
+class TestShouldInclude:
+    """Test the include allow-list over module and qualified names."""
+
+    def test_module_name(self):
+        """Test module names are derived from sys.path."""
+        assert module_name(__file__) == __name__
+        assert module_name(fnmatch.__file__) == "fnmatch"
+        assert module_name("<frozen importlib._bootstrap>") == "importlib._bootstrap"
+        assert module_name("<string>") == "<string>"
+
+    def test_empty_includes_everything(self):
+        """Test no patterns profile every function."""
+        assert Config().should_include(__file__, "anything")
+
+    def test_package_patterns(self):
+        """Test 'pkg.*' matches the package and its submodules only."""
+        config = Config()
+        config.include_patterns = ["tests.*"]
+        assert config.should_include(__file__, "TestShouldInclude.test_package_patterns")
+        assert not config.should_include(fnmatch.__file__, "fnmatch")
+
+    def test_function_patterns(self):
+        """Test 'module:qualname' globs select single functions."""
+        config = Config()
+        config.include_patterns = ["fnmatch:fn*"]
+        assert config.should_include(fnmatch.__file__, "fnmatch")
+        assert not config.should_include(fnmatch.__file__, "translate")
+
+        config.include_patterns = []
+        assert config.should_include(fnmatch.__file__, "translate")
+
+
+class TestLazyLoading:
+    """Test settings are loaded on first access and files cached by mtime."""
+
+    def write_config(self, path, budget):
+        path.write_text(f"energy_budget_mj = {budget}\n")
+
+    def test_loaded_on_first_access(self, tmp_path, monkeypatch):
+        """Test nothing is read until a setting is used."""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delenv("PY_POWER_ENERGY_BUDGET_MJ", raising=False)
+        config = Config()
+        self.write_config(tmp_path / ".pypowerprofile", 250)
+        assert not config._loaded
+        assert config.energy_budget_mj == 250.0
+        assert config._loaded
+
+    def test_overhead_kept_by_default(self, tmp_path, monkeypatch):
+        """Test overhead subtraction is opt-in."""
+        monkeypatch.chdir(tmp_path)
+        assert Config().subtract_overhead is False
+
+    def test_assigned_settings_win(self, tmp_path, monkeypatch):
+        """Test settings assigned before loading are kept over file values."""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delenv("PY_POWER_ENERGY_BUDGET_MJ", raising=False)
+        self.write_config(tmp_path / ".pypowerprofile", 250)
+        config = Config()
+        config.energy_budget_mj = 5.0
+        config.include_patterns = ["app.*"]
+        assert config.energy_budget_mj == 5.0
+        assert config.tdp_watts == 15.0
+        assert config.include_patterns == ["app.*"]
+
+    def test_reload_uses_mtime_cache(self, tmp_path, monkeypatch):
+        """Test reload re-parses a config file only after it changed."""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delenv("PY_POWER_ENERGY_BUDGET_MJ", raising=False)
+        path = tmp_path / ".pypowerprofile"
+        self.write_config(path, 250)
+        config = Config()
+        assert config.energy_budget_mj == 250.0
+        cached = config_module._FILE_CACHE[os.path.abspath(path)][1]
+
+        config.reload()
+        assert config.energy_budget_mj == 250.0
+        assert config_module._FILE_CACHE[os.path.abspath(path)][1] is cached
+
+        self.write_config(path, 500)
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        config.reload()
+        assert config.energy_budget_mj == 500.0
+
+    def test_unknown_attribute(self):
+        """Test attributes other than settings still raise AttributeError."""
+        with pytest.raises(AttributeError):
+            Config().missing  # noqa: B018
@@ -0,0 +1,65 @@
+"""Tests for collapsed-stack and flame graph output."""
+
+import xml.etree.ElementTree as ET
+
+from py_power_profile.flamegraph import (
+    collapsed_stacks,
+    hot_path,
+    render_svg,
+    write_collapsed,
+)
+
+
+def call_path_results():
+    """Build results with a small call path table."""
+    def path(calls, energy):
+        return {"calls": calls, "self_energy_mj": energy, "self_time_ms": 1.0}
+
+    return {
+        "call_paths": {
+            "a.py:main": path(1, 10.0),
+            "a.py:main;a.py:load": path(2, 30.0),
+            "a.py:main;a.py:compute": path(1, 20.0),
+            "a.py:main;a.py:compute;a.py:kernel": path(100, 40.0),
+            "a.py:main;a.py:idle": path(1, 0.0),
+        }
+    }
+
+
+class TestFlameGraph:
+    """Test flame graph exports."""
+
+    def test_collapsed_stacks(self, tmp_path):
+        """Test one weighted line per call path with energy."""
+        lines = collapsed_stacks(call_path_results())
+        assert "a.py:main;a.py:compute;a.py:kernel 40.000" in lines
+        assert "a.py:main 10.000" in lines
+        # Paths without energy are left out
+        assert len(lines) == 4
+
+        path = tmp_path / "stacks.txt"
+        write_collapsed(call_path_results(), str(path))
+        assert path.read_text().splitlines() == lines
+
+    def test_hot_path_follows_inclusive_energy(self):
+        """Test the hot path prefers the heavier subtree over the heavier leaf."""
+        assert hot_path(call_path_results()) == [
+            ("a.py:main", 100.0),
+            ("a.py:compute", 60.0),
+            ("a.py:kernel", 40.0),
+        ]
+
+    def test_svg_is_self_contained(self):
+        """Test the SVG parses and has a frame per function."""
+        svg = render_svg(call_path_results(), title="Test <run>")
+        root = ET.fromstring(svg)
+        titles = [element.text for element in root.iter("{http://www.w3.org/2000/svg}title")]
+        assert any(title.startswith("a.py:kernel: 40.000 mJ") for title in titles)
+        assert any(title.startswith("all: 100.000 mJ") for title in titles)
+        assert "Test &lt;run&gt;" in svg
+
+    def test_empty_results(self):
+        """Test results without call paths render an empty graph."""
+        assert collapsed_stacks({}) == []
+        assert hot_path({}) == []
+        ET.fromstring(render_svg({}))
@@ -0,0 +1,107 @@
+"""Tests for the in-process profiling API."""
+
+import json
+
+import pytest
+
+import py_power_profile
+from py_power_profile.backends import MockBackend
+from py_power_profile.profiler import Profiler, active_profiler, energy_profiled, profile
+
+
+def api_work(n):
+    """Small function profiled through the API."""
+    return sum(range(n))
+
+
+def function_names(results):
+    """Map short function names to their stats."""
+    return {key.rsplit(":", 1)[-1]: stats for key, stats in results["functions"].items()}
+
+
+class TestProfiler:
+    """Test start/stop profiling windows."""
+
+    def test_windows_and_atomic_dump(self, tmp_path):
+        """Test each window is dumped to the output file and nothing is left behind."""
+        output = tmp_path / "energy.json"
+        profiler = Profiler(backend=MockBackend(), output=str(output), subtract_overhead=False)
+        for calls in (1, 3):
+            profiler.start()
+            for _ in range(calls):
+                api_work(10)
+            results = profiler.stop()
+            assert function_names(results)["api_work"]["calls"] == calls
+            assert json.loads(output.read_text()) == results
+        assert [path.name for path in tmp_path.iterdir()] == ["energy.json"]
+        assert not profiler.running
+
+    def test_one_profiler_at_a_time(self):
+        """Test a second profiler cannot start while one runs."""
+        first = Profiler(backend=MockBackend(), subtract_overhead=False)
+        second = Profiler(backend=MockBackend(), subtract_overhead=False)
+        assert first.toggle() is True
+        try:
+            assert active_profiler() is first
+            with pytest.raises(RuntimeError):
+                second.start()
+        finally:
+            assert first.toggle() is False
+        assert active_profiler() is None
+        with pytest.raises(RuntimeError):
+            first.stop()
+
+    def test_calibration_is_reused(self):
+        """Test overhead is calibrated once, not on every window."""
+        profiler = Profiler(backend=MockBackend(), subtract_overhead=True)
+        with profiler:
+            api_work(10)
+        calibration = profiler.results["metadata"]["overhead"]
+        with profiler:
+            api_work(10)
+        assert profiler.results["metadata"]["overhead"] == calibration
+
+    def test_sample_mode(self):
+        """Test the sampling profiler can be used as well."""
+        with profile(backend=MockBackend(), mode="sample", sample_interval_ms=1) as profiler:
+            api_work(200000)
+        assert profiler.results["metadata"]["mode"] == "sample"
+        with pytest.raises(ValueError):
+            Profiler(mode="replay")
+
+
+class TestDecorator:
+    """Test the energy_profiled decorator."""
+
+    def test_profiles_each_call(self):
+        """Test recursive calls are left to the outermost window."""
+
+        @energy_profiled(backend=MockBackend(), subtract_overhead=False)
+        def recurse(n):
+            return recurse(n - 1) if n else api_work(10)
+
+        recurse(2)
+        functions = function_names(recurse.profiler.results)
+        assert functions["recurse"]["calls"] == 3
+        assert functions["api_work"]["calls"] == 1
+        assert "wrapper" not in functions
+
+    def test_disabled_returns_function(self):
+        """Test a disabled decorator leaves the function untouched."""
+        assert energy_profiled(api_work, enabled=False) is api_work
+        assert energy_profiled(enabled=False)(api_work) is api_work
+
+    def test_inside_profile_block(self):
+        """Test decorated calls inside a running profile are not nested."""
+        decorated = energy_profiled(api_work, backend=MockBackend(), subtract_overhead=False)
+        with profile(backend=MockBackend(), subtract_overhead=False) as profiler:
+            decorated(10)
+        assert decorated.profiler.results is None
+        assert function_names(profiler.results)["api_work"]["calls"] == 1
+
+
+def test_package_exports():
+    """Test the API is available from the package."""
+    assert py_power_profile.profile is profile
+    assert py_power_profile.energy_profiled is energy_profiled
+    assert py_power_profile.Profiler is Profiler
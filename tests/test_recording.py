@@ -0,0 +1,212 @@
+"""Tests for trace log recording and offline aggregation."""
+
+import os
+import threading
+
+import pytest
+
+from py_power_profile.backends import MockBackend
+from py_power_profile.recording import (
+    EVENT_ENTER,
+    EVENT_EXIT,
+    RECORD_SIZE,
+    RecordingTracer,
+    TraceWriter,
+    aggregate_trace,
+)
+from py_power_profile.tracer import HAS_MONITORING
+
+try:
+    import numpy  # noqa: F401
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+AGGREGATORS = [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(not HAS_NUMPY, reason="numpy not installed")),
+]
+
+
+def recorded_leaf():
+    """Small function recorded by the tests."""
+    return 1
+
+
+def recorded_caller(n):
+    """Call recorded_leaf n times."""
+    return sum(recorded_leaf() for _ in range(n))
+
+
+def recorded_fib(n):
+    """Recursive function recorded by the tests."""
+    return n if n < 2 else recorded_fib(n - 1) + recorded_fib(n - 2)
+
+
+def write_log(path, names, events):
+    """Write a trace log of (name index, event) pairs with a 10 mJ counter."""
+    writer = TraceWriter(str(path), names, {"backend": "mock"})
+    buffer = writer.buffer(1, "MainThread")
+    for step, (func_id, event) in enumerate(events, 1):
+        buffer.append(func_id, event, step * 1000, step * 10.0)
+    buffer.flush()
+    writer.close()
+
+
+def function(results, name):
+    """Return the results entry of a function defined in this module."""
+    matches = [v for k, v in results["functions"].items() if k.endswith(f":{name}")]
+    assert len(matches) == 1
+    return matches[0]
+
+
+class TestAggregation:
+    """Test rebuilding results from hand-written logs."""
+
+    @pytest.mark.parametrize("use_numpy", AGGREGATORS)
+    def test_nested_and_recursive_calls(self, tmp_path, use_numpy):
+        """Test self, inclusive and recursive figures match the tracer's rules."""
+        path = tmp_path / "trace.bin"
+        # outer(fib(fib()), leaf())
+        write_log(
+            path,
+            ["a.py:outer", "a.py:fib", "a.py:leaf"],
+            [
+                (0, EVENT_ENTER), (1, EVENT_ENTER), (1, EVENT_ENTER), (1, EVENT_EXIT),
+                (1, EVENT_EXIT), (2, EVENT_ENTER), (2, EVENT_EXIT), (0, EVENT_EXIT),
+            ],
+        )
+
+        results = aggregate_trace(str(path), use_numpy=use_numpy)
+        functions = results["functions"]
+        assert results["metadata"]["backend"] == "mock"
+        assert functions["a.py:outer"]["calls"] == 1
+        assert functions["a.py:outer"]["total_energy_mj"] == 70.0
+        assert functions["a.py:outer"]["self_energy_mj"] == 30.0
+        assert functions["a.py:fib"]["calls"] == 2
+        assert functions["a.py:fib"]["total_energy_mj"] == 30.0
+        assert functions["a.py:fib"]["self_energy_mj"] == 30.0
+        assert functions["a.py:fib"]["min_energy_mj"] == 10.0
+        assert functions["a.py:fib"]["max_energy_mj"] == 30.0
+        assert functions["a.py:leaf"]["total_energy_mj"] == 10.0
+        assert results["summary"]["total_energy_mj"] == 70.0
+        assert results["threads"][0]["name"] == "MainThread"
+
+    @pytest.mark.parametrize("use_numpy", AGGREGATORS)
+    def test_truncated_log(self, tmp_path, use_numpy):
+        """Test a log cut inside a block keeps its complete blocks."""
+        path = tmp_path / "trace.bin"
+        names = ["a.py:f"]
+        writer = TraceWriter(str(path), names, {})
+        buffer = writer.buffer(1, "MainThread")
+        buffer.append(0, EVENT_ENTER, 0, 0.0)
+        buffer.append(0, EVENT_EXIT, 1000, 10.0)
+        buffer.flush()
+        buffer.append(0, EVENT_ENTER, 2000, 20.0)
+        buffer.append(0, EVENT_EXIT, 3000, 30.0)
+        buffer.flush()
+        writer.close()
+
+        # Simulate a crash half-way through the second block
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) - RECORD_SIZE)
+
+        results = aggregate_trace(str(path), use_numpy=use_numpy)
+        assert results["functions"]["a.py:f"]["calls"] == 1
+
+    @pytest.mark.parametrize("use_numpy", AGGREGATORS)
+    def test_failed_measurement_is_dropped(self, tmp_path, use_numpy):
+        """Test calls whose exit reading failed are left out."""
+        path = tmp_path / "trace.bin"
+        writer = TraceWriter(str(path), ["a.py:outer", "a.py:f"], {})
+        buffer = writer.buffer(1, "MainThread")
+        buffer.append(0, EVENT_ENTER, 0, 0.0)
+        buffer.append(1, EVENT_ENTER, 1000, 10.0)
+        buffer.append(1, EVENT_EXIT, 2000, float("nan"))
+        buffer.append(0, EVENT_EXIT, 3000, 30.0)
+        buffer.flush()
+        writer.close()
+
+        results = aggregate_trace(str(path), use_numpy=use_numpy)
+        assert "a.py:f" not in results["functions"]
+        assert results["functions"]["a.py:outer"]["self_energy_mj"] == 30.0
+
+    def test_not_a_trace_log(self, tmp_path):
+        """Test other files are rejected."""
+        path = tmp_path / "results.json"
+        path.write_text("{}")
+        with pytest.raises(ValueError):
+            aggregate_trace(str(path))
+
+
+class TestRecordingTracer:
+    """Test recording a traced run."""
+
+    @pytest.mark.parametrize("engine", ["settrace", "monitoring"])
+    def test_matches_in_memory_tracer(self, tmp_path, engine):
+        """Test recorded results agree with EnergyTracer's."""
+        if engine == "monitoring" and not HAS_MONITORING:
+            pytest.skip("sys.monitoring requires Python 3.12+")
+
+        path = str(tmp_path / "trace.bin")
+        tracer = RecordingTracer(MockBackend(energy_per_call_mj=10.0), path, engine=engine)
+        tracer.start()
+        recorded_caller(3)
+        recorded_fib(4)
+        tracer.stop()
+
+        results = tracer.get_results()
+        assert results["metadata"]["mode"] == "record"
+        assert results["metadata"]["trace_log"] == path
+        assert function(results, "recorded_leaf")["calls"] == 3
+        fib = function(results, "recorded_fib")
+        assert fib["calls"] == 9
+        # 9 calls, two readings each; recursion counted once inclusive
+        assert fib["total_energy_mj"] == 170.0
+        assert fib["self_energy_mj"] == 170.0
+        assert aggregate_trace(path)["functions"] == results["functions"]
+
+    def test_records_threads(self, tmp_path):
+        """Test each thread gets its own records and summary."""
+        path = str(tmp_path / "trace.bin")
+        tracer = RecordingTracer(MockBackend(), path)
+        tracer.start()
+        workers = [
+            threading.Thread(target=recorded_caller, args=(2,), name=f"worker-{i}")
+            for i in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        recorded_caller(1)
+        tracer.stop()
+
+        results = tracer.get_results()
+        assert function(results, "recorded_leaf")["calls"] == 7
+        threads = {t["name"]: t for t in results["threads"]}
+        for i in range(3):
+            assert any(k.endswith(":recorded_caller") for k in threads[f"worker-{i}"]["functions"])
+
+    def test_call_limit(self, tmp_path):
+        """Test call_limit still applies while recording."""
+        tracer = RecordingTracer(MockBackend(), str(tmp_path / "trace.bin"), call_limit=2)
+        tracer.start()
+        recorded_caller(5)
+        tracer.stop()
+
+        assert function(tracer.get_results(), "recorded_leaf")["calls"] == 2
+
+    def test_write_after_close(self, tmp_path):
+        """Test using a stopped tracer or a closed log raises a clear error."""
+        tracer = RecordingTracer(MockBackend(), str(tmp_path / "trace.bin"))
+        tracer.start()
+        recorded_caller(1)
+        tracer.stop()
+
+        with pytest.raises(ValueError, match="closed trace log"):
+            tracer._enter(0)
+        writer = TraceWriter(str(tmp_path / "other.bin"), [], {})
+        writer.close()
+        with pytest.raises(ValueError, match="closed trace log"):
+            writer._write_block(b"RECS", b"")
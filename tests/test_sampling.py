@@ -0,0 +1,76 @@
+"""Tests for the sampling profiler."""
+
+import threading
+import time
+
+import pytest
+
+from py_power_profile.backends import MockBackend
+from py_power_profile.sampling import SamplingTracer
+
+
+def busy_loop(duration_s):
+    """Spin for the given duration."""
+    end = time.perf_counter() + duration_s
+    while time.perf_counter() < end:
+        pass
+
+
+def sample_from_thread(tracer):
+    """Take one sample, from another thread, while this function runs."""
+    watcher = threading.Thread(target=tracer._sample)
+    watcher.start()
+    watcher.join()
+
+
+class TestSamplingTracer:
+    """Test SamplingTracer class."""
+
+    def test_initialization(self):
+        """Test SamplingTracer initialization."""
+        tracer = SamplingTracer(MockBackend(), interval_ms=5.0, max_overhead=0.02)
+
+        assert tracer.interval_s == 0.005
+        assert tracer.max_overhead == 0.02
+        assert tracer.samples == 0
+        assert len(tracer.stats) == 0
+
+    def test_invalid_arguments(self):
+        """Test invalid sampling configuration is rejected."""
+        with pytest.raises(ValueError):
+            SamplingTracer(MockBackend(), interval_ms=0)
+        with pytest.raises(ValueError):
+            SamplingTracer(MockBackend(), max_overhead=1.5)
+
+    def test_samples_running_function(self):
+        """Test that a busy function is credited with the sampled energy."""
+        tracer = SamplingTracer(MockBackend(energy_per_call_mj=1.0), interval_ms=2.0)
+
+        tracer.start()
+        busy_loop(0.1)
+        tracer.stop()
+
+        results = tracer.get_results()
+        busy_keys = [key for key in results["functions"] if key.endswith(":busy_loop")]
+
+        assert tracer.samples > 0
+        assert busy_keys
+        assert results["functions"][busy_keys[0]]["calls"] <= tracer.samples
+        assert results["metadata"]["mode"] == "sample"
+        assert results["summary"]["total_energy_mj"] == pytest.approx(tracer.samples * 1.0)
+        # Frames that were already running when sampling started are excluded
+        assert not any(key.endswith(":test_samples_running_function") for key in results["functions"])
+
+    def test_one_read_per_tick(self):
+        """Test each tick reads the counter once and credits all energy since the last."""
+        backend = MockBackend(energy_per_call_mj=1.0)
+        tracer = SamplingTracer(backend, interval_ms=60_000.0)
+        tracer.start()
+        for _ in range(3):
+            sample_from_thread(tracer)
+        tracer.stop()
+
+        # One read at start and one per tick
+        assert backend._energy_mj == 4.0
+        assert tracer.samples == 3
+        assert tracer.get_results()["summary"]["total_energy_mj"] == pytest.approx(3.0)
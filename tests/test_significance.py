@@ -0,0 +1,120 @@
+"""Tests for significance testing of repeated runs."""
+
+import pytest
+
+from py_power_profile import significance
+from py_power_profile.significance import (
+    bootstrap_interval,
+    compare_samples,
+    mann_whitney,
+    min_p_value,
+)
+from py_power_profile.utils import combine_runs
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "python"])
+def use_numpy(request, monkeypatch):
+    """Run a test with the vectorized and the pure-Python implementation."""
+    if request.param:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(significance, "_has_numpy", lambda: False)
+    return request.param
+
+
+class TestMannWhitney:
+    """Test the rank-sum test."""
+
+    def test_separated_samples(self, use_numpy):
+        """Test fully separated samples reject and identical ones do not."""
+        old = [[10.0, 11.0, 12.0, 10.5, 11.5, 10.2, 11.8, 10.9],
+               [5.0, 5.0, 5.0, 5.0, 5.0, 5.0, 5.0, 5.0]]
+        new = [[20.0, 21.0, 22.0, 20.5, 21.5, 20.2, 21.8, 20.9],
+               [5.0, 5.0, 5.0, 5.0, 5.0, 5.0, 5.0, 5.0]]
+        p_values = mann_whitney(old, new)
+        assert p_values[0] < 0.001
+        assert p_values[1] == 1.0
+
+    def test_matches_reference(self, use_numpy):
+        """Test the tie-corrected p-value against a worked example (U=5)."""
+        old = [[1.0, 2.0, 2.0, 3.0, 4.0]]
+        new = [[2.0, 3.0, 4.0, 5.0, 5.0]]
+        assert mann_whitney(old, new)[0] == pytest.approx(0.1351, abs=1e-4)
+
+    def test_exact_small_samples(self, use_numpy):
+        """Test untied small samples get exact p-values (U=0, U=3 and U=4)."""
+        old = [[1.0, 2.0, 3.0, 4.0, 5.0], [1.0, 2.0, 3.0, 4.0, 8.0], [1.0, 2.0, 3.0, 5.0, 8.0]]
+        new = [[6.0, 7.0, 8.0, 9.0, 10.0], [5.0, 6.0, 7.0, 9.0, 10.0], [4.0, 6.0, 7.0, 9.0, 10.0]]
+        assert mann_whitney(old, new) == pytest.approx([2 / 252, 0.0556, 0.0952], abs=1e-4)
+        assert min_p_value(3, 3) == pytest.approx(0.1)
+
+
+class TestBootstrap:
+    """Test bootstrap confidence intervals."""
+
+    def test_interval_brackets_difference(self, use_numpy):
+        """Test the interval of a clear shift excludes 0 and holds the shift."""
+        old = [[10.0, 11.0, 9.0, 10.5, 9.5]]
+        new = [[15.0, 16.0, 14.0, 15.5, 14.5]]
+        (low, high), = bootstrap_interval(old, new, resamples=500)
+        assert 0 < low <= 5.0 <= high
+
+
+class TestCompareSamples:
+    """Test per-function comparison of repeated runs."""
+
+    def test_noise_is_not_significant(self):
+        """Test a noisy 12% change is not reported but a consistent one is."""
+        old = {
+            "a.py:noisy": [100.0, 60.0, 140.0, 90.0, 110.0, 70.0],
+            "a.py:steady": [100.0, 101.0, 99.0, 100.5, 99.5, 100.0],
+        }
+        new = {
+            "a.py:noisy": [112.0, 150.0, 70.0, 120.0, 95.0, 125.0],
+            "a.py:steady": [112.0, 113.0, 111.0, 112.5, 111.5, 112.0],
+        }
+        for method in ("mannwhitney", "bootstrap"):
+            changes = compare_samples(old, new, method=method)
+            assert changes["a.py:steady"]["significant"]
+            assert not changes["a.py:noisy"]["significant"]
+            assert changes["a.py:steady"]["change_percent"] == pytest.approx(12.0)
+
+    def test_small_change_below_threshold(self):
+        """Test significant changes smaller than the threshold are not reported."""
+        old = {"a.py:f": [100.0, 100.1, 99.9, 100.0, 100.2, 99.8]}
+        new = {"a.py:f": [103.0, 103.1, 102.9, 103.0, 103.2, 102.8]}
+        assert not compare_samples(old, new)["a.py:f"]["significant"]
+        assert compare_samples(old, new, min_change_percent=2.0)["a.py:f"]["significant"]
+
+    def test_invalid_arguments(self):
+        """Test unknown methods, bad levels and single runs are rejected."""
+        samples = {"a.py:f": [1.0, 2.0]}
+        with pytest.raises(ValueError):
+            compare_samples(samples, samples, method="ttest")
+        with pytest.raises(ValueError):
+            compare_samples(samples, samples, alpha=1.5)
+        with pytest.raises(ValueError):
+            compare_samples({"a.py:f": [1.0]}, samples)
+
+    def test_too_few_runs_for_mann_whitney(self):
+        """Test Mann-Whitney is refused when no p-value could reach alpha."""
+        old = {"a.py:f": [100.0, 101.0, 99.0]}
+        new = {"a.py:f": [200.0, 201.0, 199.0]}
+        with pytest.raises(ValueError, match="bootstrap"):
+            compare_samples(old, new, method="mannwhitney")
+        assert compare_samples(old, new, method="bootstrap")["a.py:f"]["significant"]
+
+
+def test_combine_runs():
+    """Test repeated runs keep the median run and per-run samples."""
+    runs = [
+        {"functions": {"a.py:f": {"total_energy_mj": total}}, "summary": {"total_energy_mj": total}}
+        for total in (30.0, 10.0, 20.0)
+    ]
+    runs[1]["functions"]["a.py:g"] = {"total_energy_mj": 1.0}
+
+    results = combine_runs(runs)
+    assert results["summary"]["total_energy_mj"] == 20.0
+    assert results["samples"]["representative_run"] == 2
+    assert results["samples"]["total_energy_mj"] == [30.0, 10.0, 20.0]
+    assert results["samples"]["functions"]["a.py:g"] == [0.0, 1.0, 0.0]
@@ -0,0 +1,76 @@
+"""Tests for the import cost of the command-line interface."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Modules a bare CLI startup must not import; commands import them on use
+DEFERRED = (
+    "rich",
+    "psutil",
+    "numpy",
+    "tomllib",
+    "tomli",
+    "py_power_profile.backends.powercap",
+    "py_power_profile.backends.rapl",
+    "py_power_profile.backends.hwmon",
+    "py_power_profile.backends.psutil_est",
+    "py_power_profile.config",
+    "py_power_profile.reporter",
+    "py_power_profile.tracer",
+)
+
+# Generous ceiling on the CLI's own import time (typer not included), in us
+CLI_IMPORT_BUDGET_US = 50_000
+
+PACKAGE_PARENT = str(Path(__file__).parent.parent)
+
+
+def run_python(*args):
+    """Run a fresh interpreter with the package importable."""
+    env = dict(os.environ, PYTHONPATH=PACKAGE_PARENT)
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, env=env, check=True
+    )
+
+
+def import_times(module):
+    """Return {module: (self_us, cumulative_us)} from python -X importtime."""
+    stderr = run_python("-X", "importtime", "-c", f"import {module}").stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+class TestStartup:
+    """Test that CLI startup defers everything a command does not need."""
+
+    def test_cli_import_defers_heavy_modules(self):
+        """Test importing the CLI loads typer but none of the deferred modules."""
+        times = import_times("py_power_profile.cli")
+        assert "py_power_profile.cli" in times
+        assert "typer" in times
+        loaded = [
+            name for name in times
+            if any(name == module or name.startswith(module + ".") for module in DEFERRED)
+        ]
+        assert loaded == []
+
+    def test_cli_import_budget(self):
+        """Test the CLI's import time, less typer's, stays within budget."""
+        times = import_times("py_power_profile.cli")
+        own_us = times["py_power_profile.cli"][1] - times["typer"][1]
+        assert own_us < CLI_IMPORT_BUDGET_US
+
+    def test_version_command(self):
+        """Test the version command works without loading rich."""
+        from py_power_profile import __version__
+
+        result = run_python("-m", "py_power_profile.cli", "version")
+        assert result.stdout.strip() == f"py-power-profile version {__version__}"
@@ -0,0 +1,88 @@
+"""Tests for timeline recording and downsampling."""
+
+import csv
+import time
+
+import pytest
+
+from py_power_profile.backends import MockBackend
+from py_power_profile.timeline import COLUMNS, TimelineRecorder, downsample
+from py_power_profile.tracer import EnergyTracer
+
+
+def timeline_busy(ms):
+    """Spin for ms milliseconds."""
+    end = time.perf_counter() + ms / 1000
+    while time.perf_counter() < end:
+        pass
+
+
+def write_timeline(path, samples):
+    """Write a timeline of (energy_mj, stack) samples 10 ms apart."""
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for i, (energy, stack) in enumerate(samples, 1):
+            writer.writerow((i * 10.0, energy, energy / 10.0, stack))
+
+
+class TestDownsample:
+    """Test streaming downsampling of timeline files."""
+
+    def test_short_timeline_is_kept(self, tmp_path):
+        """Test timelines shorter than the row budget keep every sample."""
+        path = tmp_path / "timeline.csv"
+        write_timeline(path, [(10.0, "a.py:main;a.py:f"), (30.0, "a.py:main;a.py:g")])
+
+        buckets = downsample(str(path), rows=10)
+        assert [b["top_function"] for b in buckets] == ["a.py:f", "a.py:g"]
+        assert buckets[1]["start_ms"] == 10.0
+        assert buckets[1]["avg_power_w"] == 3.0
+
+    def test_long_timeline_is_bounded(self, tmp_path):
+        """Test energy and peaks survive folding into few buckets."""
+        path = tmp_path / "timeline.csv"
+        samples = [(1.0, "a.py:idle")] * 999 + [(500.0, "a.py:burst")]
+        write_timeline(path, samples)
+
+        buckets = downsample(str(path), rows=8)
+        assert 4 <= len(buckets) <= 8
+        assert sum(b["samples"] for b in buckets) == 1000
+        assert sum(b["energy_mj"] for b in buckets) == pytest.approx(1499.0)
+        assert buckets[0]["start_ms"] == 0.0
+        assert buckets[-1]["end_ms"] == 10000.0
+        assert max(b["peak_power_w"] for b in buckets) == 50.0
+
+    def test_rejects_other_files(self, tmp_path):
+        """Test files without the timeline header are rejected."""
+        path = tmp_path / "results.csv"
+        path.write_text("a,b\n1,2\n")
+        with pytest.raises(ValueError):
+            downsample(str(path))
+
+
+class TestTimelineRecorder:
+    """Test recording next to a tracer."""
+
+    def test_records_stack_samples(self, tmp_path):
+        """Test samples are tagged with the traced function running."""
+        path = tmp_path / "timeline.csv"
+        tracer = EnergyTracer(MockBackend())
+        recorder = TimelineRecorder(tracer, str(path), interval_ms=5.0)
+        tracer.start()
+        recorder.start()
+        timeline_busy(60)
+        recorder.stop()
+        tracer.stop()
+
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == recorder.samples >= 2
+        assert any(row["stack"].endswith(":timeline_busy") for row in rows)
+        times = [float(row["time_ms"]) for row in rows]
+        assert times == sorted(times)
+
+    def test_invalid_interval(self):
+        """Test non-positive intervals are rejected."""
+        with pytest.raises(ValueError):
+            TimelineRecorder(EnergyTracer(MockBackend()), "timeline.csv", interval_ms=0)
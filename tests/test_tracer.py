@@ -1,10 +1,27 @@
 """Tests for the tracer module."""
 
+import asyncio
+import pathlib
+import sys
+import threading
+
 import pytest
+from rich.console import Console
 from unittest.mock import Mock
 
+from py_power_profile import tracer as tracer_module
 from py_power_profile.backends import MockBackend
-from py_power_profile.tracer import EnergyTracer, FunctionStats
+from py_power_profile.config import config
+from py_power_profile.reporter import Reporter
+from py_power_profile.stats import CallTree, LineTable, StatsTable
+from py_power_profile.tracer import (
+    HAS_MONITORING,
+    MONITORING_DISABLE,
+    EnergyTracer,
+    FunctionStats,
+    hottest_functions,
+)
+from py_power_profile.utils import run_script
 
 
 class TestFunctionStats:
@@ -92,4 +109,609 @@ class TestEnergyTracer:
         assert results["metadata"]["line_level"] is False
         assert "test.py:func1" in results["functions"]
         assert results["summary"]["total_energy_mj"] == 10.0
-        assert results["summary"]["function_count"] == 1 
\ No newline at end of file
+        assert results["summary"]["function_count"] == 1 
+
+    def test_run_script_adds_no_runner_frames(self, tmp_path):
+        """Test only the script's own code is profiled, run as a picklable __main__."""
+        script = tmp_path / "main_script.py"
+        script.write_text(
+            "import pickle\n"
+            "import sys\n"
+            "\n"
+            "def target():\n"
+            "    return 1\n"
+            "\n"
+            "assert __name__ == '__main__' and sys.modules['__main__'].target is target\n"
+            "pickle.dumps(target)\n"
+        )
+        main_module = sys.modules["__main__"]
+        tracer = EnergyTracer(MockBackend(), engine="settrace")
+        tracer.start()
+        try:
+            run_script(str(script))
+        finally:
+            tracer.stop()
+        assert sys.modules["__main__"] is main_module
+        files = {key.rsplit(":", 1)[0] for key in tracer.get_results()["functions"]}
+        assert not any("runpy" in name or "importlib" in name for name in files)
+
+
+def traced_leaf():
+    """Small function used to exercise the tracing engines."""
+    return 1
+
+
+def traced_caller(n):
+    """Call traced_leaf n times."""
+    return sum(traced_leaf() for _ in range(n))
+
+
+class TestTracingEngines:
+    """Test settrace and sys.monitoring engine selection."""
+
+    def test_invalid_engine(self):
+        """Test unknown engines are rejected."""
+        with pytest.raises(ValueError):
+            EnergyTracer(MockBackend(), engine="ptrace")
+
+    def test_auto_engine_selection(self):
+        """Test auto selects sys.monitoring only when available."""
+        tracer = EnergyTracer(MockBackend())
+        expected = "monitoring" if HAS_MONITORING else "settrace"
+        assert tracer._select_engine() == expected
+
+    @pytest.mark.parametrize("engine", ["settrace", "monitoring"])
+    def test_engine_traces_calls(self, engine):
+        """Test both engines record nested calls."""
+        if engine == "monitoring" and not HAS_MONITORING:
+            pytest.skip("sys.monitoring requires Python 3.12+")
+
+        tracer = EnergyTracer(MockBackend(), engine=engine)
+        tracer.start()
+        traced_caller(3)
+        tracer.stop()
+
+        results = tracer.get_results()
+        leaf = [v for k, v in results["functions"].items() if k.endswith(":traced_leaf")]
+        assert results["metadata"]["engine"] == engine
+        assert leaf and leaf[0]["calls"] == 3
+
+    @pytest.mark.skipif(not HAS_MONITORING, reason="sys.monitoring requires Python 3.12+")
+    def test_monitoring_disables_ignored_code(self, monkeypatch):
+        """Test ignored code objects get their events disabled."""
+        monkeypatch.setattr(config, "ignore_patterns", ["*test_tracer.py"])
+        tracer = EnergyTracer(MockBackend(), engine="monitoring")
+        tracer._local.shard = tracer
+
+        assert tracer._monitor_start(traced_leaf.__code__, 0) is MONITORING_DISABLE
+        assert tracer._monitor_return(traced_leaf.__code__, 0, None) is MONITORING_DISABLE
+
+    @pytest.mark.parametrize("engine", ["settrace", "monitoring"])
+    def test_include_only_traces_matching_functions(self, engine, monkeypatch):
+        """Test an include allow-list leaves out every other function."""
+        if engine == "monitoring" and not HAS_MONITORING:
+            pytest.skip("sys.monitoring requires Python 3.12+")
+
+        monkeypatch.setattr(config, "include_patterns", [f"{__name__}:traced_leaf"])
+        tracer = EnergyTracer(MockBackend(), engine=engine)
+        tracer.start()
+        traced_caller(3)
+        tracer.stop()
+
+        names = [key.rsplit(":", 1)[-1] for key in tracer.get_results()["functions"]]
+        assert names == ["traced_leaf"]
+        assert tracer.stats[next(iter(tracer.stats))].calls == 3
+
+    def test_call_limit(self):
+        """Test functions stop being measured after call_limit calls."""
+        engine = "monitoring" if HAS_MONITORING else "settrace"
+        tracer = EnergyTracer(MockBackend(), engine=engine, call_limit=2)
+        tracer.start()
+        traced_caller(5)
+        tracer.stop()
+
+        leaf = [s for k, s in tracer.stats.items() if k.endswith(":traced_leaf")]
+        assert leaf and leaf[0].calls == 2
+
+
+class TestOverheadSubtraction:
+    """Test calibration and subtraction of the tracer's own cost."""
+
+    @pytest.mark.parametrize("engine", ["settrace", "monitoring"])
+    def test_calibration(self, engine):
+        """Test calibration measures the mock counter's reads per call."""
+        if engine == "monitoring" and not HAS_MONITORING:
+            pytest.skip("sys.monitoring requires Python 3.12+")
+
+        calibration = EnergyTracer(MockBackend(), engine=engine).calibrate(calls=200, rounds=2)
+        assert calibration["engine"] == engine
+        assert calibration["calls"] == 400
+        # One read inside a call's window, one outside of it
+        assert calibration["inner_energy_mj"] == pytest.approx(10.0)
+        assert calibration["outer_energy_mj"] == pytest.approx(10.0, rel=0.05)
+        assert calibration["inner_time_us"] > 0
+        with pytest.raises(ValueError):
+            EnergyTracer(MockBackend()).calibrate(calls=0)
+
+    def test_subtracts_reads_of_mock_backend(self):
+        """Test the mock counter, which only counts reads, nets out to ~0."""
+        tracer = EnergyTracer(MockBackend(), subtract_overhead=True)
+        tracer.start()
+        traced_caller(5)
+        tracer.stop()
+
+        results = tracer.get_results()
+        assert results["metadata"]["overhead"]["subtracted"] is True
+        functions = {key.rsplit(":", 1)[-1]: value for key, value in results["functions"].items()}
+        assert functions["traced_leaf"]["calls"] == 5
+        assert functions["traced_leaf"]["total_energy_mj"] == pytest.approx(0.0)
+        assert abs(functions["traced_caller"]["total_energy_mj"]) < 1.0
+        assert abs(functions["traced_caller"]["self_energy_mj"]) < 1.0
+
+    def test_calibrated_once_per_process(self, monkeypatch):
+        """Test tracers with the same backend kind and options share a calibration."""
+        monkeypatch.setattr(tracer_module, "_calibrations", {})
+        calls = []
+        calibrate = EnergyTracer.calibrate
+        monkeypatch.setattr(
+            EnergyTracer, "calibrate", lambda self: calls.append(self) or calibrate(self, calls=100)
+        )
+        for _ in range(2):
+            tracer = EnergyTracer(MockBackend(), engine="settrace", subtract_overhead=True)
+            tracer.start()
+            traced_caller(1)
+            tracer.stop()
+        assert len(calls) == 1
+
+        tracer = EnergyTracer(MockBackend(), engine="settrace", call_paths=True, subtract_overhead=True)
+        tracer.ensure_calibration()
+        assert len(calls) == 2
+
+    def test_subtracted_figures_not_negative(self):
+        """Test calls cheaper than the calibration are clamped at 0."""
+        tracer = EnergyTracer(MockBackend(), engine="settrace", subtract_overhead=True)
+        # Far more than a call really costs
+        tracer.calibration = {
+            "inner_time_us": 1e6,
+            "inner_energy_mj": 1e6,
+            "outer_time_us": 1e6,
+            "outer_energy_mj": 1e6,
+        }
+        tracer.start()
+        traced_caller(3)
+        tracer.stop()
+        for stats in tracer.get_results()["functions"].values():
+            for field in ("total_energy_mj", "total_time_ms", "self_energy_mj", "self_time_ms"):
+                assert stats[field] >= 0.0
+
+    def test_not_calibrated_by_default(self):
+        """Test tracers only calibrate when asked to."""
+        tracer = EnergyTracer(MockBackend())
+        tracer.start()
+        traced_caller(2)
+        tracer.stop()
+        assert "overhead" not in tracer.get_results()["metadata"]
+        assert tracer.stats.total_energy[tracer.stats.intern(f"{__file__}:traced_leaf")] == 20.0
+
+
+class TestNestedAttribution:
+    """Test per-frame snapshots for nested calls."""
+
+    def test_inclusive_and_self_energy(self):
+        """Test outer frames keep their own start snapshot."""
+        # MockBackend's counter advances 10 mJ per read: outer enter (10),
+        # inner enter (20), inner exit (30), outer exit (40).
+        tracer = EnergyTracer(MockBackend(energy_per_call_mj=10.0))
+        tracer._enter(tracer.stats.intern("test.py:outer"))
+        tracer._enter(tracer.stats.intern("test.py:inner"))
+        tracer._exit()
+        tracer._exit()
+
+        outer = tracer.stats["test.py:outer"]
+        inner = tracer.stats["test.py:inner"]
+        assert outer.total_energy_mj == 30.0
+        assert outer.self_energy_mj == 20.0
+        assert inner.total_energy_mj == 10.0
+        assert inner.self_energy_mj == 10.0
+        assert outer.self_time_ms <= outer.total_time_ms
+
+        results = tracer.get_results()
+        assert results["summary"]["total_energy_mj"] == 30.0
+        assert results["functions"]["test.py:outer"]["self_energy_mj"] == 20.0
+
+    def test_recursion_counted_once_inclusive(self):
+        """Test recursive calls only add inclusive totals at the outermost level."""
+        tracer = EnergyTracer(MockBackend(energy_per_call_mj=10.0))
+        tracer._enter(tracer.stats.intern("test.py:fib"))
+        tracer._enter(tracer.stats.intern("test.py:fib"))
+        tracer._exit()
+        tracer._exit()
+
+        stats = tracer.stats["test.py:fib"]
+        assert stats.calls == 2
+        assert stats.total_energy_mj == 30.0
+        assert stats.self_energy_mj == 30.0
+
+
+class TestStatsTable:
+    """Test the columnar StatsTable store."""
+
+    def test_intern_assigns_dense_ids(self):
+        """Test keys are interned to stable, dense IDs."""
+        table = StatsTable()
+        assert table.intern("a.py:f") == 0
+        assert table.intern("b.py:g") == 1
+        assert table.intern("a.py:f") == 0
+        assert table.names == ["a.py:f", "b.py:g"]
+
+    def test_update_and_export(self):
+        """Test updates land in the columns and export lazily."""
+        table = StatsTable(domain_count=2)
+        func_id = table.intern("a.py:f")
+        table.update(func_id, 10.0, 5.0, 4.0, 2.0, domain_energy_mj=[6.0, 1.0])
+        table.update(func_id, 20.0, 10.0, 20.0, 10.0, recursive=True)
+
+        stats = table["a.py:f"]
+        assert isinstance(stats, FunctionStats)
+        assert stats.calls == 2
+        assert stats.total_energy_mj == 10.0
+        assert stats.self_energy_mj == 24.0
+        assert stats.min_energy_mj == 10.0
+        assert stats.max_energy_mj == 20.0
+        assert stats.domain_energy_mj == [6.0, 1.0]
+        assert table.to_dict(func_id)["avg_energy_mj"] == 5.0
+
+    def test_rows_skip_functions_without_calls(self):
+        """Test functions that never returned are not exported."""
+        table = StatsTable()
+        table.intern("a.py:pending")
+        done = table.intern("a.py:done")
+        table.update(done, 1.0, 1.0, 1.0, 1.0)
+
+        assert list(table.rows()) == [(done, "a.py:done")]
+        assert list(table.to_function_stats()) == ["a.py:done"]
+
+    def test_set_from_function_stats(self):
+        """Test assigning a FunctionStats object fills a row."""
+        table = StatsTable()
+        stats = FunctionStats()
+        stats.update(10.0, 5.0)
+        table["a.py:f"] = stats
+
+        assert "a.py:f" in table
+        assert table["a.py:f"].to_dict() == stats.to_dict()
+
+
+class TestLineTable:
+    """Test per-line figures stored as arrays by line offset."""
+
+    def test_rows_grow_both_ways(self):
+        """Test lines before the base and past the end widen the row."""
+        table = LineTable()
+        table.add(0, 10, 1.0, 0.5)
+        table.add(0, 14, 2.0, 0.5)
+        table.add(0, 8, 3.0, 0.5)
+        table.add(0, 10, 1.0, 0.5)
+
+        assert list(table.rows()) == [(0, 8, 1, 3.0, 0.5), (0, 10, 2, 2.0, 1.0), (0, 14, 1, 2.0, 0.5)]
+
+    def test_merge(self):
+        """Test shards with different ranges merge line by line."""
+        table = LineTable()
+        table.add(0, 5, 1.0, 1.0)
+        shard = table.shard()
+        shard.add(0, 3, 2.0, 1.0)
+        shard.add(0, 5, 2.0, 1.0)
+        shard.add(1, 7, 4.0, 1.0)
+
+        table.merge(shard)
+        assert sorted(table.rows()) == [
+            (0, 3, 1, 2.0, 1.0), (0, 5, 2, 3.0, 2.0), (1, 7, 1, 4.0, 1.0)
+        ]
+
+
+def line_profiled(n):
+    """Loop used to exercise line-level tracing."""
+    total = 0
+    for i in range(n):
+        total += i
+    return total
+
+
+class TestLineLevel:
+    """Test line-level tracing."""
+
+    @pytest.mark.parametrize("engine", ["settrace", "monitoring"])
+    def test_lines_keyed_by_file_and_line(self, engine):
+        """Test line events fill the line table without touching call counts."""
+        if engine == "monitoring" and not HAS_MONITORING:
+            pytest.skip("sys.monitoring requires Python 3.12+")
+
+        tracer = EnergyTracer(MockBackend(), engine=engine, line_level=True)
+        tracer.start()
+        line_profiled(5)
+        tracer.stop()
+
+        results = tracer.get_results()
+        func_key = next(k for k in results["functions"] if k.endswith(":line_profiled"))
+        assert results["functions"][func_key]["calls"] == 1
+
+        first = line_profiled.__code__.co_firstlineno
+        filename = func_key.rsplit(":", 1)[0]
+        lines = {
+            int(key.rsplit(":", 1)[1]) - first: stats
+            for key, stats in results["lines"].items()
+            if stats["function"] == func_key
+        }
+        # The loop header runs once more than its body
+        assert lines[3]["hits"] == 6
+        assert lines[4]["hits"] == 5
+        assert lines[5]["hits"] == 1
+        assert all(key.startswith(filename) for key in results["lines"])
+
+        console = Console(record=True, width=200)
+        Reporter(console).print_annotated_source(results, top=1)
+        assert "total += i" in console.export_text()
+
+    @pytest.mark.parametrize("engine", ["settrace", "monitoring"])
+    def test_line_functions_limit_line_events(self, engine):
+        """Test only the selected functions get line figures."""
+        if engine == "monitoring" and not HAS_MONITORING:
+            pytest.skip("sys.monitoring requires Python 3.12+")
+
+        leaf_key = f"{traced_leaf.__code__.co_filename}:traced_leaf"
+        tracer = EnergyTracer(MockBackend(), engine=engine, line_level=True, line_functions=[leaf_key])
+        tracer.start()
+        traced_caller(3)
+        line_profiled(3)
+        tracer.stop()
+
+        results = tracer.get_results()
+        assert results["metadata"]["line_functions"] == [leaf_key]
+        assert {stats["function"] for stats in results["lines"].values()} == {leaf_key}
+        assert results["functions"][leaf_key]["calls"] == 3
+        if engine == "monitoring":
+            events = sys.monitoring.get_local_events(sys.monitoring.PROFILER_ID, traced_leaf.__code__)
+            assert events == 0
+
+    def test_hottest_functions(self):
+        """Test functions are ranked by self energy."""
+        results = {
+            "functions": {
+                "a.py:wrapper": {"total_energy_mj": 100.0, "self_energy_mj": 1.0},
+                "a.py:work": {"total_energy_mj": 90.0, "self_energy_mj": 90.0},
+                "a.py:helper": {"total_energy_mj": 9.0, "self_energy_mj": 9.0},
+            }
+        }
+        assert hottest_functions(results, 2) == ["a.py:work", "a.py:helper"]
+
+    def test_hottest_functions_break_ties_on_time(self):
+        """Test equal energy goes to the most self time, and stdlib is skipped."""
+        results = {
+            "functions": {
+                "a.py:quick": {"total_energy_mj": 0.0, "self_energy_mj": 0.0, "self_time_ms": 0.1},
+                "a.py:slow": {"total_energy_mj": 0.0, "self_energy_mj": 0.0, "self_time_ms": 5.0},
+                f"{pathlib.__file__}:__new__": {
+                    "total_energy_mj": 0.0, "self_energy_mj": 0.0, "self_time_ms": 9.0,
+                },
+                "<frozen runpy>:_run_code": {
+                    "total_energy_mj": 0.0, "self_energy_mj": 0.0, "self_time_ms": 9.0,
+                },
+            }
+        }
+        assert hottest_functions(results, 2) == ["a.py:slow", "a.py:quick"]
+
+    def test_hottest_function_of_a_script(self, tmp_path):
+        """Test a profiled script's own hot function is the one selected."""
+        script = tmp_path / "hot_script.py"
+        script.write_text(
+            "import pathlib\n"
+            "\n"
+            "def hot():\n"
+            "    total = 0\n"
+            "    for i in range(200000):\n"
+            "        total += i * i\n"
+            "    return total\n"
+            "\n"
+            "def cold():\n"
+            "    return 1\n"
+            "\n"
+            "pathlib.Path(__file__).resolve()\n"
+            "cold()\n"
+            "hot()\n"
+        )
+        # A counter that never moves, as psutil_est on an idle machine: all ties
+        tracer = EnergyTracer(MockBackend(energy_per_call_mj=0.0), engine="settrace")
+        tracer.start()
+        try:
+            run_script(str(script))
+        finally:
+            tracer.stop()
+        assert hottest_functions(tracer.get_results(), 1) == [f"{script}:hot"]
+
+
+class TestCallPaths:
+    """Test the call path prefix tree."""
+
+    def test_tree_shares_prefixes(self):
+        """Test paths are stored once per distinct prefix and merge across shards."""
+        tree = CallTree()
+        shard = tree.shard()
+        outer = tree.child(0, 0)
+        inner = shard.child(outer, 1)
+        assert tree.child(0, 0) == outer
+        assert tree.child(outer, 1) == inner
+        tree.add(outer, 5.0, 1.0)
+        shard.add(inner, 3.0, 1.0)
+        shard.add(inner, 2.0, 1.0)
+
+        tree.merge(shard)
+        assert dict(tree.paths(["a.py:f", "a.py:g"])) == {outer: "a.py:f", inner: "a.py:f;a.py:g"}
+        assert tree.calls[inner] == 2
+        assert tree.self_energy[inner] == 5.0
+
+    def test_tracer_exports_call_paths(self):
+        """Test self energy is credited to the full call path."""
+        tracer = EnergyTracer(MockBackend(energy_per_call_mj=10.0), call_paths=True)
+        outer = tracer.stats.intern("test.py:outer")
+        inner = tracer.stats.intern("test.py:inner")
+        tracer._enter(outer)
+        tracer._enter(inner)
+        tracer._exit()
+        tracer._enter(inner)
+        tracer._exit()
+        tracer._exit()
+
+        call_paths = tracer.get_results()["call_paths"]
+        assert call_paths["test.py:outer"]["self_energy_mj"] == 30.0
+        assert call_paths["test.py:outer;test.py:inner"]["calls"] == 2
+        assert call_paths["test.py:outer;test.py:inner"]["self_energy_mj"] == 20.0
+
+    def test_call_paths_off_by_default(self):
+        """Test results only carry call paths when asked to."""
+        tracer = EnergyTracer(MockBackend())
+        tracer._enter(tracer.stats.intern("test.py:f"))
+        tracer._exit()
+        assert "call_paths" not in tracer.get_results()
+
+
+def threaded_worker(n):
+    """Work executed on a worker thread."""
+    return traced_caller(n)
+
+
+class TestThreadTracing:
+    """Test per-thread call stacks and stats shards."""
+
+    @pytest.mark.parametrize("engine", ["settrace", "monitoring"])
+    def test_traces_new_threads(self, engine):
+        """Test threads started while tracing are traced and merged."""
+        if engine == "monitoring" and not HAS_MONITORING:
+            pytest.skip("sys.monitoring requires Python 3.12+")
+
+        tracer = EnergyTracer(MockBackend(), engine=engine)
+        tracer.start()
+        workers = [
+            threading.Thread(target=threaded_worker, args=(2,), name=f"worker-{i}")
+            for i in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        traced_caller(1)
+        tracer.stop()
+
+        results = tracer.get_results()
+        leaf = [v for k, v in results["functions"].items() if k.endswith(":traced_leaf")]
+        assert leaf and leaf[0]["calls"] == 7
+
+        threads = {t["name"]: t for t in results["threads"]}
+        assert threads[threading.current_thread().name]["function_count"] >= 2
+        for i in range(3):
+            worker_functions = threads[f"worker-{i}"]["functions"]
+            assert any(k.endswith(":threaded_worker") for k in worker_functions)
+
+    def test_internal_threads_are_not_traced(self):
+        """Test py-power's own sampler threads get no shard."""
+        tracer = EnergyTracer(MockBackend(), engine="settrace")
+        tracer.start()
+        helper = threading.Thread(target=traced_caller, args=(1,), name="py-power-helper")
+        helper.start()
+        helper.join()
+        tracer.stop()
+
+        assert [t["name"] for t in tracer.thread_results] == [threading.current_thread().name]
+
+    def test_shards_share_function_ids(self):
+        """Test shards intern keys into the shared registry and merge."""
+        table = StatsTable()
+        shard = table.shard()
+        func_id = shard.intern("a.py:f")
+        shard.update(func_id, 5.0, 1.0, 5.0, 1.0)
+        table.update(table.intern("a.py:f"), 3.0, 1.0, 3.0, 1.0)
+
+        table.merge(shard)
+        assert table.intern("a.py:f") == func_id
+        assert table["a.py:f"].calls == 2
+        assert table["a.py:f"].total_energy_mj == 8.0
+
+
+async def traced_waiter():
+    """Coroutine that spends its time suspended."""
+    await asyncio.sleep(0.05)
+    return traced_leaf()
+
+
+async def traced_worker(n):
+    """Coroutine that keeps running while traced_waiter is suspended."""
+    for _ in range(n):
+        traced_caller(10)
+        await asyncio.sleep(0)
+
+
+async def traced_main():
+    """Run traced_waiter and traced_worker as concurrent tasks."""
+    await asyncio.gather(
+        asyncio.ensure_future(traced_waiter()),
+        asyncio.ensure_future(traced_worker(5)),
+    )
+
+
+def traced_generator(n):
+    """Generator yielding n values."""
+    for i in range(n):
+        yield traced_leaf() + i
+
+
+class TestAsyncAttribution:
+    """Test coroutine suspension, per-task energy and event loop idle time."""
+
+    @pytest.mark.parametrize("engine", ["settrace", "monitoring"])
+    def test_suspended_coroutine_counts_one_call(self, engine):
+        """Test a coroutine resumed several times is one call and not charged while suspended."""
+        if engine == "monitoring" and not HAS_MONITORING:
+            pytest.skip("sys.monitoring requires Python 3.12+")
+
+        tracer = EnergyTracer(MockBackend(), engine=engine, async_mode=True)
+        tracer.start()
+        asyncio.run(traced_main())
+        list(traced_generator(3))
+        tracer.stop()
+
+        functions = {
+            key.rsplit(":", 1)[-1]: value
+            for key, value in tracer.get_results()["functions"].items()
+        }
+        assert functions["traced_waiter"]["calls"] == 1
+        assert functions["traced_worker"]["calls"] == 1
+        assert functions["traced_generator"]["calls"] == 1
+        # The waiter sleeps for 50 ms but only runs for a few microseconds
+        assert functions["traced_waiter"]["total_time_ms"] < 25
+
+    @pytest.mark.parametrize("engine", ["settrace", "monitoring"])
+    def test_tasks_and_idle_time(self, engine):
+        """Test energy is reported per task and selector waits as idle time."""
+        if engine == "monitoring" and not HAS_MONITORING:
+            pytest.skip("sys.monitoring requires Python 3.12+")
+
+        tracer = EnergyTracer(MockBackend(), engine=engine, async_mode=True)
+        tracer.start()
+        asyncio.run(traced_main())
+        tracer.stop()
+
+        results = tracer.get_results()
+        tasks = {
+            task["coroutine"].rsplit(":", 1)[-1]: task
+            for task in results["asyncio"]["tasks"].values()
+        }
+        assert tasks["traced_worker"]["steps"] == 6
+        assert tasks["traced_worker"]["energy_mj"] > tasks["traced_waiter"]["energy_mj"] > 0
+        idle = results["asyncio"]["idle"]
+        assert idle["waits"] > 0
+        assert idle["time_ms"] >= 25
+
+    def test_default_mode_has_no_asyncio_section(self):
+        """Test the asyncio summary is only exported in async mode."""
+        tracer = EnergyTracer(MockBackend())
+        assert "asyncio" not in tracer.get_results()